@@ -121,9 +121,15 @@ class HTTPClientConnectionController(protocol.BaseHTTPConnectionController):
         """
         self.cancel_timeout_handler()
         async def _create_new_stream_and_connection():
-            self.reader, self.writer = await asyncio.open_connection(
-                host=self.host,  port=self.port, ssl=self.context,
-                loop=self._loop)
+            # Create the stream with the loop explicitly, as
+            # `asyncio.open_connection` does not accept a loop anymore.
+            self.reader = asyncio.StreamReader(loop=self._loop)
+            transport, stream_protocol = await self._loop.create_connection(
+                lambda: asyncio.StreamReaderProtocol(
+                    self.reader, loop=self._loop),
+                host=self.host, port=self.port, ssl=self.context)
+            self.writer = asyncio.StreamWriter(
+                transport, stream_protocol, self.reader, self._loop)
             self.transport = self.writer.transport
 
             if self.http_version < 20:
@@ -268,7 +274,7 @@ class HTTPClient:
         return HTTPClientConnectionController(
             allow_keep_alive=self.allow_keep_alive,
             http_version=self.http_version,
-            host=host, port=port, context=context)
+            host=host, port=port, context=context, loop=self._loop)
 
     def _put_connection_controller(self,
                                    controller: HTTPClientConnectionController):
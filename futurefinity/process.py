@@ -0,0 +1,693 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016 Futur Solo
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+``futurefinity.process`` contains the multi-process launcher of FutureFinity.
+
+The launcher binds the listening sockets, warms up the application, and forks
+worker processes that share the listening sockets::
+
+  import futurefinity.web
+  import futurefinity.process
+
+  app = futurefinity.web.Application()
+
+  launcher = futurefinity.process.Launcher(app, workers=4)
+  launcher.bind(23333)
+  launcher.start()
+
+The master process can be controlled by signals:
+
+- ``SIGTERM`` or ``SIGINT``: Stop all the workers gracefully and exit.
+- ``SIGHUP``: Fork a new generation of workers, and stop the old generation
+  gracefully.
+- ``SIGUSR2``: Start a new master process with the same command line, the
+  listening sockets are passed to the new master by fd inheritance. When all
+  the workers of the new master are ready, the new master stops the old one
+  gracefully. This can be used to upgrade the code without closing the
+  listening sockets.
+- ``SIGUSR1``: Print the memory usage of all the workers to stderr.
+
+This module only works on Unix-like systems.
+"""
+
+from futurefinity.utils import FutureFinityError, new_event_loop
+from futurefinity import server
+
+from collections import namedtuple
+from typing import Optional, Union, Mapping, Sequence
+
+import futurefinity
+
+import asyncio
+
+import gc
+import os
+import ssl
+import sys
+import time
+import errno
+import random
+import select
+import signal
+import socket
+import struct
+import traceback
+
+
+_LISTEN_FDS_ENV = "FUTUREFINITY_LISTEN_FDS"
+_OLD_MASTER_PID_ENV = "FUTUREFINITY_OLD_MASTER_PID"
+
+_WORKER_READY = 1
+_WORKER_RETIRING = 2
+
+
+class LauncherError(FutureFinityError):
+    """
+    FutureFinity Launcher Error.
+
+    All Errors from the Launcher are based on this class.
+    """
+    pass
+
+
+class MemoryUsage(namedtuple("MemoryUsage", ("rss", "shared", "private"))):
+    """
+    Memory usage of a process, all values are in bytes.
+
+    :arg rss: is the resident set size of the process.
+    :arg shared: is the part of rss that is shared with other processes, such
+        as the pages inherited from the master process that have not been
+        written since fork.
+    :arg private: is the part of rss that is only used by the process.
+    """
+    pass
+
+
+def get_memory_usage(pid: Optional[int]=None) -> Optional[MemoryUsage]:
+    """
+    Return the memory usage of the process with the pid in a `MemoryUsage`.
+
+    If the pid is not specified, the current process will be used.
+
+    This reads ``/proc/<pid>/smaps_rollup``(or ``/proc/<pid>/smaps``) so it
+    only works on Linux. ``None`` will be returned if the usage cannot be read.
+    """
+    pid = pid or os.getpid()
+
+    fields = {
+        "Rss": 0,
+        "Shared_Clean": 0,
+        "Shared_Dirty": 0,
+        "Private_Clean": 0,
+        "Private_Dirty": 0
+    }
+
+    for file_name in ("smaps_rollup", "smaps"):
+        try:
+            with open("/proc/%d/%s" % (pid, file_name), "r") as f:
+                for line in f:
+                    name, _, value = line.partition(":")
+                    if name in fields:
+                        fields[name] += int(value.split()[0]) * 1024  # kB
+            break
+        except (OSError, ValueError, IndexError):
+            continue
+    else:
+        return None
+
+    return MemoryUsage(
+        rss=fields["Rss"],
+        shared=fields["Shared_Clean"] + fields["Shared_Dirty"],
+        private=fields["Private_Clean"] + fields["Private_Dirty"])
+
+
+class Launcher:
+    """
+    FutureFinity Multi-process Launcher.
+
+    The Launcher binds the listening sockets in the master process, calls
+    `web.Application.warmup`, freezes the garbage collector, and then forks
+    the worker processes. All the workers accept connections from the same
+    listening sockets, and the master process restarts any worker that exits.
+
+    A worker can be recycled when it reaches a limit. The worker stops
+    accepting new connections, a new worker is forked to replace it, and the
+    old one exits after the requests that it is handling are finished. The
+    listening sockets are held by the master process, so they are never
+    closed during the replacement.
+
+    :arg app: the `web.Application` that the workers are going to serve.
+    :arg workers: the number of worker processes. Default: the number of
+      cpus.
+    :arg freeze_gc: Default: `True`. Move all the objects created before fork
+      into a permanent generation by ``gc.freeze()``(Python 3.7 or higher),
+      so the garbage collector of the workers will not touch them, and the
+      memory pages can be kept shared with the master process.
+    :arg max_requests: Recycle a worker after it handled this number of
+      requests. Default: `None`, which means no limit.
+    :arg max_requests_jitter: A random number between 0 and this number will
+      be added to the max_requests of each worker, so the workers will not
+      be recycled at the same time. Default: `0`.
+    :arg max_memory: Recycle a worker when its resident set size in bytes
+      exceeds this number. Default: `None`, which means no limit.
+    :arg max_age: Recycle a worker after it has been running for this number
+      of seconds. Default: `None`, which means no limit.
+    :arg graceful_timeout: The maximum time in seconds that a worker waits for
+      its requests to finish before it exits. Default: `30`.
+    :arg uvloop: Run the workers on uvloop event loops if uvloop is
+      available. Default: the `uvloop` setting of the application.
+    """
+    def __init__(self, app: "futurefinity.web.Application",
+                 workers: Optional[int]=None, freeze_gc: bool=True,
+                 max_requests: Optional[int]=None,
+                 max_requests_jitter: int=0,
+                 max_memory: Optional[int]=None,
+                 max_age: Optional[float]=None,
+                 graceful_timeout: float=30,
+                 uvloop: Optional[bool]=None):
+        self.app = app
+        self.workers = workers or os.cpu_count() or 1
+        self.freeze_gc = freeze_gc
+
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.max_memory = max_memory
+        self.max_age = max_age
+        self.graceful_timeout = graceful_timeout
+        if uvloop is None:
+            uvloop = app.settings.get("uvloop", False)
+        self.uvloop = uvloop
+
+        self._sockets = []
+        self._unix_paths = []
+        self._workers = set()
+        self._retiring_workers = set()
+        self._starting_workers = set()
+
+        self._stopping = False
+        self._restarting = False
+        self._reexecuting = False
+        self._new_master_pid = None
+
+        self._inherited_sockets = []
+        for fd in os.environ.pop(_LISTEN_FDS_ENV, "").split(","):
+            if fd:
+                self._inherited_sockets.append(socket.socket(fileno=int(fd)))
+        self._old_master_pid = int(os.environ.pop(_OLD_MASTER_PID_ENV, 0))
+
+        self._worker_stopping = False
+        self._worker_started_at = None
+        self._worker_max_requests = None
+
+    def bind(self, port: int,
+             address: Union[str, Sequence[str], None]="127.0.0.1",
+             context: Union[bool, ssl.SSLContext, None]=None,
+             backlog: int=128, reuse_port: bool=False,
+             tcp_nodelay: Optional[bool]=True,
+             tcp_keepalive: Optional[bool]=None,
+             tcp_defer_accept: Optional[int]=None,
+             tcp_fastopen: Optional[int]=None,
+             send_buffer_size: Optional[int]=None,
+             recv_buffer_size: Optional[int]=None):
+        """
+        Bind the specified port and address.
+
+        This should be called before `Launcher.start`, and can be called for
+        many times to listen to more than one address.
+
+        If the master process is started by ``SIGUSR2`` of an old master, the
+        socket inherited from the old master with the same address will be
+        used instead of binding a new one.
+
+        The socket options are the same as the ones of
+        :meth:`futurefinity.web.Application.listen`.
+
+        :arg port: The port number that futurefinity is going to bind.
+        :arg address: the address that futurefinity is going to bind. It can
+          also be a list of addresses, or `None` to bind all the interfaces.
+        :arg context: The TLS Context used to the server.
+        :arg backlog: The maximum number of queued connections.
+        """
+        if context:
+            if isinstance(context, bool):
+                context = ssl.create_default_context()
+        else:
+            context = None
+
+        server_options = {
+            "tcp_nodelay": tcp_nodelay, "tcp_keepalive": tcp_keepalive}
+
+        for family, sock_type, proto, sockaddr in (
+                server.get_listening_addresses(port, address)):
+            sock = self._pop_inherited_socket(family, sockaddr)
+            if sock is None:
+                sock = server.create_listening_socket(
+                    family, sock_type, proto, sockaddr, backlog=backlog,
+                    reuse_port=reuse_port, tcp_defer_accept=tcp_defer_accept,
+                    tcp_fastopen=tcp_fastopen,
+                    send_buffer_size=send_buffer_size,
+                    recv_buffer_size=recv_buffer_size)
+
+            self._sockets.append((sock, context, server_options))
+
+    def bind_unix(self, path: str, mode: Optional[int]=None,
+                  context: Union[bool, ssl.SSLContext, None]=None,
+                  backlog: int=128):
+        """
+        Bind the specified unix domain socket.
+
+        The stale socket file at the path will be removed before binding, and
+        the socket file will be removed when the launcher stops.
+
+        :arg path: The path of the socket file.
+        :arg mode: The permission bits of the socket file, such as `0o660`.
+          Default: `None`, which keeps the default of the umask.
+        :arg context: The TLS Context used to the server.
+        :arg backlog: The maximum number of queued connections.
+        """
+        if context:
+            if isinstance(context, bool):
+                context = ssl.create_default_context()
+        else:
+            context = None
+
+        sock = self._pop_inherited_socket(socket.AF_UNIX, path)
+        if sock is not None:
+            self._sockets.append((sock, context, {}))
+            self._unix_paths.append(path)
+            return
+
+        sock = server.create_unix_listening_socket(
+            path, mode=mode, backlog=backlog)
+        self._sockets.append((sock, context, {}))
+        self._unix_paths.append(path)
+
+    def bind_socket(self, sock: socket.socket,
+                    context: Union[bool, ssl.SSLContext, None]=None,
+                    tcp_nodelay: Optional[bool]=True,
+                    tcp_keepalive: Optional[bool]=None):
+        """
+        Use a socket that is already bound and listening, such as a socket
+        passed by the process manager.
+
+        :arg sock: The listening socket, it can be a TCP socket or a unix
+          domain socket.
+        :arg context: The TLS Context used to the server.
+        :arg tcp_nodelay: Set ``TCP_NODELAY`` on the accepted sockets.
+        :arg tcp_keepalive: Set ``SO_KEEPALIVE`` on the accepted sockets.
+        """
+        if context:
+            if isinstance(context, bool):
+                context = ssl.create_default_context()
+        else:
+            context = None
+
+        sock.setblocking(False)
+        self._sockets.append((sock, context, {
+            "tcp_nodelay": tcp_nodelay, "tcp_keepalive": tcp_keepalive}))
+
+    def _pop_inherited_socket(self, family: int,
+                              sockaddr: tuple) -> Optional[socket.socket]:
+        for sock in self._inherited_sockets:
+            if sock.family == family and sock.getsockname() == sockaddr:
+                self._inherited_sockets.remove(sock)
+                return sock
+        return None
+
+    def get_workers_memory_usage(self) -> Mapping[int, MemoryUsage]:
+        """
+        Return the memory usage of all the workers in a dict, the keys are
+        the pids of the workers.
+        """
+        return {pid: get_memory_usage(pid)
+                for pid in self._workers | self._retiring_workers}
+
+    def print_workers_memory_usage(self):
+        """
+        Print the memory usage of all the workers to stderr.
+        """
+        for pid, usage in sorted(self.get_workers_memory_usage().items()):
+            if usage is None:
+                print("Worker %d: Memory Usage Unavailable." % pid,
+                      file=sys.stderr)
+                continue
+            print("Worker %(pid)d: RSS: %(rss)dKiB, Shared: %(shared)dKiB, "
+                  "Private: %(private)dKiB." % {
+                      "pid": pid,
+                      "rss": usage.rss // 1024,
+                      "shared": usage.shared // 1024,
+                      "private": usage.private // 1024
+                  }, file=sys.stderr)
+
+    def start(self):
+        """
+        Warm up the application, fork the workers, and supervise them.
+
+        This method blocks until the master process receives ``SIGTERM`` or
+        ``SIGINT``. It never returns in the worker processes.
+        """
+        if not self._sockets:
+            raise LauncherError("Please bind at least one address before "
+                                "starting the launcher.")
+
+        for sock in self._inherited_sockets:
+            sock.close()  # Addresses that are not bound anymore.
+        self._inherited_sockets.clear()
+
+        self.app.warmup()
+
+        gc.collect()
+        if self.freeze_gc and hasattr(gc, "freeze"):
+            gc.freeze()
+
+        self._run_master()
+
+    def _spawn_worker(self):
+        pid = os.fork()
+        if pid:
+            self._workers.add(pid)
+            self._starting_workers.add(pid)
+            return
+
+        exit_code = 0
+        try:
+            self._prepare_worker()
+            self._run_worker()
+        except:
+            traceback.print_exc()
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _prepare_worker(self):
+        signal.set_wakeup_fd(-1)
+        for signum in (signal.SIGTERM, signal.SIGCHLD, signal.SIGHUP,
+                       signal.SIGUSR1, signal.SIGUSR2):
+            signal.signal(signum, signal.SIG_DFL)
+        # Only the master process handles the keyboard interrupt.
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+        os.close(self._wakeup_reader)
+        os.close(self._wakeup_writer)
+        os.close(self._notify_reader)
+
+        old_loop = self.app._loop
+        if not old_loop.is_running() and not old_loop.is_closed():
+            old_loop.close()  # The selector should not be shared.
+
+        loop = new_event_loop(use_uvloop=self.uvloop)
+        asyncio.set_event_loop(loop)
+        self.app._loop = loop
+
+    def _run_worker(self):
+        loop = self.app._loop
+
+        for sock, context, server_options in self._sockets:
+            if sock.family == socket.AF_UNIX:
+                f = loop.create_unix_server(
+                    self.app.make_server(**server_options), sock=sock,
+                    ssl=context)
+            else:
+                f = loop.create_server(
+                    self.app.make_server(**server_options), sock=sock,
+                    ssl=context)
+            self.app._servers.append(loop.run_until_complete(f))
+
+        self._worker_started_at = time.monotonic()
+        if self.max_requests is not None:
+            self._worker_max_requests = self.max_requests + random.randint(
+                0, self.max_requests_jitter)
+
+        loop.add_signal_handler(signal.SIGTERM, self._stop_worker)
+        self._notify_master(_WORKER_READY)
+
+        if (self._worker_max_requests is not None or
+           self.max_memory is not None or self.max_age is not None):
+            self._check_worker_limits()
+
+        loop.run_forever()
+
+    def _worker_limit_exceeded(self) -> bool:
+        if self._worker_max_requests is not None:
+            if self.app._handled_requests >= self._worker_max_requests:
+                return True
+
+        if self.max_age is not None:
+            if time.monotonic() - self._worker_started_at >= self.max_age:
+                return True
+
+        if self.max_memory is not None:
+            usage = get_memory_usage()
+            if usage is not None and usage.rss >= self.max_memory:
+                return True
+
+        return False
+
+    def _check_worker_limits(self):
+        if self._worker_stopping:
+            return
+
+        if self._worker_limit_exceeded():
+            # Tell the master to fork a new worker before this one exits.
+            self._notify_master(_WORKER_RETIRING)
+            self._stop_worker()
+            return
+
+        self.app._loop.call_later(1, self._check_worker_limits)
+
+    def _notify_master(self, message: int):
+        os.write(self._notify_writer, struct.pack("ii", message, os.getpid()))
+
+    def _stop_worker(self):
+        if self._worker_stopping:
+            return
+        self._worker_stopping = True
+
+        loop = self.app._loop
+        shutdown_task = loop.create_task(
+            self.app.shutdown(timeout=self.graceful_timeout))
+        shutdown_task.add_done_callback(lambda fut: loop.stop())
+
+    def _reap_workers(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+
+            if pid == 0:
+                return
+
+            if pid == self._new_master_pid:
+                print("New master process exited unexpectedly.",
+                      file=sys.stderr)
+                self._new_master_pid = None
+                continue
+
+            self._workers.discard(pid)
+            self._retiring_workers.discard(pid)
+            self._starting_workers.discard(pid)
+
+    def _read_worker_messages(self):
+        try:
+            data = os.read(self._notify_reader, 4096)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+            return
+
+        for message, pid in struct.iter_unpack("ii", data):
+            if message == _WORKER_READY:
+                self._starting_workers.discard(pid)
+
+            elif message == _WORKER_RETIRING and pid in self._workers:
+                self._workers.discard(pid)
+                self._starting_workers.discard(pid)
+                self._retiring_workers.add(pid)
+
+        if self._old_master_pid and not self._starting_workers:
+            # All the workers of this master are ready, the old master can
+            # be stopped now.
+            try:
+                os.kill(self._old_master_pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            self._old_master_pid = None
+
+    def _restart_workers(self):
+        """
+        Fork a new generation of workers, and stop the old generation.
+        """
+        for pid in self._workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                continue
+            self._retiring_workers.add(pid)
+
+        self._workers.clear()
+        self._starting_workers.clear()
+
+    def _reexec_master(self):
+        """
+        Start a new master process, and pass the listening sockets to it.
+        """
+        if self._new_master_pid is not None:
+            return  # A new master is already running.
+
+        listen_fds = ",".join(
+            str(sock.fileno()) for sock, _, _ in self._sockets)
+
+        env = dict(os.environ)
+        env[_LISTEN_FDS_ENV] = listen_fds
+        env[_OLD_MASTER_PID_ENV] = str(os.getpid())
+
+        argv = getattr(sys, "orig_argv", None) or (
+            [sys.executable] + sys.argv)
+
+        pid = os.fork()
+        if pid:
+            self._new_master_pid = pid
+            return
+
+        try:
+            signal.set_wakeup_fd(-1)
+            for sock, _, _ in self._sockets:
+                sock.set_inheritable(True)
+            os.execve(sys.executable, argv, env)
+        except:
+            traceback.print_exc()
+        finally:
+            os._exit(1)
+
+    def _handle_stop_signal(self, signum, frame):
+        self._stopping = True
+
+    def _handle_restart_signal(self, signum, frame):
+        self._restarting = True
+
+    def _handle_reexec_signal(self, signum, frame):
+        self._reexecuting = True
+
+    def _handle_report_signal(self, signum, frame):
+        self.print_workers_memory_usage()
+
+    def _run_master(self):
+        self._wakeup_reader, self._wakeup_writer = os.pipe()
+        self._notify_reader, self._notify_writer = os.pipe()
+        for fd in (self._wakeup_reader, self._wakeup_writer,
+                   self._notify_reader):
+            os.set_blocking(fd, False)
+
+        signal.set_wakeup_fd(self._wakeup_writer)
+        signal.signal(signal.SIGINT, self._handle_stop_signal)
+        signal.signal(signal.SIGTERM, self._handle_stop_signal)
+        signal.signal(signal.SIGHUP, self._handle_restart_signal)
+        signal.signal(signal.SIGUSR1, self._handle_report_signal)
+        signal.signal(signal.SIGUSR2, self._handle_reexec_signal)
+        # SIGCHLD needs a handler to wake up the master.
+        signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+
+        try:
+            while not self._stopping:
+                self._reap_workers()
+
+                if self._restarting:
+                    self._restarting = False
+                    self._restart_workers()
+
+                if self._reexecuting:
+                    self._reexecuting = False
+                    self._reexec_master()
+
+                while len(self._workers) < self.workers:
+                    self._spawn_worker()
+
+                readable, _, _ = select.select(
+                    [self._wakeup_reader, self._notify_reader], [], [], 1)
+
+                if self._notify_reader in readable:
+                    self._read_worker_messages()
+                self._drain_wakeup_reader()
+
+        finally:
+            self._stop_workers()
+
+            signal.set_wakeup_fd(-1)
+            for fd in (self._wakeup_reader, self._wakeup_writer,
+                       self._notify_reader, self._notify_writer):
+                os.close(fd)
+
+            for sock, _, _ in self._sockets:
+                sock.close()
+
+            if self._new_master_pid is None:
+                # The socket files are still used by the new master if the
+                # launcher is stopped after a re-execution.
+                for path in self._unix_paths:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+    def _drain_wakeup_reader(self):
+        try:
+            while os.read(self._wakeup_reader, 4096):
+                pass
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                raise
+
+    def _stop_workers(self):
+        all_workers = self._workers | self._retiring_workers
+        for pid in all_workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        while all_workers:
+            for pid in list(all_workers):
+                try:
+                    finished_pid, _ = os.waitpid(pid, os.WNOHANG)
+                except ChildProcessError:
+                    finished_pid = pid
+
+                if finished_pid:
+                    all_workers.discard(pid)
+
+            if not all_workers:
+                break
+
+            if time.monotonic() >= deadline:
+                for pid in all_workers:  # Workers that refuse to exit.
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    try:
+                        os.waitpid(pid, 0)
+                    except ChildProcessError:
+                        pass
+                break
+
+            time.sleep(0.05)
+
+        self._workers.clear()
+        self._retiring_workers.clear()
@@ -28,6 +28,7 @@ import futurefinity
 
 import sys
 import json
+import zlib
 import string
 import traceback
 import urllib.parse
@@ -682,10 +683,11 @@ class BaseHTTPConnectionController:
 
     def stream_received(self, incoming: HTTPIncomingMessage, data: bytes):
         """
-        Triggered when the stream of a message is received.
+        Triggered when a part of the body of a message is received.
 
         This will only be triggered when the message is detected as
-        a stream message.
+        a stream message. The data is the decoded body, the chunked encoding
+        and the content coding(gzip or deflate) of the body are removed.
         """
         raise NotImplementedError("You should override stream_received.")
 
@@ -700,8 +702,8 @@ class BaseHTTPConnectionController:
         """
         Triggered when a message is completely received.
 
-        This will not be triggered when the message is detected as
-        a stream message.
+        If the message is detected as a stream message, the body is not
+        stored in the message.
         """
         raise NotImplementedError("You should override message_received.")
 
@@ -747,6 +749,57 @@ class ConnectionEntityTooLarge(ConnectionParseError):
     pass
 
 
+class HTTPBodyDecompressor:
+    """
+    Decompress a message body that is encoded by gzip or deflate
+    incrementally.
+
+    :arg content_coding: the content coding of the body, `gzip`, `x-gzip`,
+      or `deflate`.
+    :arg max_length: the maximum length of the decompressed body, it raises a
+      `ConnectionEntityTooLarge` if the decompressed body exceeds it.
+    """
+    content_codings = ("gzip", "x-gzip", "deflate")
+
+    def __init__(self, content_coding: str, max_length: int):
+        if content_coding not in self.content_codings:
+            raise ValueError("Unsupported content coding %s." % content_coding)
+        self.content_coding = content_coding
+        self.max_length = max_length
+        self.decompressed_length = 0
+
+        # Detect the gzip or zlib header automatically.
+        self._decompressobj = zlib.decompressobj(zlib.MAX_WBITS | 32)
+
+    def decompress(self, data: bytes) -> bytes:
+        """
+        Decompress a part of the body.
+
+        It raises a `ConnectionBadMessage` if the data is not valid.
+        """
+        try:
+            decompressed = self._decompressobj.decompress(
+                data, self.max_length - self.decompressed_length + 1)
+        except zlib.error as e:
+            raise ConnectionBadMessage("Bad Compressed Body.") from e
+
+        self.decompressed_length += len(decompressed)
+        if (self.decompressed_length > self.max_length or
+                self._decompressobj.unconsumed_tail):
+            raise ConnectionEntityTooLarge("The body is too large.")
+
+        return decompressed
+
+    def finish(self):
+        """
+        Check if the compressed body is complete.
+
+        It raises a `ConnectionBadMessage` if the body is truncated.
+        """
+        if not self._decompressobj.eof:
+            raise ConnectionBadMessage("Bad Compressed Body.")
+
+
 class HTTPv1Connection:
     """
     FutureFinity HTTP v1 Connection Class.
@@ -770,6 +823,7 @@ class HTTPv1Connection:
 
         self.max_initial_length = _MAX_INITIAL_LENGTH
         self.max_body_length = _MAX_BODY_LENGTH
+        self.max_decompressed_body_length = _MAX_BODY_LENGTH
 
         self._pending_bytes = bytearray()
 
@@ -782,8 +836,10 @@ class HTTPv1Connection:
 
         self._body_length = None
         self._next_chunk_length = None
+        self._received_body_length = 0
 
         self._pending_body = b""
+        self._body_decompressor = None
 
         self._parsed_incoming_info = {}
         self.incoming = None
@@ -803,6 +859,18 @@ class HTTPv1Connection:
             return self._use_keep_alive
         return True
 
+    @property
+    def _is_idle(self):
+        """
+        Return `True` if the connection is waiting for a new message, and
+        nothing of the new message has been received.
+        """
+        if self.stage is _CONN_INIT:
+            return True
+        if self.stage is _CONN_INITIAL_WAITING and not self._pending_bytes:
+            return True
+        return False
+
     def _parse_initial(self):
         initial_end = self._pending_bytes.find(_CRLF_BYTES_MARK * 2)
 
@@ -911,11 +979,11 @@ class HTTPv1Connection:
 
             if self._next_chunk_length == 0:
                 del self._pending_bytes[:2]
-                self.incoming.body = self._pending_body
-                self.stage = _CONN_MESSAGE_PARSED
+                self._finish_body()
                 return  # Parse Finished.
 
-            self._pending_body += self._pending_bytes[:self._next_chunk_length]
+            self._body_received(
+                ensure_bytes(self._pending_bytes[:self._next_chunk_length]))
             del self._pending_bytes[:self._next_chunk_length + 2]
             self._body_length += self._next_chunk_length
             self._next_chunk_length = None
@@ -939,20 +1007,74 @@ class HTTPv1Connection:
         if self._body_length > self.max_body_length:
             raise ConnectionEntityTooLarge("The body is too large.")
 
-        if len(self._pending_bytes) < self._body_length:
-            return  # Data not enough, waiting.
+        if self.stage is _CONN_STREAMED:
+            # Pass the received part of the body to the controller.
+            received_length = min(
+                len(self._pending_bytes),
+                self._body_length - self._received_body_length)
+            if received_length:
+                self._received_body_length += received_length
+                self._body_received(
+                    ensure_bytes(self._pending_bytes[:received_length]))
+                del self._pending_bytes[:received_length]
+
+            if self._received_body_length < self._body_length:
+                return  # Data not enough, waiting.
+
+        else:
+            if len(self._pending_bytes) < self._body_length:
+                return  # Data not enough, waiting.
+
+            self._body_received(
+                ensure_bytes(self._pending_bytes[:self._body_length]))
+            del self._pending_bytes[:self._body_length]
+
+        self._finish_body()
+
+    def _body_received(self, data: bytes):
+        if self._body_decompressor is not None:
+            data = self._body_decompressor.decompress(data)
 
-        self._pending_body = ensure_bytes(
-            self._pending_bytes[:self._body_length])
+        if self.stage is _CONN_STREAMED:
+            if data:
+                self.controller.stream_received(self.incoming, data)
+        else:
+            self._pending_body += data
 
-        del self._pending_bytes[:self._body_length]
+    def _finish_body(self):
+        if self._body_decompressor is not None:
+            self._body_decompressor.finish()
+            if "content-length" in self.incoming.headers:
+                self.incoming.headers["content-length"] = str(
+                    self._body_decompressor.decompressed_length)
 
         self.incoming.body = self._pending_body
         self.stage = _CONN_MESSAGE_PARSED
 
-    def data_received(self, data: bytes):
+    def _create_body_decompressor(self):
+        """
+        Create a decompressor for the request body if the body is encoded by
+        gzip or deflate, the content-encoding header will be removed as the
+        body will be decompressed.
+        """
+        if self.is_client or not self.incoming._body_expected:
+            return
+
+        content_coding = self.incoming.headers.get_first(
+            "content-encoding", "").strip().lower()
+        if content_coding not in HTTPBodyDecompressor.content_codings:
+            return
+
+        del self.incoming.headers["content-encoding"]
+        self._body_decompressor = HTTPBodyDecompressor(
+            content_coding, max_length=self.max_decompressed_body_length)
+
+    def data_received(self, data: Union[bytes, memoryview]):
         """
         Trigger this function when data is received from the remote.
+
+        The data may be a memoryview of a buffer that is reused after this
+        function returns, so it must be copied if it is kept.
         """
         if not data:
             return  # Nothing received, nothing is going to happen.
@@ -968,6 +1090,19 @@ class HTTPv1Connection:
                 self.stage = _CONN_MESSAGE_PARSED
             self.controller.error_received(self.incoming, sys.exc_info())
 
+    def detach(self) -> bytes:
+        """
+        Stop parsing the incoming data, and return the bytes that have been
+        received but not parsed.
+
+        This is used when the connection is upgraded to another protocol,
+        the controller should pass the returned bytes and the data received
+        later to the new protocol.
+        """
+        pending_bytes = bytes(self._pending_bytes)
+        self._pending_bytes.clear()
+        return pending_bytes
+
     def _parse_incoming_message(self):
         self.controller.cancel_timeout_handler()
 
@@ -979,16 +1114,17 @@ class HTTPv1Connection:
             self._parse_initial()
 
         if self.stage is _CONN_INITIAL_PARSED:
+            self._create_body_decompressor()
             self.controller.initial_received(self.incoming)
 
-            if self.controller.use_stream:
-                self.stage = _CONN_STREAMED
-
-            elif not self.incoming._body_expected:
+            if not self.incoming._body_expected:
                 self.stage = _CONN_MESSAGE_PARSED
 
             else:
-                self.stage = _CONN_BODY_WAITING
+                if self.controller.use_stream:
+                    self.stage = _CONN_STREAMED
+                else:
+                    self.stage = _CONN_BODY_WAITING
                 if not self.incoming._is_chunked_body:
                     if (self.incoming._expected_content_length == -1 and
                        not self.is_client):
@@ -996,13 +1132,7 @@ class HTTPv1Connection:
                             "Method Request a body, "
                             "but we cannot find a way to detect body length.")
 
-        if self.stage is _CONN_STREAMED:
-            self.controller.stream_received(self.incoming,
-                                            ensure_bytes(self._pending_bytes))
-            self._pending_bytes.clear()
-            return
-
-        if self.stage is _CONN_BODY_WAITING:
+        if self.stage in (_CONN_BODY_WAITING, _CONN_STREAMED):
             self._parse_body()
 
         if self.stage is _CONN_MESSAGE_PARSED:
@@ -1017,9 +1147,14 @@ class HTTPv1Connection:
     def write_initial(
         self, http_version: Optional[int]=None, method: str="GET",
             path: str="/", status_code: int=200,
-            headers: Optional[HTTPHeaders]=None):
+            headers: Optional[HTTPHeaders]=None,
+            prebuilt_headers: bytes=b""):
         """
         Write the initial to remote.
+
+        :arg prebuilt_headers: The header lines that are already assembled,
+          they will be written after the headers. They should not contain
+          the ``Connection`` and the ``Transfer-Encoding`` header.
         """
         initial = b""
 
@@ -1088,6 +1223,7 @@ class HTTPv1Connection:
                 self._outgoing_chunked_body = False
 
         initial += headers.assemble()
+        initial += prebuilt_headers
 
         initial += _CRLF_BYTES_MARK
 
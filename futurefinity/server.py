@@ -23,7 +23,7 @@ right RequestHandler and make response to client.
 
 from futurefinity.utils import ensure_str, ensure_bytes, FutureFinityError
 
-from typing import Optional
+from typing import Optional, Union, List, Sequence
 
 import futurefinity
 
@@ -31,7 +31,10 @@ from futurefinity import protocol
 
 import asyncio
 
+import os
 import ssl
+import stat
+import socket
 
 
 class ServerError(FutureFinityError):
@@ -43,15 +46,150 @@ class ServerError(FutureFinityError):
     pass
 
 
-class HTTPServer(asyncio.Protocol, protocol.BaseHTTPConnectionController):
+def set_listening_socket_options(sock: socket.socket,
+                                 tcp_defer_accept: Optional[int]=None,
+                                 tcp_fastopen: Optional[int]=None,
+                                 send_buffer_size: Optional[int]=None,
+                                 recv_buffer_size: Optional[int]=None):
+    """
+    Set the options of a listening socket.
+
+    The options that are not supported by the platform will be ignored.
+
+    :arg tcp_defer_accept: Only accept a connection after the data arrives or
+      this number of seconds passes(``TCP_DEFER_ACCEPT``, Linux only).
+    :arg tcp_fastopen: Enable TCP Fast Open with the maximum length of pending
+      fast open requests(``TCP_FASTOPEN``).
+    :arg send_buffer_size: The size of the send buffer(``SO_SNDBUF``). It is
+      set on the listening socket so the accepted sockets inherit it before
+      the TCP handshake completes.
+    :arg recv_buffer_size: The size of the receive buffer(``SO_RCVBUF``). It
+      is set on the listening socket so the accepted sockets inherit it
+      before the TCP handshake completes.
+    """
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        if tcp_defer_accept is not None and hasattr(socket,
+                                                    "TCP_DEFER_ACCEPT"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_DEFER_ACCEPT,
+                            tcp_defer_accept)
+
+        if tcp_fastopen is not None and hasattr(socket, "TCP_FASTOPEN"):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_FASTOPEN,
+                            tcp_fastopen)
+
+    if send_buffer_size is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, send_buffer_size)
+
+    if recv_buffer_size is not None:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, recv_buffer_size)
+
+
+def get_listening_addresses(
+        port: int, address: Union[str, Sequence[str], None]) -> List[tuple]:
+    """
+    Resolve the addresses to listen to, return a list of
+    ``(family, type, proto, sockaddr)`` tuples without duplications.
+
+    :arg address: An address, a list of addresses, or `None` for all the
+      interfaces.
+    """
+    if address is None or isinstance(address, str):
+        addresses = [address]
+    else:
+        addresses = address
+
+    sockaddrs = []
+    for address in addresses:
+        for family, sock_type, proto, _, sockaddr in socket.getaddrinfo(
+                address or None, port, socket.AF_UNSPEC, socket.SOCK_STREAM,
+                0, socket.AI_PASSIVE):
+            if (family, sock_type, proto, sockaddr) not in sockaddrs:
+                sockaddrs.append((family, sock_type, proto, sockaddr))
+    return sockaddrs
+
+
+def create_listening_socket(family: int, sock_type: int, proto: int,
+                            sockaddr: tuple, backlog: int=128,
+                            reuse_port: bool=False,
+                            **options) -> socket.socket:
+    """
+    Create a non-blocking socket that is bound to the sockaddr and listening.
+
+    The options of `set_listening_socket_options` are set before the socket
+    is bound and starts listening, so the accepted sockets inherit them.
+    """
+    sock = socket.socket(family, sock_type, proto)
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        if family == socket.AF_INET6:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_V6ONLY, 1)
+        set_listening_socket_options(sock, **options)
+        sock.bind(sockaddr)
+        sock.listen(backlog)
+        sock.setblocking(False)
+    except:
+        sock.close()
+        raise
+    return sock
+
+
+def create_unix_listening_socket(path: str, mode: Optional[int]=None,
+                                 backlog: int=128) -> socket.socket:
+    """
+    Create a non-blocking unix domain socket that is bound to the path and
+    listening.
+
+    The stale socket file at the path will be removed before binding, and the
+    permission bits are set before the socket starts listening, so no
+    connection can be accepted with the permission of the umask.
+    """
+    try:
+        if stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+    except FileNotFoundError:
+        pass
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.bind(path)
+        if mode is not None:
+            os.chmod(path, mode)
+        sock.listen(backlog)
+        sock.setblocking(False)
+    except:
+        sock.close()
+        raise
+    return sock
+
+
+# BufferedProtocol is only available in Python 3.7 or higher.
+_BaseProtocol = getattr(asyncio, "BufferedProtocol", asyncio.Protocol)
+
+
+class HTTPServer(_BaseProtocol, protocol.BaseHTTPConnectionController):
     """
     FutureFinity HTTPServer Class.
 
+    When `asyncio.BufferedProtocol` is available, the event loop reads the
+    data into a buffer preallocated for each connection, instead of creating
+    a new bytes object for each read.
+
     :arg allow_keep_alive: Default: `True`. Turn it to `False` if you want to
       disable keep alive connection for `HTTP/1.1`.
+    :arg tcp_nodelay: Set ``TCP_NODELAY`` on the accepted socket.
+      Default: `None`, which keeps the default of the event loop.
+    :arg tcp_keepalive: Set ``SO_KEEPALIVE`` on the accepted socket.
+      Default: `None`, which keeps the default of the system.
+    :arg read_buffer_size: Default: `65536`. The size of the buffer that the
+      event loop reads into.
     """
-    def __init__(self, *args, allow_keep_alive: bool=True, **kwargs):
-        asyncio.Protocol.__init__(self)
+    def __init__(self, *args, allow_keep_alive: bool=True,
+                 tcp_nodelay: Optional[bool]=None,
+                 tcp_keepalive: Optional[bool]=None,
+                 read_buffer_size: int=65536, **kwargs):
+        _BaseProtocol.__init__(self)
         protocol.BaseHTTPConnectionController.__init__(self)
         self.transport = None
         self.use_tls = False
@@ -60,6 +198,12 @@ class HTTPServer(asyncio.Protocol, protocol.BaseHTTPConnectionController):
 
         self.allow_keep_alive = allow_keep_alive
 
+        self.tcp_nodelay = tcp_nodelay
+        self.tcp_keepalive = tcp_keepalive
+
+        self.read_buffer_size = read_buffer_size
+        self._read_buffer = None
+
         self.sockname = None
         self.peername = None
         self.direct_receiver = None
@@ -67,13 +211,34 @@ class HTTPServer(asyncio.Protocol, protocol.BaseHTTPConnectionController):
         self.default_timeout_length = 10
         self._timeout_handler = None
 
+        self._writing_paused = False
+        self._drain_waiter = None
+
+    def set_socket_options(self):
+        """
+        Set the options of the accepted socket.
+        """
+        sock = self.transport.get_extra_info("socket")
+        if sock is None:
+            return
+
+        if sock.family in (socket.AF_INET, socket.AF_INET6):
+            if self.tcp_nodelay is not None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                                int(self.tcp_nodelay))
+
+            if self.tcp_keepalive is not None:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE,
+                                int(self.tcp_keepalive))
+
     def connection_made(self, transport: asyncio.Transport):
         self.transport = transport
-        context = self.transport.get_extra_info("sslcontext", None)
-        if context:
+        self.set_socket_options()
+        ssl_object = self.transport.get_extra_info("ssl_object", None)
+        if ssl_object:
             self.use_tls = True
             if ssl.HAS_ALPN:  # NPN will not be supported
-                alpn_protocol = context.selected_alpn_protocol()
+                alpn_protocol = ssl_object.selected_alpn_protocol()
                 if alpn_protocol in ("h2", "h2-14", "h2-15", "h2-16", "h2-17"):
                     self.use_h2 = True
                 elif alpn_protocol is not None:
@@ -81,7 +246,8 @@ class HTTPServer(asyncio.Protocol, protocol.BaseHTTPConnectionController):
                     raise ServerError("Unsupported Protocol")
 
         self.sockname = self.transport.get_extra_info("sockname")
-        self.peername = self.transport.get_extra_info("peername")
+        # The peer of a unix domain socket has no name.
+        self.peername = self.transport.get_extra_info("peername") or None
 
         if self.use_h2:
             self.transport.close()
@@ -103,9 +269,56 @@ class HTTPServer(asyncio.Protocol, protocol.BaseHTTPConnectionController):
             self._timeout_handler.cancel()
         self._timeout_handler = None
 
-    def data_received(self, data: bytes):
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._read_buffer is None:
+            self._read_buffer = memoryview(bytearray(self.read_buffer_size))
+        return self._read_buffer
+
+    def buffer_updated(self, nbytes: int):
+        # The connection copies what it needs from the buffer, the buffer
+        # will be reused by the next read.
+        self.data_received(self._read_buffer[:nbytes])
+
+    def data_received(self, data: Union[bytes, memoryview]):
+        if self.direct_receiver is not None:
+            # The connection is upgraded to another protocol.
+            self.direct_receiver(data)
+            return
         self.connection.data_received(data)
 
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def drain(self):
+        """
+        Wait until the write buffer of the transport is drained below the
+        low-water mark.
+
+        **This is a Coroutine.**
+
+        It raises a `ConnectionResetError` if the connection is lost.
+        """
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionResetError("Connection lost.")
+        if not self._writing_paused:
+            return
+        if self._drain_waiter is None or self._drain_waiter.done():
+            self._drain_waiter = self._loop.create_future()
+        await self._drain_waiter
+
     def connection_lost(self, exc: Optional[tuple]):
         self.connection.connection_lost(exc)
         self.cancel_timeout_handler()
+
+        waiter = self._drain_waiter
+        self._drain_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_exception(ConnectionResetError("Connection lost."))
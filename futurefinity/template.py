@@ -114,3 +114,36 @@ class TemplateLoader:
             self._template_cache[template_name] = parsed_tpl
 
         return parsed_tpl
+
+    def preload_templates(self):
+        """
+        Load and parse all the templates in the template_path into the cache.
+
+        This is useful before forking worker processes, so the parsed
+        templates can be shared by all the workers. It does nothing if
+        ``cache_template`` is ``False``.
+        """
+        if not self.cache_template:
+            return
+
+        for current_path in self.template_path:
+            current_path = os.path.realpath(current_path)
+            for dir_path, dir_names, file_names in os.walk(current_path):
+                for file_name in file_names:
+                    file_path = os.path.join(dir_path, file_name)
+                    template_name = os.path.relpath(file_path, current_path)
+                    template_name = template_name.replace(os.path.sep, "/")
+
+                    if template_name in self._template_cache:
+                        # Templates in the former paths have a higher
+                        # priority.
+                        continue
+
+                    try:
+                        template_content = self.load_template_file_content(
+                            file_path)
+                    except UnicodeDecodeError:
+                        continue  # Not a template.
+
+                    self._template_cache[template_name] = Template(
+                        template_content)
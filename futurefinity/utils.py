@@ -19,16 +19,25 @@
 ``futurefinity.utils`` contains a series of utilities for common use.
 """
 
-from typing import Any, Optional, Union
+from typing import Any, Optional, Union, Callable, Hashable
+
+import asyncio
 
 import time
 import struct
 import numbers
 import calendar
 import datetime
+import functools
 import email.utils
+import collections
 import collections.abc
 
+try:  # Try to load uvloop.
+    import uvloop
+except ImportError:  # Name the uvloop as None.
+    uvloop = None
+
 
 default_mark = object()
 
@@ -42,6 +51,35 @@ class FutureFinityError(Exception):
     pass
 
 
+def install_uvloop() -> bool:
+    """
+    Set the event loop policy to the one of uvloop if it is available, so
+    the event loops created later will be uvloop event loops.
+
+    Return `True` if uvloop is installed, or `False` if uvloop is not
+    available and asyncio's default event loop will be used.
+    """
+    if uvloop is None:
+        return False
+
+    if not isinstance(asyncio.get_event_loop_policy(), uvloop.EventLoopPolicy):
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def new_event_loop(use_uvloop: bool=False) -> asyncio.AbstractEventLoop:
+    """
+    Create a new event loop.
+
+    :arg use_uvloop: Create a uvloop event loop if uvloop is available.
+      Default: `False`, which creates an event loop by the current event loop
+      policy.
+    """
+    if use_uvloop and uvloop is not None:
+        return uvloop.new_event_loop()
+    return asyncio.new_event_loop()
+
+
 def ensure_bytes(var: Any) -> bytes:
     """
     Try to convert passed variable to a bytes object.
@@ -219,3 +257,225 @@ def format_timestamp(ts: Union[numbers.Real, tuple, time.struct_time,
     else:
         raise TypeError("unknown timestamp type: %r" % ts)
     return ensure_str(email.utils.formatdate(ts, usegmt=True))
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """
+    Parse a HTTP Protocol timestamp to a unix timestamp.
+
+    Return `None` if the timestamp is invalid.
+    """
+    parsed = email.utils.parsedate_tz(value)
+    if parsed is None:
+        return None
+    try:
+        return email.utils.mktime_tz(parsed)
+    except (OverflowError, ValueError):
+        return None
+
+
+class CachedCoroutineFunction:
+    """
+    A wrapper of a coroutine function that caches its results.
+
+    The results are cached by the arguments, the concurrent calls with the
+    same arguments share one call of the wrapped function, and the
+    exceptions are not cached.
+
+    This is not thread-safe, the calls should be made from the threads
+    running the event loops only. The cached results can be shared between
+    event loops, but concurrent calls are only shared on the same loop.
+
+    :arg func: The coroutine function to be wrapped.
+    :arg ttl: The seconds that a result is cached for. Default: `None`, which
+      caches the result until it is evicted or invalidated.
+    :arg max_size: The maximum number of the cached results, the least
+      recently used results are evicted. Default: 128, `None` means no limit.
+    :arg key: A function that takes the arguments and returns a hashable key
+      of the call. Default: `None`, which uses all the arguments.
+
+    When it is used as a method, the default key does not include the
+    instance, so the results are shared by all the instances and the
+    instances are not kept alive by the cache. If the result depends on the
+    instance, pass a key function, which receives the instance as the first
+    argument.
+    """
+    def __init__(self, func: Callable, ttl: Optional[float]=None,
+                 max_size: Optional[int]=128,
+                 key: Optional[Callable]=None):
+        self._func = func
+        self._ttl = ttl
+        self._max_size = max_size
+        self._key_func = key
+
+        self._cache = collections.OrderedDict()
+        self._pending = {}
+
+        self.hits = 0
+        self.misses = 0
+
+        functools.update_wrapper(self, func)
+
+    @property
+    def size(self) -> int:
+        """
+        The number of the cached results.
+        """
+        return len(self._cache)
+
+    def make_key(self, *args, **kwargs) -> Hashable:
+        """
+        Return the cache key of a call with the arguments.
+        """
+        if self._key_func is not None:
+            return self._key_func(*args, **kwargs)
+        return (args, tuple(sorted(kwargs.items(), key=lambda i: i[0])))
+
+    def invalidate(self, *args, **kwargs) -> bool:
+        """
+        Discard the cached result of a call with the arguments.
+
+        The result of the pending call with the arguments will not be cached.
+
+        Return `True` if there is a cached result or a pending call.
+        """
+        return self._discard(self.make_key(*args, **kwargs))
+
+    def _discard(self, key: Hashable) -> bool:
+        discarded = self._pending.pop(key, None) is not None
+        return self._cache.pop(key, None) is not None or discarded
+
+    def clear(self):
+        """
+        Discard all the cached results and reset the statistics.
+        """
+        self._cache.clear()
+        self._pending.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _get_cached(self, key: Hashable) -> Any:
+        entry = self._cache.get(key, None)
+        if entry is None:
+            return default_mark
+
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._cache[key]
+            return default_mark
+
+        self._cache.move_to_end(key)
+        return value
+
+    def _set_cached(self, key: Hashable, value: Any):
+        if self._ttl is None:
+            expires_at = None
+        else:
+            expires_at = time.monotonic() + self._ttl
+
+        self._cache[key] = (expires_at, value)
+        self._cache.move_to_end(key)
+
+        if self._max_size is not None:
+            while len(self._cache) > self._max_size:
+                self._cache.popitem(last=False)
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        return await self._call(self.make_key(*args, **kwargs), args, kwargs)
+
+    async def _call(self, key: Hashable, args: tuple, kwargs: dict) -> Any:
+        loop = asyncio.get_event_loop()
+
+        while True:
+            value = self._get_cached(key)
+            if value is not default_mark:
+                self.hits += 1
+                return value
+
+            pending = self._pending.get(key, None)
+            if pending is None or pending[0] is not loop:
+                break
+
+            future = pending[1]
+            try:
+                value = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                continue  # The shared call is cancelled, try again.
+
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        pending = (loop, loop.create_future())
+        self._pending[key] = pending
+        future = pending[1]
+
+        try:
+            value = await self._func(*args, **kwargs)
+        except BaseException as e:
+            if self._pending.get(key, None) is pending:
+                del self._pending[key]
+
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark the exception as retrieved.
+            raise
+
+        if self._pending.get(key, None) is pending:
+            del self._pending[key]
+            self._set_cached(key, value)
+        future.set_result(value)
+        return value
+
+    def __get__(self, obj: Any, objtype: Optional[type]=None) -> Any:
+        if obj is None:
+            return self
+        return _BoundCachedCoroutineFunction(self, obj)
+
+
+class _BoundCachedCoroutineFunction:
+    """
+    A `CachedCoroutineFunction` bound to an instance, the instance is not a
+    part of the default key.
+    """
+    def __init__(self, func: CachedCoroutineFunction, obj: Any):
+        self.__func__ = func
+        self.__self__ = obj
+
+    def make_key(self, *args, **kwargs) -> Hashable:
+        if self.__func__._key_func is not None:
+            return self.__func__.make_key(self.__self__, *args, **kwargs)
+        return self.__func__.make_key(*args, **kwargs)
+
+    def invalidate(self, *args, **kwargs) -> bool:
+        return self.__func__._discard(self.make_key(*args, **kwargs))
+
+    async def __call__(self, *args, **kwargs) -> Any:
+        return await self.__func__._call(
+            self.make_key(*args, **kwargs), (self.__self__, ) + args, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.__func__, name)
+
+
+def cached_coroutine(ttl: Optional[float]=None, max_size: Optional[int]=128,
+                     key: Optional[Callable]=None) -> Callable:
+    """
+    Decorate a coroutine function to cache its results, see
+    `CachedCoroutineFunction` for the arguments.
+
+    Example::
+
+        @cached_coroutine(ttl=60, key=lambda self, name: name)
+        async def get_flag(self, name):
+            ...
+    """
+    def decorator(func: Callable) -> CachedCoroutineFunction:
+        return CachedCoroutineFunction(
+            func, ttl=ttl, max_size=max_size, key=key)
+
+    return decorator
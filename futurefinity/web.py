@@ -45,30 +45,52 @@ Finally, listen to the port you want, and start asyncio event loop::
 """
 
 from futurefinity.utils import (ensure_str, ensure_bytes, format_timestamp,
-                                default_mark)
+                                parse_timestamp, default_mark, install_uvloop,
+                                new_event_loop, uvloop)
 from futurefinity import server
 from futurefinity import routing
 from futurefinity import protocol
 from futurefinity import template
 from futurefinity import security
+from futurefinity import websocket
 
 from types import FunctionType, CoroutineType
-from typing import Optional, Union, Mapping, List
+from typing import (Optional, Union, Mapping, Sequence, List, Tuple,
+                    BinaryIO)
 
 import futurefinity
 
 import asyncio
 
+import io
 import os
 import re
 import ssl
 import sys
+import glob
+import gzip
 import hmac
 import html
+import mmap
+import stat
+import time
+import zlib
+import base64
+import socket
+import numbers
 import hashlib
+import binascii
+import datetime
 import functools
 import mimetypes
 import traceback
+import collections
+import urllib.parse
+
+try:  # Try to load brotli.
+    import brotli
+except ImportError:  # Name the brotli as None.
+    brotli = None
 
 
 class HTTPError(server.ServerError):
@@ -99,7 +121,33 @@ class ApplicationHTTPServer(server.HTTPServer):
         server.HTTPServer.__init__(self, *args, **kwargs)
 
         self._request_handlers = {}
+        self._cached_responses = {}
         self._futures = {}
+        self._requests_received = 0
+
+    def connection_made(self, transport: asyncio.Transport):
+        server.HTTPServer.connection_made(self, transport)
+        self.app._connections.add(self)
+
+        if self.app._shutting_down:
+            self.close_when_idle()
+
+    def close_when_idle(self):
+        """
+        Stop keeping the connection alive, and close the connection if no
+        request is being handled.
+
+        If a request is being handled, the connection will be closed after
+        the response is finished. A connection that has not sent any request
+        yet is kept open to receive its first request, as the client may have
+        sent it before the connection is accepted, and it will be closed
+        after the response or by the timeout handler.
+        """
+        self.connection.allow_keep_alive = False
+        if not self._requests_received:
+            return
+        if not self._futures and self.connection._is_idle:
+            self.transport.close()
 
     def stream_received(self, incoming: protocol.HTTPIncomingRequest,
                         data: bytes):
@@ -130,6 +178,11 @@ class ApplicationHTTPServer(server.HTTPServer):
         request_handler.finish()
 
     def initial_received(self, incoming: protocol.HTTPIncomingRequest):
+        if self._get_cached_response(incoming):
+            self._requests_received += 1
+            self.use_stream = False
+            return
+
         matched_obj = self.app.handlers.find(incoming.path)
         request_handler = matched_obj.handler(
             app=self.app,
@@ -138,11 +191,73 @@ class ApplicationHTTPServer(server.HTTPServer):
             path_args=matched_obj.path_args,
             path_kwargs=matched_obj.path_kwargs
         )
+        self._requests_received += 1
         self._request_handlers[incoming] = request_handler
-        if request_handler.stream_handler:
-            self.use_stream = True
+        self.use_stream = request_handler.stream_handler
+
+        if isinstance(request_handler, WebSocketHandler):
+            request_handler.prepare_websocket()
+
+    def _get_cached_response(self,
+                             incoming: protocol.HTTPIncomingRequest) -> bool:
+        """
+        Look up the response of the request in the response cache of the
+        application, and return `True` if it is found.
+        """
+        response_cache = self.app.response_cache
+        if response_cache is None:
+            return False
+        if incoming.method not in ("GET", "HEAD") or incoming._body_expected:
+            return False
+        if "no-cache" in _parse_cache_control(
+                incoming.headers.get_first("cache-control", "")):
+            return False
+
+        cached_response = response_cache.get(incoming)
+        if cached_response is None:
+            return False
+
+        self._cached_responses[incoming] = cached_response
+        return True
+
+    def write_cached_response(self, incoming: protocol.HTTPIncomingRequest,
+                              cached_response: "CachedResponse"):
+        """
+        Respond the request with a response from the response cache.
+        """
+        headers = protocol.HTTPHeaders()
+        status_code = cached_response.status_code
+        prebuilt_headers = cached_response.header_block
+
+        etag = cached_response.etag
+        if_none_match = incoming.headers.get_first("if-none-match")
+        if etag is not None and if_none_match is not None:
+            if etag.startswith("W/"):
+                etag = etag[2:]
+            if _match_etag(etag, if_none_match, weak=True):
+                status_code = 304
+                prebuilt_headers = b""
+                headers["etag"] = cached_response.etag
+
+        headers["date"] = format_timestamp()
+        headers["age"] = str(cached_response.age)
+
+        self.connection.write_initial(
+            http_version=incoming.http_version, method=incoming.method,
+            status_code=status_code, headers=headers,
+            prebuilt_headers=prebuilt_headers)
+        if status_code != 304 and incoming.method != "HEAD":
+            self.connection.write_body(cached_response.body)
+        self.connection.finish_writing()
 
     def message_received(self, incoming: protocol.HTTPIncomingRequest):
+        self.app._handled_requests += 1
+
+        cached_response = self._cached_responses.pop(incoming, None)
+        if cached_response is not None:
+            self.write_cached_response(incoming, cached_response)
+            return
+
         def _future_done(coro_future):
             if incoming in self._futures.keys():
                 del self._request_handlers[incoming]
@@ -160,6 +275,21 @@ class ApplicationHTTPServer(server.HTTPServer):
             coro_future.cancel()
 
         server.HTTPServer.connection_lost(self, exc)
+        self.app._connections.discard(self)
+
+
+class _FlushWaiter:
+    """
+    The awaitable returned by `RequestHandler.flush`, awaiting it waits until
+    the write buffer of the transport is drained.
+    """
+    __slots__ = ("_server", )
+
+    def __init__(self, server: server.HTTPServer):
+        self._server = server
+
+    def __await__(self):
+        return self._server.drain().__await__()
 
 
 class RequestHandler:
@@ -178,6 +308,49 @@ class RequestHandler:
 
     stream_handler = False
 
+    head_without_body = False
+    """
+    If `True`, the body written to the response of a HEAD request is not
+    buffered, only its length is counted for the content-length header, and
+    the body is not hashed for the etag. The handler functions can also check
+    `RequestHandler.is_head_request` to skip generating the body.
+    """
+
+    coalesce_requests = False
+    """
+    If `True`, the concurrent identical GET requests are coalesced: the first
+    request calls the handler function, and the others wait for it and
+    respond with the same status code, headers and body. The requests are
+    identical if they have the same host, path, query, and the same values of
+    the headers in `coalesce_key_headers`, see `get_coalescing_key`.
+
+    The response is shared before it is compressed, each request negotiates
+    the content coding itself. The response is not shared if it sets cookies
+    or it is flushed before it is finished, the waiting requests will call
+    the handler function themselves.
+    """
+
+    coalesce_key_headers = ()
+    """
+    The names of the request headers that the response depends on, such as
+    ``("accept-language", "cookie")``, for `coalesce_requests`.
+    """
+
+    etag_strategy = None
+    """
+    The etag strategy of the handler, see `RequestHandler.compute_etag`. If it
+    is `None`, the `etag_strategy` application setting will be used.
+    """
+
+    compressible_types = ("text/", "application/json",
+                          "application/javascript", "application/xml",
+                          "application/xhtml+xml", "image/svg+xml")
+    """
+    The content types that will be compressed if `compress_response` is
+    enabled in the application settings, the content types that start with
+    one of them or end with ``+json`` or ``+xml`` are compressible.
+    """
+
     def __init__(self, app: "Application",
                  server: ApplicationHTTPServer,
                  request: protocol.HTTPIncomingRequest,
@@ -206,6 +379,21 @@ class RequestHandler:
         self._body_written = False
         self._finished = False
 
+        self._prebuilt_headers = b""
+
+        self._compression_prepared = False
+        self._compressor = None
+        self._compressed_body = None
+        self._finishing_task = None
+
+        self._computed_etag = default_mark
+        self._validator_set = False
+        self._head_body_length = 0
+        self._head_metadata_written = False
+
+        self._coalescing_key = None
+        self._coalescing_future = None
+
     def get_link_arg(self, name: str,
                      default: Union[str, object]=default_mark) -> str:
         """
@@ -478,6 +666,14 @@ class RequestHandler:
         self.set_csrf_value()
         return self.__csrf_value
 
+    @property
+    def is_head_request(self) -> bool:
+        """
+        Return `True` if the request is a HEAD request, the body of the
+        response will not be sent.
+        """
+        return self.request.method == "HEAD"
+
     @property
     def csrf_form_html(self) -> str:
         """
@@ -498,10 +694,42 @@ class RequestHandler:
             raise HTTPError(
                 500, "Cannot write to request when it has already finished.")
         self._body_written = True
+        if self.head_without_body and self.is_head_request:
+            if clear_text:
+                self._head_body_length = 0
+            self._head_body_length += len(ensure_bytes(text))
+            return
         if clear_text:
             self._response_body.clear()
         self._response_body += ensure_bytes(text)
 
+    def static_url(self, path: str, include_hash: bool=True) -> str:
+        """
+        Return the url of the static file at the path.
+
+        The content hash of the file is appended to the url as the `v` link
+        argument, so the file can be cached by the browsers forever and the
+        url changes when the file is changed. The hashes are computed by
+        `Application.warmup` or in the default executor of the event loop, the
+        url is returned without the hash until the hash of the file is ready.
+
+        :arg path: the path of the file relative to the static path.
+        :arg include_hash: Default: `True`. Append the content hash to the url.
+          If the file cannot be found, the url without the hash is returned.
+        """
+        static_path = self.settings.get("static_path", "static")
+        url = self.settings.get("static_url_prefix", "/static/") + \
+            path.lstrip("/")
+
+        if not include_hash:
+            return url
+
+        content_hash = self.app.static_file_cache.get_content_hash(
+            static_path, path.lstrip("/"), self.app._loop)
+        if content_hash is None:
+            return url
+        return url + "?v=" + content_hash
+
     def render_string(
      self, template_name: str,
      template_dict: Optional[Mapping[str, str]]=None) -> str:
@@ -515,8 +743,10 @@ class RequestHandler:
 
         template_args = {
             "handler": self,
-            "csrf_form_html": self.csrf_form_html
+            "csrf_form_html": self.csrf_form_html,
+            "static_url": self.static_url
         }
+        template_args.update(template_dict or {})
 
         if "template_path" not in self.settings.keys():
             raise ValueError(
@@ -524,7 +754,7 @@ class RequestHandler:
                 "Please provide template_path through Application Settings.")
 
         parsed_tpl = self.app.template_loader.load_template(template_name)
-        return parsed_tpl.render(**template_dict)
+        return parsed_tpl.render(**template_args)
 
     def render(
      self, template_name: str,
@@ -570,48 +800,194 @@ class RequestHandler:
                         "url": ensure_str(url)
                      })
 
-    def set_body_etag(self):
+    def get_etag_version(self) -> Optional[str]:
         """
-        Set etag header of response_body.
+        Return the version tag of the resource for the `version` etag
+        strategy, or `None` if the response should not have an etag.
+
+        Override this function to supply a version, such as the revision of a
+        database row, so the response body does not need to be hashed.
+        """
+        return None
+
+    def compute_etag(self) -> Optional[str]:
+        """
+        Compute the etag of the response by the etag strategy, which is the
+        `etag_strategy` attribute of the handler, or the `etag_strategy`
+        application setting if it is `None`:
+
+        - `strong`: the sha1 digest of the response body, this is the default.
+        - `weak`: a weak etag of the length and the crc32 checksum of the
+          response body, which is much faster to compute.
+        - `version`: the version tag returned by `get_etag_version`, the
+          response body is not hashed.
+        - `off`: no etag is set.
+
+        Return `None` if the response should not have an etag.
+
+        The `strong` and `weak` etags are only computed when they can be
+        used, see `RequestHandler.is_body_etag_needed`.
         """
-        if not hasattr(self, "__body_etag"):
+        strategy = self._get_etag_strategy()
+
+        if strategy == "off":
+            return None
+
+        if strategy == "version":
+            version = self.get_etag_version()
+            if version is None:
+                return None
+            return '"%s"' % version
+
+        if not self._response_body:
+            return None
+
+        if strategy == "weak":
+            return 'W/"%x-%x"' % (len(self._response_body),
+                                  zlib.crc32(self._response_body))
+
+        if strategy == "strong":
             sha1_hash_object = hashlib.sha1()
             sha1_hash_object.update(self._response_body)
+            return '"%s"' % sha1_hash_object.hexdigest()
+
+        raise ValueError("Unknown etag strategy %s." % strategy)
+
+    def _get_etag_strategy(self) -> str:
+        return self.etag_strategy or self.settings.get(
+            "etag_strategy", "strong")
+
+    def is_body_etag_needed(self) -> bool:
+        """
+        Return `True` if the etag of the response body should be computed.
 
-            self.__body_etag = '"%s"' % sha1_hash_object.hexdigest()
-            if self.__body_etag is not '""':
-                self.set_header("etag", self.__body_etag)
+        The etag of the response body is only useful if the request has an
+        if-none-match header, or the response will be cached by
+        `ResponseCache`, which revalidates the requests by it. The etag of
+        the `version` strategy does not hash the response body, so it is
+        always needed. It is never needed if the response has a validator
+        returned by `get_validator`.
+        """
+        if self._validator_set:
+            return False
+        if self._get_etag_strategy() == "version":
+            return True
+        if self.get_header("if-none-match", None) is not None:
+            return True
+
+        response_cache = self.app.response_cache
+        return response_cache is not None and response_cache.get_max_age(
+            self.request, self._status_code, self._headers) > 0
+
+    def set_body_etag(self):
+        """
+        Set etag header of response_body.
+        """
+        etag = self._body_etag
+        if etag:
+            self.set_header("etag", etag)
 
     @property
     def _body_etag(self) -> str:
-        self.set_body_etag()
-        return self.__body_etag
+        if self._computed_etag is default_mark:
+            self._computed_etag = self.compute_etag() or ""
+        return self._computed_etag
+
+    def get_validator(self, *args, **kwargs) -> Union[
+            str, numbers.Real, datetime.datetime, tuple, None]:
+        """
+        Return a cheap validator of the resource, it is called with the same
+        arguments as the handler function before the handler function of a
+        GET or HEAD request is called. It can be a coroutine function.
+
+        The validator can be an etag or a version tag(which will be quoted as
+        an etag), the last modified time as a timestamp or a datetime, or a
+        tuple of both. If the request has a matching if-none-match or
+        if-modified-since header, a 304 Not Modified response is sent and the
+        handler function will not be called. Otherwise, the validator is sent
+        with the response, and the response body will not be hashed.
+
+        Return `None` if there is no validator, this is the default.
+        """
+        return None
+
+    def set_validator(self, validator: Union[
+            str, numbers.Real, datetime.datetime, tuple]) -> Tuple[
+                Optional[str], Optional[float]]:
+        """
+        Set the etag and last-modified headers by the validator returned by
+        `get_validator`, and return the etag and the last modified timestamp.
+
+        The etag of the response body will not be computed after it is
+        called, even if the validator has no etag.
+        """
+        self._validator_set = True
+
+        if isinstance(validator, tuple):
+            etag, last_modified = validator
+        elif isinstance(validator, str):
+            etag, last_modified = validator, None
+        else:
+            etag, last_modified = None, validator
+
+        if etag is not None:
+            if not etag.startswith(("\"", "W/\"")):
+                etag = '"%s"' % etag
+            self.set_header("etag", etag)
+
+        if last_modified is not None:
+            last_modified = format_timestamp(last_modified)
+            self.set_header("last-modified", last_modified)
+            last_modified = parse_timestamp(last_modified)
+
+        return etag, last_modified
+
+    def check_not_modified(self, etag: Optional[str]=None,
+                           last_modified: Optional[float]=None) -> bool:
+        """
+        Return `True` if the client has a fresh copy of the resource with the
+        etag and the last modified timestamp, by the if-none-match header, or
+        the if-modified-since header if the if-none-match header is not
+        present.
+        """
+        if self.request.method not in ("GET", "HEAD"):
+            return False
+
+        if_none_match = self.get_header("if-none-match", None)
+        if if_none_match is not None:
+            if etag is None:
+                return False
+            if etag.startswith("W/"):
+                etag = etag[2:]
+            return _match_etag(etag, if_none_match, weak=True)
+
+        if_modified_since = self.get_header("if-modified-since", None)
+        if if_modified_since is not None and last_modified is not None:
+            since = parse_timestamp(if_modified_since)
+            if since is not None and int(last_modified) <= since:
+                return True
+
+        return False
 
     def check_body_etag(self) -> bool:
         """
-        Check etag header of response_body.
+        Return `True` if the if-none-match header of the request matches the
+        etag header, or the etag of the response body if no etag header is
+        set and `is_body_etag_needed` returns `True`. The etag of the response
+        body is computed at most once.
         """
-        computed_etag = ensure_bytes(self._body_etag)
-        etags = re.findall(
-            br'\*|(?:W/)?"[^"]*"',
-            ensure_bytes(self.get_header("if-none-match", ""))
-        )
-        if not computed_etag or not etags:
+        if_none_match = self.get_header("if-none-match", None)
+        if if_none_match is None:
             return False
 
-        match = False
-        if etags[0] == b'*':
-            match = True
-        else:
-            def value_validator(value):
-                if value.startswith(b'W/'):
-                    value = value[2:]
-                return value
-            for etag in etags:
-                if value_validator(etag) == value_validator(computed_etag):
-                    match = True
-                    break
-        return match
+        etag = self._headers.get_first("etag")
+        if etag is None and self.is_body_etag_needed():
+            etag = self._body_etag
+        if not etag:
+            return False
+        if etag.startswith("W/"):
+            etag = etag[2:]
+        return _match_etag(etag, if_none_match, weak=True)
 
     def write_initial(self):
         """
@@ -628,7 +1004,8 @@ class RequestHandler:
         """
         if self._initial_written:
             raise HTTPError(500, "Cannot write initial twice.")
-        if "content-type" not in self._headers.keys():
+        if ("content-type" not in self._headers.keys() and
+                not self._prebuilt_headers):
             self.set_header("content-type", "text/html; charset=utf-8;")
 
         if self.connection._can_keep_alive:
@@ -637,10 +1014,12 @@ class RequestHandler:
         else:
             self.set_header("connection", "Close")
 
-        if self._headers["connection"] == "Keep-Alive":
+        if (self._headers["connection"] == "Keep-Alive" and
+                "content-length" not in self._headers.keys() and
+                self._status_code not in (204, 304) and
+                not self._prebuilt_headers):
+            # The prebuilt headers always contain the content-length.
             self.set_header("transfer-encoding", "Chunked")
-            if "content-length" in self._headers.keys():
-                del self._headers["content-length"]
 
         if "date" not in self._headers.keys():
             self.set_header("date", format_timestamp())
@@ -651,29 +1030,180 @@ class RequestHandler:
             self.set_csrf_value()
 
         self.connection.write_initial(
-            http_version=self.http_version,
-            status_code=self._status_code, headers=self._headers)
+            http_version=self.http_version, method=self.request.method,
+            status_code=self._status_code, headers=self._headers,
+            prebuilt_headers=self._prebuilt_headers)
 
         self._initial_written = True
 
-    def flush(self):
+    def flush(self) -> _FlushWaiter:
+        """
+        Send the written response body to the remote, the initial will be
+        written first if it is not written yet.
+
+        If the response is compressed, the compressed data of the written body
+        will be sent, the compressor is kept for the next flush.
+
+        The data is sent immediately, the returned object can be awaited to
+        wait until the write buffer of the transport is drained, it raises a
+        `ConnectionResetError` if the connection is lost::
+
+            self.write(chunk)
+            await self.flush()
+        """
         if self._finished:
             raise HTTPError(
                 500, "Cannot Flush the request when it has already finished.")
 
+        self._resolve_coalesced_request(None)
+        self._flush(finishing=False)
+        return _FlushWaiter(self.server)
+
+    def _flush(self, finishing: bool):
+        complete = finishing and not self._initial_written
+
         if not self._initial_written:
+            if (self.is_head_request and finishing and
+                    not self._head_metadata_written and
+                    self._status_code not in (204, 304) and
+                    "content-length" not in self._headers and
+                    not self._prebuilt_headers):
+                if self.head_without_body:
+                    content_length = self._head_body_length
+                else:
+                    content_length = len(self._response_body)
+                self.set_header("content-length", str(content_length))
+
+            self._prepare_compression(finishing)
+            if self._compressor is not None:
+                etag = self._headers.get_first("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    # The etag of the uncompressed body is weak for the
+                    # compressed one.
+                    self.set_header("etag", "W/" + etag)
+
+            if finishing and self._compressor is not None:
+                if self._compressed_body is None:
+                    self._compressed_body = _compress_body(
+                        self._compressor, self._response_body)
+                self._compressor = None
+                self.set_header("content-length",
+                                str(len(self._compressed_body)))
+
             self.write_initial()
 
         if not self._body_written:
             raise HTTPError(500, "Body is not written.")
-        self.connection.write_body(self._response_body)
+
+        if self.is_head_request:
+            body = None  # The body of a HEAD response is never sent.
+        elif self._compressed_body is not None:
+            body, self._compressed_body = self._compressed_body, None
+        elif self._compressor is not None:
+            body = self._compressor.compress(self._response_body) + \
+                self._compressor.flush(
+                    zlib.Z_FINISH if finishing else zlib.Z_SYNC_FLUSH)
+        else:
+            body = self._response_body
+
+        if body is not None:
+            self.connection.write_body(body)
+            if complete and self.app.response_cache is not None:
+                self.app.response_cache.set(
+                    self.request, self._status_code, self._headers, body)
         self._response_body.clear()
 
+    def _prepare_compression(self, finishing: bool):
+        """
+        Decide whether the response should be compressed, set the related
+        headers and create the compressor if it should.
+
+        Only the complete responses that are not smaller than
+        `compress_min_size` and the streamed responses are compressed.
+        """
+        if self._compression_prepared:
+            return
+        self._compression_prepared = True
+
+        if not self.settings.get("compress_response", False):
+            return
+        if (self._status_code < 200 or self._status_code in (204, 304) or
+                self._prebuilt_headers or
+                "content-encoding" in self._headers or
+                self.request.method == "HEAD"):
+            return
+
+        content_type = self._headers.get_first(
+            "content-type", "text/html").split(";")[0].strip().lower()
+        if not (content_type.startswith(self.compressible_types) or
+                content_type.endswith(("+json", "+xml"))):
+            return
+
+        vary = self._headers.get_first("vary")
+        if vary is None:
+            self.set_header("vary", "Accept-Encoding")
+        elif "accept-encoding" not in vary.lower():
+            self.set_header("vary", vary + ", Accept-Encoding")
+
+        if finishing and len(self._response_body) < self.settings.get(
+                "compress_min_size", 1024):
+            return
+
+        codings = _parse_accept_encoding(
+            self.get_header("accept-encoding", ""))
+        content_coding = None
+        best_qvalue = 0.0
+        for coding in ("gzip", "deflate"):
+            qvalue = codings.get(coding, codings.get("*", 0.0))
+            if qvalue > best_qvalue:
+                content_coding, best_qvalue = coding, qvalue
+        if content_coding is None:
+            return
+
+        self.set_header("content-encoding", content_coding)
+        self.clear_header("content-length")
+        wbits = zlib.MAX_WBITS
+        if content_coding == "gzip":
+            wbits |= 16  # Write the gzip header and trailer.
+        self._compressor = zlib.compressobj(
+            self.settings.get("compress_level", 6), zlib.DEFLATED, wbits)
+
+    def _should_compress_in_executor(self) -> bool:
+        """
+        Return `True` if the complete response body should be compressed in
+        the thread pool of the event loop, which is not smaller than
+        `compress_executor_size`.
+        """
+        if (self._initial_written or len(self._response_body) <
+                self.settings.get("compress_executor_size", 256 * 1024)):
+            return False
+
+        self._prepare_compression(finishing=True)
+        return self._compressor is not None
+
+    async def _finish_in_executor(self):
+        """
+        Compress the complete response body in the thread pool of the event
+        loop, and send the response.
+
+        **This is a Coroutine.**
+        """
+        self._compressed_body = await self.app._loop.run_in_executor(
+            None, _compress_body, self._compressor,
+            bytes(self._response_body))
+
+        self._flush(finishing=True)
+        self.connection.finish_writing()
+
     def finish(self, text: Optional[Union[str, bytes]]=None):
         """
         Finish the request, send the response. If a text is passed, it will be
         write first, after that, the request will be finished.
 
+        If the response body should be compressed and it is not smaller than
+        `compress_executor_size`, the response is sent after the body is
+        compressed in the thread pool of the event loop.
+
         If it is called more than one time, it will raise an error.
         """
         if self._finished:
@@ -683,22 +1213,32 @@ class RequestHandler:
         if text is not None:
             self.write(text)
 
-        if self._initial_written is False:
-            if ("etag" not in self._headers and
+        self._share_coalesced_response()
+
+        if (self._initial_written is False and
                 self._status_code == 200 and
-                    self.request.method in ("GET", "HEAD")):
+                self.request.method in ("GET", "HEAD")):
+            if "etag" not in self._headers and self.is_body_etag_needed():
                 self.set_body_etag()
 
             if self.check_body_etag():
                 self._status_code = 304
                 self._response_body.clear()
+                self._compressor = None
+                self._compressed_body = None
                 for header_name in ("allow", "content-encoding",
                                     "content-language", "content-length",
                                     "content-md5", "content-range",
                                     "content-type", "last-modified"):
                     self.clear_header(header_name)
 
-        self.flush()
+        if self._should_compress_in_executor():
+            self._finished = True
+            self._finishing_task = self.app._loop.create_task(
+                self._finish_in_executor())
+            return
+
+        self._flush(finishing=True)
         self._finished = True
 
         self.connection.finish_writing()
@@ -747,28 +1287,56 @@ class RequestHandler:
                    "</body>"
                    "</html>")
 
+    def get_head_metadata(self, *args, **kwargs) -> Optional[
+            Mapping[str, str]]:
+        """
+        Return the headers of the response to a HEAD request, such as the
+        content-type and the content-length, without generating the body. It
+        is called with the same arguments as `head`, and it can be a
+        coroutine function.
+
+        If a mapping is returned, the HEAD request is responded with the
+        headers, and `get` will not be called. Return `None` to generate the
+        response by `get`, this is the default.
+        """
+        return None
+
     async def head(self, *args, **kwargs):
         """
         Respond the Head Request.
 
+        The headers are returned by `get_head_metadata` if it is overridden,
+        or the response is generated by `get` and the content-length is set
+        by the length of the body, the body will not be sent.
+
         **This is a Coroutine.**
         """
-        get_return_text = await self.get(*args, **kwargs)
-        if self._status_code != 200:
+        metadata = self.get_head_metadata(*args, **kwargs)
+        if asyncio.iscoroutine(metadata):
+            metadata = await metadata
+        if metadata is not None:
+            for name, value in metadata.items():
+                self.set_header(name, value)
+            self._head_metadata_written = True
+            self.write(b"")
             return
-        if self._body_written is True:
-            content_length = len(self._response_body)
-        else:
-            content_length = len(get_return_text)
-        if not self.connection._can_keep_alive:
-            self.set_header("content-length", str(content_length))
-        self.write(b"", clear_text=True)
+
+        await self._call_handler_function(self.get)
 
     async def get(self, *args, **kwargs):
         """
         Must be overridden in subclass if you want to handle GET request,
         or it will raise an HTTPError(405) -- Method Not Allowed.
 
+        The handler functions can also be async generators, each chunk yielded
+        is written and flushed as a part of a chunked response, and the next
+        chunk is not generated until the transport is drained::
+
+            async def get(self, *args, **kwargs):
+                self.set_header("content-type", "text/csv")
+                async for row in cursor:
+                    yield ",".join(row) + "\\r\\n"
+
         **This is a Coroutine.**
         """
         raise HTTPError(405)
@@ -834,21 +1402,171 @@ class RequestHandler:
             if self.settings.get("csrf_protect", False
                                  ) and self.request._body_expected is True:
                 self.check_csrf_value()
-            body = await getattr(self, self.request.method.lower())(
-                *self.path_args, **self.path_kwargs)
-            if not self._body_written:
-                self.write(body)
+            if (self.request.method in ("GET", "HEAD") and
+                    await self._check_validator()):
+                return
+            if self.coalesce_requests and self.request.method == "GET":
+                await self._handle_coalesced_request()
+            else:
+                await self._call_handler_function(
+                    getattr(self, self.request.method.lower()))
         except HTTPError as e:
             self.write_error(e.status_code, e.message, sys.exc_info())
         except Exception as e:
             self.write_error(500, None, sys.exc_info())
         if not self._finished:
             self.finish()
+        if self._finishing_task is not None:
+            await self._finishing_task
+
+    async def _call_handler_function(self, func):
+        """
+        Call the handler function with the path arguments, and write the
+        returned body or the chunks yielded by it.
+
+        **This is a Coroutine.**
+        """
+        result = func(*self.path_args, **self.path_kwargs)
+        if not hasattr(result, "__anext__"):
+            body = await result
+            if not self._body_written and not self._finished:
+                self.write(body)
+            return
+
+        try:
+            async for chunk in result:
+                if not chunk:
+                    continue
+                self.write(chunk)
+                if not self.is_head_request:
+                    await self.flush()
+
+        except Exception:
+            if not self._initial_written:
+                raise
+            # The response cannot be replaced by an error page after the
+            # initial is written, close the connection.
+            if self.settings.get("debug", False):
+                traceback.print_exc()
+            self._finished = True
+            self.server.transport.close()
+
+        finally:
+            await result.aclose()
+
+        if not self._body_written:
+            self.write(b"")
+
+    def get_coalescing_key(self) -> tuple:
+        """
+        Return the key of the request for `coalesce_requests`, the requests
+        with the same key are coalesced.
+        """
+        return (type(self), self.request.host, self.request.origin_path) + \
+            tuple(self.get_header(name, None)
+                  for name in self.coalesce_key_headers)
+
+    async def _handle_coalesced_request(self):
+        """
+        Wait for the response of the identical request that is being handled,
+        or call the handler function and share the response.
+
+        **This is a Coroutine.**
+        """
+        key = self.get_coalescing_key()
+        coalesced_requests = self.app._coalesced_requests
+
+        leader_future = coalesced_requests.get(key)
+        if leader_future is not None:
+            result = await asyncio.shield(leader_future)
+            if result is not None:
+                status_code, headers, body = result
+                self._status_code = status_code
+                self._headers = headers.copy()
+                self.write(body, clear_text=True)
+                return
+
+        else:
+            self._coalescing_key = key
+            self._coalescing_future = self.app._loop.create_future()
+            coalesced_requests[key] = self._coalescing_future
+
+        try:
+            await self._call_handler_function(self.get)
+        except asyncio.CancelledError:
+            self._resolve_coalesced_request(None)
+            raise
+
+        self._share_coalesced_response()
+
+    def _share_coalesced_response(self):
+        """
+        Pass the response to the requests waiting for this request before it
+        is compressed, each request negotiates the content coding and
+        computes the content length itself.
+
+        The response is not shared if it sets cookies, has been flushed, or
+        is encoded by the handler function.
+        """
+        if self._coalescing_future is None:
+            return
+
+        if (self._cookies or self._initial_written or
+                "content-encoding" in self._headers):
+            self._resolve_coalesced_request(None)
+            return
+
+        headers = self._headers.copy()
+        if "content-length" in headers:
+            del headers["content-length"]
+        self._resolve_coalesced_request(
+            (self._status_code, headers, bytes(self._response_body)))
+
+    def _resolve_coalesced_request(self, result: Optional[tuple]):
+        """
+        Pass the result to the requests waiting for this request, `None` means
+        that the response cannot be shared.
+        """
+        future = self._coalescing_future
+        if future is None:
+            return
+        self._coalescing_future = None
+
+        coalesced_requests = self.app._coalesced_requests
+        if coalesced_requests.get(self._coalescing_key) is future:
+            del coalesced_requests[self._coalescing_key]
+        if not future.done():
+            future.set_result(result)
+
+    async def _check_validator(self) -> bool:
+        """
+        Send a 304 Not Modified response and return `True` if the validator
+        returned by `get_validator` matches the conditional headers.
+
+        **This is a Coroutine.**
+        """
+        validator = self.get_validator(*self.path_args, **self.path_kwargs)
+        if asyncio.iscoroutine(validator):
+            validator = await validator
+        if validator is None:
+            return False
+
+        etag, last_modified = self.set_validator(validator)
+        if not self.check_not_modified(etag, last_modified):
+            return False
 
-    def data_received(self):
+        self._status_code = 304
+        self.finish(b"")
+        return True
+
+    def data_received(self, data: bytes):
         """
         For StreamRequestHandler. If you use this as a stream handler, you
         must overrride this function.
+
+        It is called with each part of the request body before the handler
+        function is called, the body is decompressed if it is encoded by gzip
+        or deflate.
         """
         raise NotImplementedError
 
@@ -866,57 +1584,1678 @@ class NotFoundHandler(RequestHandler):
     post = get
 
 
-class StaticFileHandler(RequestHandler):
+_PRECOMPRESSED_SUFFIXES = (("br", ".br"), ("gzip", ".gz"))
+
+_SSE_LINE_BREAK_RE = re.compile(r"\r\n|\r|\n")
+
+
+def _parse_accept_encoding(value: str) -> Mapping[str, float]:
     """
-    Handler that handles static files.
+    Parse the value of the accept-encoding header into a dict, the keys are
+    the lowercased content codings and the values are the qvalues.
+    """
+    codings = {}
+    for item in value.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params.split(";"):
+            name, _, param_value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    qvalue = float(param_value)
+                except ValueError:
+                    qvalue = 0.0
+        codings[coding] = qvalue
+    return codings
+
+
+def _match_etag(etag: str, header_value: str, weak: bool) -> bool:
+    """
+    Return `True` if the etag matches one of the etags in the header value.
 
-    Warning: You should use Web Server(such as: Nginx) to handle Static Files.
-             StaticFileHandler should only be used in development.
+    Weak comparison is used if weak is `True`, otherwise strong comparison
+    is used, and weak etags never match.
     """
+    etags = re.findall(r'\*|(?:W/)?"[^"]*"', header_value)
+    for candidate in etags:
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            if not weak:
+                continue
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
 
-    static_path = None  # Modify this to custom static path for this handler.
-    async def handle_static_file(self, file_uri_path: str, *args, **kwargs):
-        """
-        Get the file from the given file path. Override this function if you
-        want to customize the way to get file.
-        """
-        if not self.static_path:
-            self.static_path = self.settings.get("static_path", "static")
-        file_path = os.path.join(self.static_path, file_uri_path)
 
-        if not os.path.realpath(file_path).startswith(
-         os.path.realpath(self.static_path)):
-            raise HTTPError(403)
-        if not os.path.exists(file_path):
-            raise HTTPError(404)
-        if os.path.isdir(file_path):
-            raise HTTPError(403)
+def _is_encoding_accepted(codings: Mapping[str, float], coding: str) -> bool:
+    return codings.get(coding, codings.get("*", 0.0)) > 0
 
-        file_size = os.path.getsize(file_path)
-        if file_size >= 1024 * 1024 * 50:
-            # StaticFileHandler Currently does not support
-            # file bigger than 50MB.
-            raise HTTPError(500, "Static File Size Too Large.")
 
-        mime = mimetypes.guess_type(file_uri_path)[0]
-        mime = mime or "application/octet-stream"
-        self.set_header("content-type", mime)
+def _parse_cache_control(value: str) -> Mapping[str, Optional[str]]:
+    """
+    Parse the value of the cache-control header into a dict, the keys are
+    the lowercased directives, and the values are the arguments or `None`.
+    """
+    directives = {}
+    for item in value.split(","):
+        name, sep, argument = item.partition("=")
+        name = name.strip().lower()
+        if name:
+            directives[name] = argument.strip().strip('"') if sep else None
+    return directives
 
-        with open(file_path, "rb") as f:
-            self.finish(f.read())
 
-    async def get(self, *args, **kwargs):
-        await self.handle_static_file(file_uri_path=kwargs["file"])
+class CachedResponse:
+    """
+    A response stored in `ResponseCache`.
+
+    :arg status_code: the status code of the response.
+    :arg header_block: the assembled headers of the response, except the
+      headers that are different in every response, such as date and
+      connection.
+    :arg body: the body of the response.
+    :arg etag: the etag of the response, or `None`.
+    :arg max_age: the number of seconds that the response is fresh.
+    """
+    def __init__(self, status_code: int, header_block: bytes, body: bytes,
+                 etag: Optional[str], max_age: float):
+        self.status_code = status_code
+        self.header_block = header_block
+        self.body = body
+        self.etag = etag
 
+        self.created_at = time.monotonic()
+        self.expires_at = self.created_at + max_age
 
-class Application:
-    """
-    Class that its instance creates asyncio compatible servers,
-    stores handler list, finds every request's handler,
-    and passes it to server.
+        self.size = len(header_block) + len(body)
 
-    :arg loop: A Custom EventLoop, or FutureFinity will use the result of
-      `asyncio.get_event_loop()`.
+    @property
+    def age(self) -> int:
+        """
+        The number of seconds since the response is stored.
+        """
+        return int(time.monotonic() - self.created_at)
+
+    def is_fresh(self) -> bool:
+        """
+        Return `True` if the response has not expired.
+        """
+        return time.monotonic() < self.expires_at
+
+
+class ResponseCache:
+    """
+    A bounded LRU cache of the responses, which is bounded by the total size
+    of the cached responses.
+
+    The responses to the GET requests are cached if the cache-control header
+    of the response has a positive s-maxage or max-age directive, and no
+    no-store, no-cache, or private directive. The responses are keyed on the
+    host, the path and the query of the request, and the values of the
+    request headers that are listed in the vary header of the response.
+
+    The hits are served by `ApplicationHTTPServer` directly, without creating
+    a `RequestHandler`.
+
+    :arg max_size: The maximum total size in bytes of the cached responses.
+    :arg max_entry_size: The responses larger than this size will not be
+      cached.
+    """
+    def __init__(self, max_size: int=64 * 1024 * 1024,
+                 max_entry_size: int=1024 * 1024):
+        self.max_size = max_size
+        self.max_entry_size = max_entry_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._vary = {}
+        self._size = 0
+
+    def _get_base_key(self, request: protocol.HTTPIncomingRequest) -> tuple:
+        return (request.host, request.origin_path)
+
+    def _get_key(self, base_key: tuple, vary: Tuple[str, ...],
+                 request: protocol.HTTPIncomingRequest) -> tuple:
+        return base_key + tuple(
+            request.headers.get_first(name) for name in vary)
+
+    def get(self, request: protocol.HTTPIncomingRequest) -> Optional[
+            CachedResponse]:
+        """
+        Get the cached response of the request, or `None` if the response is
+        not cached or has expired.
+        """
+        base_key = self._get_base_key(request)
+        vary = self._vary.get(base_key)
+        if vary is None:
+            self.misses += 1
+            return None
+
+        key = self._get_key(base_key, vary, request)
+        response = self._entries.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+
+        if not response.is_fresh():
+            self._discard(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def get_max_age(self, request: protocol.HTTPIncomingRequest,
+                    status_code: int, headers: protocol.HTTPHeaders) -> float:
+        """
+        Return the number of seconds that the response of the request can be
+        cached for, or `0` if the response is not cacheable.
+        """
+        if request.method != "GET" or status_code != 200:
+            return 0
+        if "set-cookie" in headers:
+            return 0
+
+        directives = _parse_cache_control(
+            headers.get_first("cache-control", ""))
+        if ("no-store" in directives or "no-cache" in directives or
+                "private" in directives):
+            return 0
+        if ("authorization" in request.headers and
+                "public" not in directives and
+                "s-maxage" not in directives):
+            return 0
+
+        try:
+            max_age = float(directives.get(
+                "s-maxage", directives.get("max-age")) or 0)
+        except ValueError:
+            return 0
+        if max_age <= 0:
+            return 0
+
+        if "*" in (name.strip() for name in headers.get_first(
+                "vary", "").split(",")):
+            return 0
+
+        return max_age
+
+    def set(self, request: protocol.HTTPIncomingRequest, status_code: int,
+            headers: protocol.HTTPHeaders, body: bytes) -> bool:
+        """
+        Cache the response of the request if it is cacheable.
+
+        The headers should be the final headers of the response. Return `True`
+        if the response is cached.
+        """
+        max_age = self.get_max_age(request, status_code, headers)
+        if max_age <= 0:
+            return False
+
+        vary = tuple(sorted(set(
+            name.strip().lower() for name in headers.get_first(
+                "vary", "").split(",") if name.strip())))
+
+        cached_headers = headers.copy()
+        for name in ("date", "connection", "transfer-encoding",
+                     "keep-alive", "age"):
+            if name in cached_headers:
+                del cached_headers[name]
+        cached_headers["content-length"] = str(len(body))
+
+        response = CachedResponse(
+            status_code=status_code,
+            header_block=cached_headers.assemble(), body=bytes(body),
+            etag=headers.get_first("etag"), max_age=max_age)
+        if response.size > min(self.max_entry_size, self.max_size):
+            return False
+
+        base_key = self._get_base_key(request)
+        if self._vary.get(base_key) != vary:
+            self.discard(request)
+            self._vary[base_key] = vary
+
+        key = self._get_key(base_key, vary, request)
+        self._discard(key)
+        self._entries[key] = response
+        self._size += response.size
+
+        while self._size > self.max_size:
+            evicted_key, evicted_response = self._entries.popitem(last=False)
+            self._size -= evicted_response.size
+            # The other variants become unreachable until they are cached
+            # again, and they will be evicted eventually.
+            self._vary.pop(evicted_key[:len(base_key)], None)
+
+        return True
+
+    @property
+    def size(self) -> int:
+        """
+        The total size in bytes of the cached responses.
+        """
+        return self._size
+
+    def discard(self, request: protocol.HTTPIncomingRequest):
+        """
+        Remove all the cached responses of the host, path and query of the
+        request from the cache.
+        """
+        base_key = self._get_base_key(request)
+        self._vary.pop(base_key, None)
+        for key in [key for key in self._entries.keys()
+                    if key[:len(base_key)] == base_key]:
+            self._discard(key)
+
+    def clear(self):
+        """
+        Remove all the responses from the cache.
+        """
+        self._entries.clear()
+        self._vary.clear()
+        self._size = 0
+
+    def _discard(self, key: tuple):
+        response = self._entries.pop(key, None)
+        if response is not None:
+            self._size -= response.size
+
+
+class StaticFileInfo:
+    """
+    The metadata of a static file.
+
+    :arg path: the resolved path of the file.
+    :arg stat_result: the result of ``os.stat`` of the file.
+    :arg mime: the mime type of the file.
+    :arg encoding: the content coding of the file if it is a precompressed
+      variant of another file, such as `gzip` or `br`.
+    """
+    def __init__(self, path: str, stat_result: os.stat_result, mime: str,
+                 encoding: Optional[str]=None):
+        self.path = path
+        self.stat_result = stat_result
+        self.mime = mime
+        self.encoding = encoding
+        self.etag = '"%x-%x"' % (stat_result.st_mtime_ns, stat_result.st_size)
+        self.last_modified = format_timestamp(stat_result.st_mtime)
+
+        self.variants = {}
+        """
+        The precompressed variants of the file, the keys are the content
+        codings.
+        """
+
+        self.checked_at = time.monotonic()
+
+        self._header_block = None
+
+        self._mmap = None
+        self._mmap_users = 0
+
+    @property
+    def header_block(self) -> bytes:
+        """
+        The assembled headers of the file that are the same in every full
+        response: content-type, content-length, etag, last-modified,
+        accept-ranges, and content-encoding and vary if the file has
+        precompressed variants.
+        """
+        if self._header_block is None:
+            headers = protocol.HTTPHeaders()
+            headers["content-type"] = self.mime
+            headers["content-length"] = str(self.stat_result.st_size)
+            headers["etag"] = self.etag
+            headers["last-modified"] = self.last_modified
+            headers["accept-ranges"] = "bytes"
+            if self.encoding is not None:
+                headers["content-encoding"] = self.encoding
+            if self.encoding is not None or self.variants:
+                headers["vary"] = "Accept-Encoding"
+            self._header_block = headers.assemble()
+        return self._header_block
+
+    def is_modified(self, stat_result: os.stat_result) -> bool:
+        """
+        Return `True` if the file is changed since this metadata is created.
+        """
+        return (stat_result.st_mtime_ns != self.stat_result.st_mtime_ns or
+                stat_result.st_size != self.stat_result.st_size or
+                stat_result.st_ino != self.stat_result.st_ino)
+
+    def acquire_mmap(self, f: BinaryIO) -> mmap.mmap:
+        """
+        Get the read-only memory map of the file, the map is created from the
+        opened file `f` if it is not mapped yet.
+
+        The map is shared by all the users until all of them release it by
+        `release_mmap`.
+        """
+        if self._mmap is None:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmap_users += 1
+        return self._mmap
+
+    def release_mmap(self):
+        """
+        Release the memory map acquired by `acquire_mmap`, the map is closed
+        when it is released by all the users.
+        """
+        self._mmap_users -= 1
+        if self._mmap_users > 0:
+            return
+
+        file_map, self._mmap = self._mmap, None
+        try:
+            file_map.close()
+        except BufferError:
+            # The slices are still held by the transport, the map will be
+            # closed when they are freed.
+            pass
+
+
+class StaticFileCache:
+    """
+    A bounded LRU cache of the metadata of static files.
+
+    The resolved path, the stat result, the mime type and the etag of each
+    file are cached, the cached metadata will be revalidated by ``os.stat``
+    when it is older than the revalidate interval.
+
+    The precompressed variants of each file(``foo.js.br`` and ``foo.js.gz``
+    for ``foo.js``) are discovered and revalidated with the file.
+
+    The contents of the small files can be cached as well, they are bounded
+    by the total size in another LRU, and dropped with the metadata when the
+    file is changed.
+
+    :arg max_entries: The maximum number of files to cache.
+    :arg revalidate_interval: The number of seconds that the metadata of a
+      file is trusted without checking the file again.
+    :arg max_content_size: The maximum total size in bytes of the cached
+      contents. Set it to `0` to disable the content cache.
+    :arg content_threshold: Only the contents of the files that are not
+      larger than this number of bytes will be cached.
+    :arg precompressed: Default: `True`. Discover the precompressed variants
+      of the files.
+    """
+    def __init__(self, max_entries: int=1024,
+                 revalidate_interval: float=1,
+                 max_content_size: int=16 * 1024 * 1024,
+                 content_threshold: int=64 * 1024,
+                 precompressed: bool=True):
+        self.max_entries = max_entries
+        self.revalidate_interval = revalidate_interval
+        self.max_content_size = max_content_size
+        self.content_threshold = content_threshold
+        self.precompressed = precompressed
+
+        self.content_hits = 0
+        self.content_misses = 0
+
+        self._entries = collections.OrderedDict()
+        self._contents = collections.OrderedDict()
+        self._content_size = 0
+
+        self._hashes = collections.OrderedDict()
+        self._hashing = {}
+
+    def get(self, static_path: str, file_uri_path: str) -> StaticFileInfo:
+        """
+        Get the metadata of the file at the file_uri_path in the static_path.
+
+        It raises an `HTTPError` with status code 403 if the file is not
+        accessible, or 404 if the file does not exist.
+        """
+        key = (static_path, file_uri_path)
+        info = self._entries.get(key)
+
+        if info is not None:
+            self._entries.move_to_end(key)
+            now = time.monotonic()
+            if now - info.checked_at < self.revalidate_interval:
+                return info
+
+            if not self._is_modified(static_path, info):
+                info.checked_at = now
+                return info
+
+            self.discard(static_path, file_uri_path)
+
+        info = self._resolve(static_path, file_uri_path)
+
+        self._entries[key] = info
+        while len(self._entries) > self.max_entries:
+            self._discard_contents(self._entries.popitem(last=False)[0])
+
+        return info
+
+    def preload(self, static_path: str):
+        """
+        Cache the metadata of the files in the static_path until the cache is
+        full, the files are only stat'ed, and the header blocks are assembled.
+        The precompressed variants are discovered with the files.
+
+        This should only be called before the application starts serving.
+        """
+        suffixes = tuple(suffix for _, suffix in _PRECOMPRESSED_SUFFIXES)
+        for root, _, filenames in os.walk(static_path):
+            for filename in filenames:
+                if len(self._entries) >= self.max_entries:
+                    return
+                if self.precompressed and filename.endswith(suffixes):
+                    continue
+
+                file_uri_path = os.path.relpath(
+                    os.path.join(root, filename), static_path).replace(
+                        os.path.sep, "/")
+                try:
+                    info = self.get(static_path, file_uri_path)
+                except (HTTPError, OSError):
+                    continue
+
+                # Assemble the header blocks, so they are shared as well.
+                info.header_block
+                for variant in info.variants.values():
+                    variant.header_block
+
+    def get_content_hash(self, static_path: str, file_uri_path: str,
+                         loop: asyncio.BaseEventLoop,
+                         stat_result: Optional[os.stat_result]=None
+                         ) -> Optional[str]:
+        """
+        Get the hex digest of the content of the file at the file_uri_path in
+        the static_path without touching the file system.
+
+        It returns `None` if the hash has not been computed yet. The missing
+        and outdated hashes are computed in the default executor of the loop,
+        and the file is hashed again only if it is changed.
+
+        :arg stat_result: Only return the hash that is computed for the file
+          with the same modification time and size.
+        """
+        key = (static_path, file_uri_path)
+        entry = self._hashes.get(key)
+
+        if entry is None or \
+                time.monotonic() - entry[2] >= self.revalidate_interval:
+            self._refresh_content_hash(key, loop)
+
+        if entry is None:
+            return None
+        if stat_result is not None and entry[1] != (
+                stat_result.st_mtime_ns, stat_result.st_size):
+            return None
+        return entry[0]
+
+    async def compute_content_hash(self, static_path: str,
+                                   file_uri_path: str,
+                                   loop: asyncio.BaseEventLoop
+                                   ) -> Optional[str]:
+        """
+        Compute the hex digest of the content of the file at the
+        file_uri_path in the static_path in the default executor of the
+        loop, it shares the computation with `get_content_hash`.
+
+        Return `None` if the file is not accessible.
+
+        **This is a Coroutine.**
+        """
+        key = (static_path, file_uri_path)
+        await asyncio.shield(self._refresh_content_hash(key, loop))
+
+        entry = self._hashes.get(key)
+        return entry[0] if entry is not None else None
+
+    def preload_content_hashes(self, static_path: str,
+                               patterns: Sequence[str]):
+        """
+        Compute the hashes of the files in the static_path that match the
+        glob patterns(e.g.: ``["*.css", "js/*.js"]``), so the fingerprinted
+        urls of them are available from the first request. The precompressed
+        variants are skipped.
+
+        This blocks until all the files are hashed, it should only be called
+        before the application starts serving.
+        """
+        suffixes = tuple(suffix for _, suffix in _PRECOMPRESSED_SUFFIXES)
+        for pattern in patterns:
+            for file_path in glob.iglob(os.path.join(static_path, pattern),
+                                        recursive=True):
+                if file_path.endswith(suffixes):
+                    continue
+                file_uri_path = os.path.relpath(
+                    file_path, static_path).replace(os.path.sep, "/")
+                result = _hash_static_file(static_path, file_uri_path)
+                if result is not None:
+                    self._set_content_hash(
+                        (static_path, file_uri_path), result)
+
+    def _refresh_content_hash(self, key: Tuple[str, str],
+                              loop: asyncio.BaseEventLoop) -> asyncio.Future:
+        pending = self._hashing.get(key)
+        if pending is not None and pending[0] is loop:
+            return pending[1]
+
+        entry = self._hashes.get(key)
+        if entry is None:
+            future = loop.run_in_executor(None, _hash_static_file, *key)
+        else:
+            future = loop.run_in_executor(
+                None, _hash_static_file, *key, entry[0], entry[1])
+        pending = (loop, future)
+        self._hashing[key] = pending
+
+        def hash_done(future: asyncio.Future):
+            if self._hashing.get(key) is pending:
+                del self._hashing[key]
+            if future.cancelled() or future.exception() is not None:
+                return
+            result = future.result()
+            if result is None:
+                self._hashes.pop(key, None)
+            else:
+                self._set_content_hash(key, result)
+
+        future.add_done_callback(hash_done)
+        return future
+
+    def _set_content_hash(self, key: Tuple[str, str],
+                          result: Tuple[str, tuple]):
+        self._hashes[key] = (result[0], result[1], time.monotonic())
+        self._hashes.move_to_end(key)
+        while len(self._hashes) > self.max_entries:
+            self._hashes.popitem(last=False)
+
+    def is_content_cacheable(self, info: StaticFileInfo) -> bool:
+        """
+        Return `True` if the content of the file can be cached.
+        """
+        return (self.max_content_size > 0 and
+                info.stat_result.st_size <= self.content_threshold and
+                info.stat_result.st_size <= self.max_content_size)
+
+    def get_content(self, static_path: str, file_uri_path: str,
+                    encoding: Optional[str]=None) -> Optional[bytes]:
+        """
+        Get the cached content of the file, or `None` if it is not cached.
+
+        :arg encoding: the content coding of the precompressed variant.
+        """
+        content_key = (static_path, file_uri_path, encoding)
+        content = self._contents.get(content_key)
+        if content is None:
+            self.content_misses += 1
+            return None
+
+        self.content_hits += 1
+        self._contents.move_to_end(content_key)
+        return content
+
+    def set_content(self, static_path: str, file_uri_path: str,
+                    info: StaticFileInfo, content: bytes):
+        """
+        Cache the content of the file or its precompressed variant.
+
+        The content will be ignored if the metadata of the file has been
+        changed, or the file is not cacheable.
+        """
+        cached_info = self._entries.get((static_path, file_uri_path))
+        if cached_info is None:
+            return
+        if info is not cached_info and info is not cached_info.variants.get(
+                info.encoding):
+            return
+        if (not self.is_content_cacheable(info) or
+                len(content) != info.stat_result.st_size):
+            return
+
+        content_key = (static_path, file_uri_path, info.encoding)
+        self._discard_content(content_key)
+        self._contents[content_key] = content
+        self._content_size += len(content)
+
+        while self._content_size > self.max_content_size:
+            _, evicted_content = self._contents.popitem(last=False)
+            self._content_size -= len(evicted_content)
+
+    @property
+    def content_size(self) -> int:
+        """
+        The total size in bytes of the cached contents.
+        """
+        return self._content_size
+
+    def discard(self, static_path: str, file_uri_path: str):
+        """
+        Remove the metadata and the contents of the file from the cache.
+        """
+        key = (static_path, file_uri_path)
+        self._entries.pop(key, None)
+        self._discard_contents(key)
+
+    def clear(self):
+        """
+        Remove all the metadata and the contents from the cache.
+        """
+        self._entries.clear()
+        self._contents.clear()
+        self._content_size = 0
+
+    def _discard_contents(self, key: tuple):
+        self._discard_content(key + (None, ))
+        for encoding, _ in _PRECOMPRESSED_SUFFIXES:
+            self._discard_content(key + (encoding, ))
+
+    def _discard_content(self, content_key: tuple):
+        content = self._contents.pop(content_key, None)
+        if content is not None:
+            self._content_size -= len(content)
+
+    def _is_modified(self, static_path: str, info: StaticFileInfo) -> bool:
+        try:
+            stat_result = os.stat(info.path)
+        except OSError:
+            return True
+        if info.is_modified(stat_result):
+            return True
+
+        if not self.precompressed:
+            return False
+
+        real_static_path = os.path.realpath(static_path)
+        for encoding, suffix in _PRECOMPRESSED_SUFFIXES:
+            variant = info.variants.get(encoding)
+            resolved = self._resolve_variant(real_static_path,
+                                             info.path + suffix)
+            if resolved is None:
+                if variant is not None:
+                    return True
+                continue
+            variant_path, stat_result = resolved
+            if (variant is None or variant.path != variant_path or
+                    variant.is_modified(stat_result)):
+                return True
+
+        return False
+
+    def _resolve_variant(self, real_static_path: str, path: str) -> Optional[
+            Tuple[str, os.stat_result]]:
+        """
+        Resolve the precompressed variant at the path, return the resolved
+        path and the stat result, or `None` if the variant does not exist, is
+        not a regular file, or is outside of the static path.
+        """
+        variant_path = os.path.realpath(path)
+        if os.path.commonpath([real_static_path, variant_path]) != \
+                real_static_path:
+            return None
+        try:
+            stat_result = os.stat(variant_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+        return variant_path, stat_result
+
+    def _resolve(self, static_path: str,
+                 file_uri_path: str) -> StaticFileInfo:
+        real_static_path = os.path.realpath(static_path)
+        file_path = os.path.realpath(os.path.join(static_path, file_uri_path))
+
+        if os.path.commonpath([real_static_path, file_path]) != \
+                real_static_path:
+            raise HTTPError(403)
+        try:
+            stat_result = os.stat(file_path)
+        except FileNotFoundError:
+            raise HTTPError(404)
+        if not stat.S_ISREG(stat_result.st_mode):
+            raise HTTPError(403)
+
+        mime = mimetypes.guess_type(file_uri_path)[0]
+        mime = mime or "application/octet-stream"
+
+        info = StaticFileInfo(file_path, stat_result, mime)
+
+        if self.precompressed:
+            for encoding, suffix in _PRECOMPRESSED_SUFFIXES:
+                resolved = self._resolve_variant(real_static_path,
+                                                 file_path + suffix)
+                if resolved is not None:
+                    info.variants[encoding] = StaticFileInfo(
+                        resolved[0], resolved[1], mime, encoding=encoding)
+
+        return info
+
+
+class StaticFileHandler(RequestHandler):
+    """
+    Handler that handles static files.
+
+    The files are sent by ``sendfile`` on plaintext connections, by the
+    slices of a shared memory map on TLS connections, or read in chunks by
+    the thread pool of the event loop otherwise, so files of any size can be
+    served without blocking the event loop.
+
+    If the client accepts it, the precompressed variant(``foo.js.br`` or
+    ``foo.js.gz``) will be sent instead of ``foo.js``. The variants can be
+    generated by `compress_static_files`.
+    """
+
+    static_path = None  # Modify this to custom static path for this handler.
+
+    chunk_size = 256 * 1024
+    """
+    The size of each chunk when the file cannot be sent by ``sendfile``.
+    """
+
+    max_ranges = 16
+    """
+    The maximum number of ranges in a range request, the range header with
+    more ranges will be ignored.
+    """
+
+    immutable_cache_control = "public, max-age=31536000, immutable"
+    """
+    The cache-control header of the file requested by a fingerprinted url
+    that matches the current content hash, see `RequestHandler.static_url`.
+    """
+
+    async def handle_static_file(self, file_uri_path: str, *args, **kwargs):
+        """
+        Get the file from the given file path. Override this function if you
+        want to customize the way to get file.
+        """
+        if not self.static_path:
+            self.static_path = self.settings.get("static_path", "static")
+        static_file_cache = self.app.static_file_cache
+        info = static_file_cache.get(self.static_path, file_uri_path)
+        if await self.check_static_fingerprint(file_uri_path, info):
+            self.set_header("cache-control", self.immutable_cache_control)
+        info = self.select_static_variant(info)
+
+        if self.check_static_not_modified(info):
+            self._status_code = 304
+            self.set_static_validators(info)
+            self.write_initial()
+            self._finished = True
+            self.connection.finish_writing()
+            return
+
+        ranges = self.get_static_ranges(info)
+
+        content = None
+        f = None
+        if static_file_cache.is_content_cacheable(info):
+            content = static_file_cache.get_content(
+                self.static_path, file_uri_path, info.encoding)
+            if content is None:
+                try:
+                    content = await self.app._loop.run_in_executor(
+                        None, _read_file, info.path)
+                except FileNotFoundError:
+                    static_file_cache.discard(self.static_path,
+                                              file_uri_path)
+                    raise HTTPError(404)
+                static_file_cache.set_content(
+                    self.static_path, file_uri_path, info, content)
+        else:
+            try:
+                f = open(info.path, "rb")
+            except FileNotFoundError:
+                static_file_cache.discard(self.static_path, file_uri_path)
+                raise HTTPError(404)
+
+        file_size = info.stat_result.st_size
+        if content is not None and len(content) != file_size:
+            # The file is changed after the metadata is cached.
+            static_file_cache.discard(self.static_path, file_uri_path)
+            file_size = len(content)
+            ranges = None
+
+        try:
+            if ranges is None:
+                if file_size == info.stat_result.st_size:
+                    self._prebuilt_headers = info.header_block
+                else:
+                    self.set_static_validators(info)
+                    self.set_header("content-type", info.mime)
+                    self.set_header("content-length", str(file_size))
+                self.write_initial()
+                if self.request.method != "HEAD":
+                    await self._write_static_body(info, content, f, 0,
+                                                  file_size)
+
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self._status_code = 206
+                self.set_static_validators(info)
+                self.set_header("content-type", info.mime)
+                self.set_header("content-range", "bytes %d-%d/%d" % (
+                    start, end, file_size))
+                self.set_header("content-length", str(end - start + 1))
+                self.write_initial()
+                await self._write_static_body(info, content, f, start,
+                                              end - start + 1)
+
+            else:
+                boundary = ensure_str(security.get_random_str(32))
+                part_headers = []
+                for index, (start, end) in enumerate(ranges):
+                    part_header = b"" if index == 0 else b"\r\n"
+                    part_header += ensure_bytes(
+                        "--%s\r\nContent-Type: %s\r\n"
+                        "Content-Range: bytes %d-%d/%d\r\n\r\n" % (
+                            boundary, info.mime, start, end, file_size))
+                    part_headers.append(part_header)
+                closing = ensure_bytes("\r\n--%s--\r\n" % boundary)
+
+                content_length = len(closing)
+                for part_header, (start, end) in zip(part_headers, ranges):
+                    content_length += len(part_header) + end - start + 1
+
+                self._status_code = 206
+                self.set_static_validators(info)
+                self.set_header("content-type",
+                                "multipart/byteranges; boundary=" + boundary)
+                self.set_header("content-length", str(content_length))
+                self.write_initial()
+                for part_header, (start, end) in zip(part_headers, ranges):
+                    self.connection.write_body(part_header)
+                    await self._write_static_body(info, content, f, start,
+                                                  end - start + 1)
+                self.connection.write_body(closing)
+
+        except (ConnectionError, OSError):
+            # The response cannot be completed, close the connection.
+            self._finished = True
+            self.server.transport.close()
+            return
+
+        finally:
+            if f is not None:
+                f.close()
+
+        self._finished = True
+        self.connection.finish_writing()
+
+    async def check_static_fingerprint(self, file_uri_path: str,
+                                       info: StaticFileInfo) -> bool:
+        """
+        Return `True` if the file is requested by a fingerprinted url and the
+        fingerprint matches the content hash of the file.
+
+        The hashes are shared with `RequestHandler.static_url`.
+
+        **This is a Coroutine.**
+        """
+        version = self.get_link_arg("v", None)
+        if not version:
+            return False
+
+        static_file_cache = self.app.static_file_cache
+        content_hash = static_file_cache.get_content_hash(
+            self.static_path, file_uri_path, self.app._loop,
+            stat_result=info.stat_result)
+        if content_hash is None:
+            content_hash = await static_file_cache.compute_content_hash(
+                self.static_path, file_uri_path, self.app._loop)
+        return version == content_hash
+
+    def set_static_validators(self, info: StaticFileInfo):
+        """
+        Set the etag, last-modified, and the content negotiation related
+        headers of the file.
+        """
+        self.set_header("etag", info.etag)
+        self.set_header("last-modified", info.last_modified)
+        self.set_header("accept-ranges", "bytes")
+        if info.encoding is not None:
+            self.set_header("content-encoding", info.encoding)
+        if info.encoding is not None or info.variants:
+            self.set_header("vary", "Accept-Encoding")
+
+    def check_static_not_modified(self, info: StaticFileInfo) -> bool:
+        """
+        Return `True` if the client has a fresh copy of the file, by the
+        if-none-match header, or the if-modified-since header if the
+        if-none-match header is not present.
+        """
+        return self.check_not_modified(
+            etag=info.etag, last_modified=info.stat_result.st_mtime)
+
+    def get_static_ranges(self, info: StaticFileInfo) -> Optional[
+            List[tuple]]:
+        """
+        Parse the range header of the request to a list of (start, end)
+        tuples, both start and end are inclusive.
+
+        Return `None` if the whole file should be sent. It raises an
+        `HTTPError` with status code 416 if no range is satisfiable.
+        """
+        if self.request.method != "GET":
+            return None
+
+        range_header = self.get_header("range", None)
+        if range_header is None:
+            return None
+
+        if_range = self.get_header("if-range", None)
+        if if_range is not None:
+            if if_range.startswith(("\"", "W/")):
+                if not _match_etag(info.etag, if_range, weak=False):
+                    return None
+            elif parse_timestamp(if_range) != int(
+                    info.stat_result.st_mtime):
+                return None
+
+        unit, _, range_set = range_header.partition("=")
+        if unit.strip().lower() != "bytes":
+            return None
+
+        file_size = info.stat_result.st_size
+        range_specs = range_set.split(",")
+        if len(range_specs) > self.max_ranges:
+            return None
+
+        ranges = []
+        for range_spec in range_specs:
+            first, sep, last = range_spec.strip().partition("-")
+            if not sep:
+                return None  # Invalid range header will be ignored.
+            try:
+                if not first:  # Suffix range.
+                    suffix_length = int(last)
+                    if suffix_length <= 0:
+                        continue
+                    start = max(file_size - suffix_length, 0)
+                    end = file_size - 1
+                else:
+                    start = int(first)
+                    end = int(last) if last else file_size - 1
+            except ValueError:
+                return None
+            if start >= file_size:
+                continue  # Unsatisfiable range.
+            if start < 0 or end < start:
+                return None
+            ranges.append((start, min(end, file_size - 1)))
+
+        if not ranges:
+            self.set_header("content-range", "bytes */%d" % file_size)
+            raise HTTPError(416)
+
+        return ranges
+
+    async def _write_static_body(self, info: StaticFileInfo,
+                                 content: Optional[bytes],
+                                 f: Optional[BinaryIO], offset: int,
+                                 count: int):
+        if content is not None:
+            self.connection.write_body(
+                memoryview(content)[offset:offset + count])
+        elif self.server.use_tls and count > 0:
+            await self.send_mapped_file(info, f, offset, count)
+        else:
+            await self.send_file(f, offset, count)
+
+    def select_static_variant(self, info: StaticFileInfo) -> StaticFileInfo:
+        """
+        Select the precompressed variant of the file by the accept-encoding
+        header of the request, or the file itself if no variant is accepted.
+        """
+        if not info.variants:
+            return info
+
+        codings = _parse_accept_encoding(
+            self.get_header("accept-encoding", ""))
+        for encoding, _ in _PRECOMPRESSED_SUFFIXES:
+            if encoding in info.variants and _is_encoding_accepted(
+                    codings, encoding):
+                return info.variants[encoding]
+        return info
+
+    async def send_file(self, f: BinaryIO, offset: int, count: int):
+        """
+        Send `count` bytes from the `offset` of the file to the remote.
+
+        The initial should be written before calling this function.
+
+        **This is a Coroutine.**
+        """
+        loop = self.app._loop
+        transport = self.server.transport
+
+        if not self.server.use_tls and hasattr(loop, "sendfile"):
+            try:
+                sent = await loop.sendfile(transport, f, offset, count,
+                                           fallback=False)
+            except (NotImplementedError, RuntimeError):
+                # uvloop does not implement sendfile, and
+                # `asyncio.SendfileNotAvailableError` is a RuntimeError.
+                pass
+            else:
+                if sent < count:
+                    raise OSError("The file is truncated.")
+                return
+
+        while count > 0:
+            chunk = await loop.run_in_executor(
+                None, _read_file_chunk, f, offset,
+                min(self.chunk_size, count))
+            if not chunk:
+                raise OSError("The file is truncated.")
+            self.connection.write_body(chunk)
+            offset += len(chunk)
+            count -= len(chunk)
+            await self.server.drain()
+
+    async def send_mapped_file(self, info: StaticFileInfo, f: BinaryIO,
+                               offset: int, count: int):
+        """
+        Send `count` bytes from the `offset` of the file to the remote by the
+        memory map of the file, the map is shared by all the concurrent
+        responses of the same file. This is used on TLS connections that
+        ``sendfile`` cannot be used.
+
+        The slices of the map are written in windows of `chunk_size` bytes,
+        and the next window is written only when the transport is drained,
+        so the file is never copied into the heap as a whole.
+
+        If the file cannot be mapped, it will be sent by `send_file`.
+
+        The initial should be written before calling this function.
+
+        **This is a Coroutine.**
+        """
+        try:
+            file_map = info.acquire_mmap(f)
+        except (OSError, ValueError):
+            await self.send_file(f, offset, count)
+            return
+
+        try:
+            if len(file_map) < offset + count:
+                raise OSError("The file is truncated.")
+
+            while count > 0:
+                window_size = min(self.chunk_size, count)
+                self.connection.write_body(
+                    memoryview(file_map)[offset:offset + window_size])
+                offset += window_size
+                count -= window_size
+                await self.server.drain()
+
+        finally:
+            info.release_mmap()
+
+    async def get(self, *args, **kwargs):
+        await self.handle_static_file(file_uri_path=kwargs["file"])
+
+    async def head(self, *args, **kwargs):
+        await self.handle_static_file(file_uri_path=kwargs["file"])
+
+
+def format_event(data: Union[str, bytes], event: Optional[str]=None,
+                 id: Optional[str]=None,
+                 retry: Optional[int]=None) -> bytes:
+    """
+    Format a Server-Sent Event to the text/event-stream frame.
+
+    The frame can be formatted once and sent to many connections by
+    `ServerSentEventHandler.send_frame`.
+
+    :arg data: The data of the event, it can contain multiple lines.
+    :arg event: The event type.
+    :arg id: The event id, the client will send it back as Last-Event-ID
+      when it reconnects.
+    :arg retry: The reconnection time in milliseconds.
+    """
+    lines = []
+    if event is not None:
+        if _SSE_LINE_BREAK_RE.search(event):
+            raise ValueError("The event type must not contain line breaks.")
+        lines.append("event: " + event)
+    if id is not None:
+        if _SSE_LINE_BREAK_RE.search(id) or "\0" in id:
+            raise ValueError(
+                "The event id must not contain line breaks or NULL.")
+        lines.append("id: " + id)
+    if retry is not None:
+        lines.append("retry: %d" % retry)
+    for line in _SSE_LINE_BREAK_RE.split(ensure_str(data)):
+        lines.append("data: " + line)
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class ServerSentEventHandler(RequestHandler):
+    """
+    Handler of Server-Sent Events, the response is a text/event-stream.
+
+    Override `stream_events` to send the events, an idle connection is kept
+    alive by comment lines every `heartbeat_interval` seconds::
+
+        class NewsHandler(ServerSentEventHandler):
+            async def stream_events(self, *args, **kwargs):
+                queue = subscribe(since=self.last_event_id)
+                while True:
+                    news = await queue.get()
+                    await self.send_event(news.text, id=news.id)
+
+            def on_connection_close(self):
+                unsubscribe()
+
+    Each send waits until the write buffer of the transport is drained, so a
+    slow client only slows the `stream_events` of its own connection.
+    """
+    allow_methods = ("GET", )
+
+    heartbeat_interval = 15
+    """
+    The seconds of idleness after which a comment line is sent to keep the
+    connection alive, `None` disables the heartbeats.
+    """
+
+    reconnect_time = None
+    """
+    The reconnection time in milliseconds sent to the client when the stream
+    starts, `None` leaves the client default.
+    """
+
+    def __init__(self, *args, **kwargs):
+        RequestHandler.__init__(self, *args, **kwargs)
+        self._last_sent_time = None
+
+    @property
+    def last_event_id(self) -> Optional[str]:
+        """
+        The id of the last event received by the client, sent as the
+        Last-Event-ID header when the client reconnects.
+        """
+        return self.get_header("last-event-id", None)
+
+    async def stream_events(self, *args, **kwargs):
+        """
+        Must be overridden in subclass to send the events by `send_event`,
+        the stream is finished when it returns.
+
+        It can also be an async generator, each yielded `str` is sent as the
+        data of an event, and each yielded `dict` is sent as the keyword
+        arguments of `send_event`.
+
+        **This is a Coroutine.**
+        """
+        raise NotImplementedError
+
+    def on_connection_close(self):
+        """
+        Called when the client is disconnected during the stream, override
+        it to release the resources of the stream.
+        """
+        pass
+
+    async def send_frame(self, frame: bytes):
+        """
+        Send a frame formatted by `format_event`, and wait until the write
+        buffer of the transport is drained.
+
+        **This is a Coroutine.**
+        """
+        self.write(frame)
+        self._last_sent_time = self.app._loop.time()
+        await self.flush()
+
+    async def send_event(self, data: Union[str, bytes],
+                         event: Optional[str]=None, id: Optional[str]=None,
+                         retry: Optional[int]=None):
+        """
+        Send an event, see `format_event` for the arguments.
+
+        **This is a Coroutine.**
+        """
+        await self.send_frame(format_event(data, event=event, id=id,
+                                           retry=retry))
+
+    async def send_comment(self, text: str=""):
+        """
+        Send a comment line, which is ignored by the client.
+
+        **This is a Coroutine.**
+        """
+        await self.send_frame(b"".join(
+            b":" + ensure_bytes(line) + b"\n"
+            for line in _SSE_LINE_BREAK_RE.split(text)) + b"\n")
+
+    async def _send_heartbeats(self):
+        loop = self.app._loop
+        while True:
+            delay = self._last_sent_time + self.heartbeat_interval - \
+                loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            try:
+                await self.send_comment()
+            except ConnectionError:
+                return  # The stream will notice the connection lost.
+
+    async def get(self, *args, **kwargs):
+        self.set_header("content-type", "text/event-stream; charset=utf-8")
+        self.set_header("cache-control", "no-cache")
+        self.set_header("x-accel-buffering", "no")
+
+        heartbeat_task = None
+        try:
+            if self.reconnect_time is not None:
+                await self.send_frame(
+                    ("retry: %d\n\n" % self.reconnect_time).encode())
+            else:
+                await self.send_frame(b"")
+
+            if self.heartbeat_interval is not None:
+                heartbeat_task = self.app._loop.create_task(
+                    self._send_heartbeats())
+
+            events = self.stream_events(*args, **kwargs)
+            if not hasattr(events, "__anext__"):
+                await events
+                return
+
+            try:
+                async for event in events:
+                    if isinstance(event, dict):
+                        await self.send_event(**event)
+                    else:
+                        await self.send_event(event)
+            finally:
+                await events.aclose()
+
+        except asyncio.CancelledError:
+            # The connection is lost.
+            self._finished = True
+            self.on_connection_close()
+            raise
+
+        except ConnectionError:
+            self._finished = True
+            self.on_connection_close()
+
+        finally:
+            if heartbeat_task is not None:
+                heartbeat_task.cancel()
+
+
+class WebSocketHandler(RequestHandler):
+    """
+    Handler of WebSocket connections.
+
+    The Upgrade request is recognized when its initial is received, the
+    data received after it is passed to `websocket`, which is a
+    `futurefinity.websocket.WebSocketConnection`. Override `handle_websocket`
+    to communicate with the client::
+
+        class EchoHandler(WebSocketHandler):
+            async def handle_websocket(self, *args, **kwargs):
+                async for message in self.websocket:
+                    await self.websocket.send(message)
+
+    The connection is closed when `handle_websocket` returns. The requests
+    that are not WebSocket Upgrade requests are responded with
+    426 Upgrade Required.
+    """
+    allow_methods = ("GET", )
+
+    max_message_size = 16 * 1024 * 1024
+    """
+    The maximum size of a received message, the connection is closed with
+    1009 if a message is larger.
+    """
+
+    max_queue_size = 16
+    """
+    The maximum number of the received messages that are not consumed, the
+    connection stops reading when it is reached.
+    """
+
+    close_timeout = 5
+    """
+    The seconds to wait for the client to respond the close frame.
+    """
+
+    compress_messages = True
+    """
+    Accept the permessage-deflate extension if the client offers it.
+    """
+
+    compress_level = 6
+
+    compress_min_size = 64
+    """
+    The messages smaller than this are sent uncompressed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        RequestHandler.__init__(self, *args, **kwargs)
+        self.websocket = None
+
+    def check_origin(self, origin: str) -> bool:
+        """
+        Return `True` if the connection from the origin is allowed.
+
+        By default, only the connections from the same host are allowed, to
+        prevent the cross-site WebSocket hijacking, override it to allow other
+        origins.
+        """
+        parsed_origin = urllib.parse.urlparse(origin)
+        return parsed_origin.netloc.lower() == (
+            self.request.host or "").lower()
+
+    def select_subprotocol(self, subprotocols: List[str]) -> Optional[str]:
+        """
+        Select a subprotocol from the Sec-WebSocket-Protocol header of the
+        request, return `None` to select no subprotocol.
+        """
+        return None
+
+    async def handle_websocket(self, *args, **kwargs):
+        """
+        Must be overridden in subclass to communicate with the client by
+        `websocket`.
+
+        **This is a Coroutine.**
+        """
+        raise NotImplementedError
+
+    def on_connection_close(self):
+        """
+        Called when the connection is closed by the client or lost during
+        `handle_websocket`, override it to release the resources of the
+        connection.
+        """
+        pass
+
+    def is_websocket_request(self) -> bool:
+        """
+        Return `True` if the request is a valid WebSocket Upgrade request.
+        """
+        request = self.request
+        if (request.method != "GET" or request.http_version != 11 or
+                request._body_expected):
+            return False
+
+        def get_tokens(name):
+            return [token.strip().lower()
+                    for token in self.get_header(name, "").split(",")]
+
+        if ("websocket" not in get_tokens("upgrade") or
+                "upgrade" not in get_tokens("connection") or
+                self.get_header("sec-websocket-version", None) != "13"):
+            return False
+
+        try:
+            key = base64.b64decode(
+                self.get_header("sec-websocket-key", ""), validate=True)
+        except (binascii.Error, ValueError):
+            return False
+        return len(key) == 16
+
+    def prepare_websocket(self):
+        """
+        Called when the initial of the request is received, the connection
+        is handed over to `websocket` if it is a WebSocket Upgrade request.
+        """
+        if not self.is_websocket_request():
+            return
+
+        self.websocket = websocket.WebSocketConnection(
+            self.server, max_message_size=self.max_message_size,
+            max_queue_size=self.max_queue_size,
+            close_timeout=self.close_timeout, loop=self.app._loop)
+        self.server.direct_receiver = self.websocket.data_received
+        self.websocket.data_received(self.connection.detach())
+
+    async def get(self, *args, **kwargs):
+        self.set_header("upgrade", "websocket")
+        self.set_header("sec-websocket-version", "13")
+        raise HTTPError(426)
+
+    def _accept_websocket(self):
+        headers = protocol.HTTPHeaders()
+        headers["upgrade"] = "websocket"
+        headers["connection"] = "Upgrade"
+        headers["sec-websocket-accept"] = websocket.get_accept_key(
+            self.get_header("sec-websocket-key"))
+        headers["date"] = format_timestamp()
+
+        subprotocols = [
+            subprotocol.strip() for subprotocol in self.get_header(
+                "sec-websocket-protocol", "").split(",")
+            if subprotocol.strip()]
+        if subprotocols:
+            subprotocol = self.select_subprotocol(subprotocols)
+            if subprotocol is not None:
+                headers["sec-websocket-protocol"] = subprotocol
+
+        extension = None
+        offers = self.get_header("sec-websocket-extensions", None)
+        if self.compress_messages and offers:
+            negotiated = websocket.PerMessageDeflate.negotiate(
+                offers, compress_level=self.compress_level,
+                compress_min_size=self.compress_min_size)
+            if negotiated is not None:
+                headers["sec-websocket-extensions"], extension = negotiated
+
+        self.connection.write_initial(
+            http_version=11, method="GET", status_code=101, headers=headers)
+        self._initial_written = True
+        self._finished = True
+        self.websocket.start(extension)
+
+    async def _handle_request(self):
+        if self.websocket is None:
+            await RequestHandler._handle_request(self)
+            return
+
+        origin = self.get_header("origin", None)
+        if origin is not None and not self.check_origin(origin):
+            self.write_error(403, "Cross Origin WebSocket is not allowed.")
+            self.finish()
+            return
+
+        try:
+            self._accept_websocket()
+            await self.handle_websocket(*self.path_args, **self.path_kwargs)
+
+        except asyncio.CancelledError:
+            # The connection is lost.
+            self.websocket.connection_lost()
+            self.on_connection_close()
+            raise
+
+        except websocket.WebSocketClosedError:
+            # The connection is closed by the client.
+            self.on_connection_close()
+            return
+
+        except Exception:
+            if self.settings.get("debug", False):
+                traceback.print_exc()
+            await self.websocket.close(1011)
+            return
+
+        await self.websocket.close()
+
+
+def compress_static_files(static_path: str,
+                          encodings: Sequence[str]=("gzip", "br"),
+                          min_size: int=256) -> List[str]:
+    """
+    Generate the precompressed variants of the files in the static_path for
+    `StaticFileHandler`, such as ``foo.js.gz`` and ``foo.js.br`` for
+    ``foo.js``. This should be called at the build time, so the files do not
+    need to be compressed when they are requested.
+
+    A variant is only generated if it is smaller than the file, and it is
+    regenerated only if the file is newer than it. The ``br`` variants will be
+    skipped if brotli is not installed.
+
+    Return the paths of the generated variants.
+
+    :arg static_path: the static path.
+    :arg encodings: the content codings of the variants.
+    :arg min_size: the files smaller than this number of bytes will be
+      skipped.
+    """
+    suffixes = dict(_PRECOMPRESSED_SUFFIXES)
+    generated_paths = []
+
+    for dir_path, _, file_names in os.walk(static_path):
+        for file_name in file_names:
+            if file_name.endswith(tuple(suffixes.values())):
+                continue
+
+            file_path = os.path.join(dir_path, file_name)
+            file_stat = os.stat(file_path)
+            if file_stat.st_size < min_size:
+                continue
+
+            content = None
+            for encoding in encodings:
+                if encoding == "br" and brotli is None:
+                    continue
+
+                variant_path = file_path + suffixes[encoding]
+                try:
+                    if os.stat(variant_path).st_mtime >= file_stat.st_mtime:
+                        continue
+                except FileNotFoundError:
+                    pass
+
+                if content is None:
+                    content = _read_file(file_path)
+
+                if encoding == "gzip":
+                    compressed_content = _gzip_compress(content)
+                else:
+                    compressed_content = brotli.compress(content)
+
+                if len(compressed_content) >= len(content):
+                    # The compression is useless, remove the stale variant.
+                    try:
+                        os.remove(variant_path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+
+                temp_path = variant_path + ".tmp"
+                with open(temp_path, "wb") as f:
+                    f.write(compressed_content)
+                os.replace(temp_path, variant_path)
+
+                generated_paths.append(variant_path)
+
+    return generated_paths
+
+
+def _gzip_compress(content: bytes) -> bytes:
+    buf = io.BytesIO()
+    # Set mtime to 0 so the same file always has the same variant.
+    with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=9,
+                       mtime=0) as f:
+        f.write(content)
+    return buf.getvalue()
+
+
+def _compress_body(compressor: "zlib.Compress", body: bytes) -> bytes:
+    return compressor.compress(body) + compressor.flush(zlib.Z_FINISH)
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _hash_file(path: str) -> str:
+    content_hash = hashlib.md5()
+    with open(path, "rb") as f:
+        for chunk in iter(functools.partial(f.read, 64 * 1024), b""):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+def _hash_static_file(
+        static_path: str, file_uri_path: str,
+        content_hash: Optional[str]=None,
+        stat_key: Optional[tuple]=None) -> Optional[Tuple[str, tuple]]:
+    """
+    Return the content hash and the ``(mtime, size)`` of the file, or `None`
+    if the file is not accessible. The file is hashed only if the
+    ``(mtime, size)`` is different from the stat_key.
+    """
+    real_static_path = os.path.realpath(static_path)
+    file_path = os.path.realpath(os.path.join(static_path, file_uri_path))
+
+    if os.path.commonpath([real_static_path, file_path]) != real_static_path:
+        return None
+    try:
+        stat_result = os.stat(file_path)
+        if not stat.S_ISREG(stat_result.st_mode):
+            return None
+
+        new_stat_key = (stat_result.st_mtime_ns, stat_result.st_size)
+        if content_hash is None or new_stat_key != stat_key:
+            content_hash = _hash_file(file_path)
+    except OSError:
+        return None
+    return content_hash, new_stat_key
+
+
+def _read_file_chunk(f: BinaryIO, offset: int, size: int) -> bytes:
+    f.seek(offset)
+    return f.read(size)
+
+
+class _ServerGroup:
+    """
+    The servers listening to the sockets of an `Application.listen` call.
+    """
+    def __init__(self, servers: List[asyncio.AbstractServer]):
+        self.servers = servers
+
+    @property
+    def sockets(self) -> List[socket.socket]:
+        return [sock for srv in self.servers for sock in (srv.sockets or [])]
+
+    def close(self):
+        for srv in self.servers:
+            srv.close()
+
+    async def wait_closed(self):
+        for srv in self.servers:
+            await srv.wait_closed()
+
+
+class Application:
+    """
+    Class that its instance creates asyncio compatible servers,
+    stores handler list, finds every request's handler,
+    and passes it to server.
+
+    :arg loop: A Custom EventLoop, or FutureFinity will use the result of
+      `asyncio.get_event_loop()`.
+    :arg uvloop: Default: `False`. Install uvloop as the event loop policy and
+      use a uvloop event loop as the current event loop, if the `loop`
+      attribute is not set. If uvloop is not available, asyncio's default
+      event loop will be used.
     :arg template_path: The default template_path.
       This will also initialize the default template loader if it is set.
     :arg security_secret: The secret for security purpose.
@@ -938,12 +3277,59 @@ class Application:
       This is an regualr expression that indicates routing path will be used
       for the default static file handler. The attribute `file` in the
       regualr expression will be passed to the default static file handler.
+    :arg static_url_prefix: Default: `"/static/"`. The url prefix of the
+      static files used by `RequestHandler.static_url`, it should match the
+      `static_handler_path`.
+    :arg static_preload_hashes: Default: `()`. The glob patterns of the
+      static files(e.g.: ``["*.css", "js/**/*.js"]``) whose content hashes
+      are computed by `Application.warmup`, the hashes of the other files are
+      computed in the thread pool of the event loop on the first use.
+    :arg static_cache_size: Default: `1024`. The maximum number of static
+      files whose metadata is cached.
+    :arg static_cache_interval: Default: `1`. The number of seconds that the
+      cached metadata of a static file is trusted before it is checked again.
+    :arg static_memory_cache_size: Default: `16777216`(16MiB). The maximum
+      total size in bytes of the static file contents cached in memory. Set
+      it to `0` to disable it.
+    :arg static_memory_threshold: Default: `65536`(64KiB). Only the static
+      files that are not larger than this size are cached in memory.
+    :arg static_precompressed: Default: `True`. Send the precompressed
+      variants of the static files(``.br`` and ``.gz``) if the client accepts
+      them.
+
+    :arg response_cache: Default: `False`. Cache the responses that have a
+      max-age or s-maxage cache-control directive in memory, see
+      `ResponseCache`.
+    :arg response_cache_size: Default: `67108864`(64MiB). The maximum total
+      size in bytes of the cached responses.
+    :arg response_cache_entry_size: Default: `1048576`(1MiB). The responses
+      larger than this size are not cached.
+    :arg etag_strategy: Default: `"strong"`. The strategy to compute the
+      etags of the responses, it can be `"strong"`, `"weak"`, `"version"`, or
+      `"off"`. See `RequestHandler.compute_etag`.
+    :arg compress_response: Default: `False`. Compress the responses by gzip
+      or deflate if the client accepts it. Only the responses whose content
+      types are in `RequestHandler.compressible_types` are compressed.
+    :arg compress_level: Default: `6`. The compression level from `1` to `9`.
+    :arg compress_min_size: Default: `1024`. The complete response bodies
+      that are smaller than this size are not compressed.
+    :arg compress_executor_size: Default: `262144`(256KiB). The response
+      bodies that are not smaller than this size are compressed in the
+      thread pool of the event loop.
 
     :arg \*\*kwargs: All the other keyword arguments will be in the application
       settings too.
     """
     def __init__(self, **kwargs):
         self.settings = kwargs
+        if "loop" not in self.settings and self.settings.get("uvloop", False):
+            if install_uvloop():
+                try:
+                    current_loop = asyncio.get_event_loop()
+                except RuntimeError:  # No event loop is set for uvloop.
+                    current_loop = None
+                if not isinstance(current_loop, uvloop.Loop):
+                    asyncio.set_event_loop(new_event_loop(use_uvloop=True))
         self._loop = self.settings.get(
             "loop", asyncio.get_event_loop())  # type: asyncio.BaseEventLoop
 
@@ -970,35 +3356,230 @@ class Application:
                                                     r"/static/(?P<file>.*?)")
             self.handlers.add(static_handler_path, StaticFileHandler)
 
-    def make_server(self) -> asyncio.Protocol:
+        self.response_cache = None
+        if self.settings.get("response_cache", False):
+            self.response_cache = ResponseCache(
+                max_size=self.settings.get("response_cache_size",
+                                           64 * 1024 * 1024),
+                max_entry_size=self.settings.get("response_cache_entry_size",
+                                                 1024 * 1024))
+
+        self.static_file_cache = StaticFileCache(
+            precompressed=self.settings.get("static_precompressed", True),
+            max_entries=self.settings.get("static_cache_size", 1024),
+            revalidate_interval=self.settings.get("static_cache_interval", 1),
+            max_content_size=self.settings.get("static_memory_cache_size",
+                                               16 * 1024 * 1024),
+            content_threshold=self.settings.get("static_memory_threshold",
+                                                64 * 1024))
+
+        self._coalesced_requests = {}
+
+        self._warmup_hooks = []
+
+        self._servers = []
+        self._connections = set()
+        self._handled_requests = 0
+        self._shutting_down = False
+
+    def add_warmup_hook(self, hook: FunctionType) -> FunctionType:
+        """
+        Add a hook that will be called by `Application.warmup`.
+
+        The hook will be called without any arguments, and it can be either a
+        normal function or a coroutine function. It can be used as a
+        decorator::
+
+          @app.add_warmup_hook
+          async def connect_database():
+              ...
+        """
+        self._warmup_hooks.append(hook)
+        return hook
+
+    def warmup(self):
+        """
+        Prepare everything that can be prepared before serving any request.
+
+        It runs all the warmup hooks, loads and parses all the templates,
+        initializes the mimetypes database, caches the metadata of the static
+        files, and computes the hashes of the static files that match the
+        `static_preload_hashes` setting for `RequestHandler.static_url`.
+
+        This is called by `process.Launcher` before the worker processes are
+        forked, so the prepared objects can be shared by all the workers.
+        """
+        for hook in self._warmup_hooks:
+            result = hook()
+            if asyncio.iscoroutine(result):
+                self._loop.run_until_complete(result)
+
+        if self.template_loader is not None:
+            self.template_loader.preload_templates()
+
+        if not mimetypes.inited:
+            mimetypes.init()
+
+        if "static_path" in self.settings.keys():
+            self.static_file_cache.preload(self.settings["static_path"])
+            self.static_file_cache.preload_content_hashes(
+                self.settings["static_path"],
+                self.settings.get("static_preload_hashes", ()))
+
+    def make_server(self, **kwargs) -> asyncio.Protocol:
         """
         Make a asyncio compatible server.
+
+        The keyword arguments are passed to :class:`ApplicationHTTPServer`.
         """
+        kwargs.setdefault(
+            "allow_keep_alive", self.settings.get("allow_keep_alive", True))
         return functools.partial(
-            ApplicationHTTPServer, app=self, loop=self._loop,
-            allow_keep_alive=self.settings.get("allow_keep_alive", True))
+            ApplicationHTTPServer, app=self, loop=self._loop, **kwargs)
 
     def listen(self, port: int,
-               address: str="127.0.0.1",
-               context: Union[bool, ssl.SSLContext,
-                              None]=None) -> CoroutineType:
+               address: Union[str, Sequence[str], None]="127.0.0.1",
+               context: Union[bool, ssl.SSLContext, None]=None,
+               backlog: int=100, reuse_port: bool=False,
+               tcp_nodelay: Optional[bool]=True,
+               tcp_keepalive: Optional[bool]=None,
+               tcp_defer_accept: Optional[int]=None,
+               tcp_fastopen: Optional[int]=None,
+               send_buffer_size: Optional[int]=None,
+               recv_buffer_size: Optional[int]=None) -> CoroutineType:
         """
         Make the server to listen to the specified port and address.
 
         :arg port: The port number that futurefinity is going to bind.
-        :arg address: the address that futurefinity is going to bind.
+        :arg address: the address that futurefinity is going to bind. It can
+          also be a list of addresses to bind all of them at once, or `None`
+          to bind all the interfaces.
+        :arg context: The TLS Context used to the server.
+        :arg backlog: The maximum number of queued connections.
+        :arg reuse_port: Set ``SO_REUSEPORT`` on the listening sockets, so
+          multiple processes can bind to the same port.
+        :arg tcp_nodelay: Set ``TCP_NODELAY`` on the accepted sockets.
+        :arg tcp_keepalive: Set ``SO_KEEPALIVE`` on the accepted sockets.
+        :arg tcp_defer_accept: Set ``TCP_DEFER_ACCEPT`` on the listening
+          sockets(Linux only).
+        :arg tcp_fastopen: Set ``TCP_FASTOPEN`` on the listening sockets.
+        :arg send_buffer_size: Set ``SO_SNDBUF`` on the listening sockets.
+        :arg recv_buffer_size: Set ``SO_RCVBUF`` on the listening sockets.
+
+        The options that are not supported by the platform will be ignored.
+        The options of the listening sockets are set before they start
+        listening, so the accepted sockets inherit them.
+
+        If more than one socket is listening, a server group that has the
+        `sockets`, `close` and `wait_closed` of the servers is returned.
+        """
+        socks = []
+        try:
+            for family, sock_type, proto, sockaddr in (
+                    server.get_listening_addresses(port, address)):
+                socks.append(server.create_listening_socket(
+                    family, sock_type, proto, sockaddr, backlog=backlog,
+                    reuse_port=reuse_port, tcp_defer_accept=tcp_defer_accept,
+                    tcp_fastopen=tcp_fastopen,
+                    send_buffer_size=send_buffer_size,
+                    recv_buffer_size=recv_buffer_size))
+        except:
+            for sock in socks:
+                sock.close()
+            raise
+
+        servers = [self.listen_socket(sock, context=context,
+                                      tcp_nodelay=tcp_nodelay,
+                                      tcp_keepalive=tcp_keepalive)
+                   for sock in socks]
+        if len(servers) == 1:
+            return servers[0]
+        return _ServerGroup(servers)
+
+    def listen_unix(self, path: str, mode: Optional[int]=None,
+                    context: Union[bool, ssl.SSLContext, None]=None,
+                    backlog: int=100) -> CoroutineType:
+        """
+        Make the server to listen to the specified unix domain socket.
+
+        The stale socket file at the path will be removed before binding.
+
+        :arg path: The path of the socket file.
+        :arg mode: The permission bits of the socket file, such as `0o660`.
+          Default: `None`, which keeps the default of the umask.
         :arg context: The TLS Context used to the server.
+        :arg backlog: The maximum number of queued connections.
+        """
+        return self.listen_socket(server.create_unix_listening_socket(
+            path, mode=mode, backlog=backlog), context=context)
+
+    def listen_socket(self, sock: socket.socket,
+                      context: Union[bool, ssl.SSLContext, None]=None,
+                      tcp_nodelay: Optional[bool]=True,
+                      tcp_keepalive: Optional[bool]=None) -> CoroutineType:
+        """
+        Make the server to listen to a socket that is already bound and
+        listening, such as a socket passed by the process manager.
+
+        :arg sock: The listening socket, it can be a TCP socket or a unix
+          domain socket.
+        :arg context: The TLS Context used to the server.
+        :arg tcp_nodelay: Set ``TCP_NODELAY`` on the accepted sockets.
+        :arg tcp_keepalive: Set ``SO_KEEPALIVE`` on the accepted sockets.
         """
         if context:
             if isinstance(context, bool):
                 context = ssl.create_default_context()
         else:
             context = None
-        f = self._loop.create_server(self.make_server(), address, port,
-                                     ssl=context)
+        sock.setblocking(False)
+        if sock.family == socket.AF_UNIX:
+            f = self._loop.create_unix_server(
+                self.make_server(), sock=sock, ssl=context)
+        else:
+            f = self._loop.create_server(
+                self.make_server(tcp_nodelay=tcp_nodelay,
+                                 tcp_keepalive=tcp_keepalive),
+                sock=sock, ssl=context)
         srv = self._loop.run_until_complete(f)
+        self._servers.append(srv)
         return srv
 
+    async def shutdown(self, timeout: Optional[float]=None):
+        """
+        Stop the application gracefully.
+
+        It stops listening, closes all the idle connections, and waits for the
+        requests that are being handled to finish. When the timeout is
+        reached, all the remaining connections will be closed.
+
+        **This is a Coroutine.**
+
+        :arg timeout: The maximum time to wait in seconds. Default: `None`,
+          which means wait until all the requests are finished.
+        """
+        self._shutting_down = True
+
+        for srv in self._servers:
+            srv.close()
+
+        for connection in list(self._connections):
+            connection.close_when_idle()
+
+        if timeout is not None:
+            deadline = self._loop.time() + timeout
+        while self._connections:
+            if timeout is not None and self._loop.time() >= deadline:
+                break
+            await asyncio.sleep(0.05)
+
+        for connection in list(self._connections):
+            connection.transport.close()
+
+        for srv in self._servers:
+            await srv.wait_closed()
+        self._servers.clear()
+
     def add_handler(self, path: str, *args, name: str=None,
                     handler: RequestHandler=None,
                     **kwargs) -> Optional[FunctionType]:
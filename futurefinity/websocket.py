@@ -0,0 +1,706 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016 Futur Solo
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+``futurefinity.websocket`` contains the implementation of the WebSocket
+Protocol(RFC 6455) and the permessage-deflate extension(RFC 7692).
+
+The handshake is handled by `futurefinity.web.WebSocketHandler`.
+"""
+
+from futurefinity.utils import FutureFinityError
+
+from typing import Union, Optional, Any, Iterable, Mapping, Tuple
+
+import asyncio
+
+import zlib
+import base64
+import struct
+import hashlib
+import collections
+
+
+_WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+OPCODE_CONTINUATION = 0x0
+OPCODE_TEXT = 0x1
+OPCODE_BINARY = 0x2
+OPCODE_CLOSE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+
+_DATA_OPCODES = (OPCODE_CONTINUATION, OPCODE_TEXT, OPCODE_BINARY)
+_CONTROL_OPCODES = (OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG)
+
+# The close codes that can be sent in a close frame.
+_VALID_CLOSE_CODES = (1000, 1001, 1002, 1003, 1007, 1008, 1009, 1010, 1011)
+
+_DEFLATE_TRAILER = b"\x00\x00\xff\xff"
+
+_WS_CONNECTING = object()
+_WS_OPEN = object()
+_WS_CLOSING = object()
+_WS_CLOSED = object()
+
+
+class WebSocketError(FutureFinityError):
+    """
+    FutureFinity WebSocket Error.
+
+    All Errors from the WebSocket Protocol are based on this class.
+    """
+    pass
+
+
+class WebSocketProtocolError(WebSocketError):
+    """
+    Raised when the remote violates the protocol, the connection will be
+    closed with the code.
+    """
+    def __init__(self, message: str, code: int=1002):
+        WebSocketError.__init__(self, message)
+        self.code = code
+
+
+class WebSocketClosedError(WebSocketError):
+    """
+    Raised when receiving from or sending to a closed WebSocket connection.
+    """
+    def __init__(self, code: Optional[int]=None, reason: str=""):
+        WebSocketError.__init__(
+            self, "WebSocket connection is closed(%s)." % code)
+        self.code = code
+        self.reason = reason
+
+
+def get_accept_key(key: str) -> str:
+    """
+    Get the value of the Sec-WebSocket-Accept header for the
+    Sec-WebSocket-Key header.
+    """
+    return base64.b64encode(hashlib.sha1(
+        key.encode() + _WEBSOCKET_GUID).digest()).decode()
+
+
+def apply_mask(mask_key: bytes, data: bytes) -> bytes:
+    """
+    Mask or unmask the payload with the 4 bytes masking key.
+    """
+    length = len(data)
+    if not length:
+        return b""
+    mask = (mask_key * (length // 4 + 1))[:length]
+    return (int.from_bytes(data, "little") ^
+            int.from_bytes(mask, "little")).to_bytes(length, "little")
+
+
+def build_frame(opcode: int, payload: bytes, fin: bool=True,
+                rsv1: bool=False, mask_key: Optional[bytes]=None) -> bytes:
+    """
+    Build a WebSocket frame.
+
+    :arg mask_key: The masking key, the frames sent by the clients must be
+      masked. Default: `None`, which means the frame is not masked.
+    """
+    first_byte = opcode
+    if fin:
+        first_byte |= 0x80
+    if rsv1:
+        first_byte |= 0x40
+
+    mask_bit = 0x80 if mask_key is not None else 0
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", first_byte, mask_bit | length)
+    elif length < 65536:
+        header = struct.pack("!BBH", first_byte, mask_bit | 126, length)
+    else:
+        header = struct.pack("!BBQ", first_byte, mask_bit | 127, length)
+
+    if mask_key is not None:
+        return header + mask_key + apply_mask(mask_key, payload)
+    return header + payload
+
+
+def _build_message_frame(message: Union[str, bytes],
+                         extension: Optional["PerMessageDeflate"]) -> bytes:
+    if isinstance(message, str):
+        opcode = OPCODE_TEXT
+        payload = message.encode("utf-8")
+    else:
+        opcode = OPCODE_BINARY
+        payload = bytes(message)
+
+    if extension is not None and len(payload) >= extension.compress_min_size:
+        return build_frame(opcode, extension.compress(payload), rsv1=True)
+    return build_frame(opcode, payload)
+
+
+def _parse_extension_header(
+        value: str) -> Iterable[Tuple[str, Mapping[str, Optional[str]]]]:
+    for offer in value.split(","):
+        parts = [part.strip() for part in offer.split(";")]
+        if not parts[0]:
+            continue
+        params = {}
+        for param in parts[1:]:
+            name, _, param_value = param.partition("=")
+            name = name.strip().lower()
+            if name in params:
+                params = None  # Duplicate parameters are invalid.
+                break
+            params[name] = param_value.strip().strip("\"") or None
+        if params is not None:
+            yield parts[0].lower(), params
+
+
+class PerMessageDeflate:
+    """
+    The permessage-deflate extension negotiated on a connection.
+
+    :arg server_no_context_takeover: Reset the compressor after each message.
+    :arg client_no_context_takeover: Reset the decompressor after each
+      message.
+    :arg server_max_window_bits: The window bits of the compressor.
+    :arg compress_level: The level of the compressor.
+    :arg compress_min_size: The messages smaller than this are not
+      compressed.
+    """
+    def __init__(self, server_no_context_takeover: bool=False,
+                 client_no_context_takeover: bool=False,
+                 server_max_window_bits: int=15, compress_level: int=6,
+                 compress_min_size: int=64):
+        self.server_no_context_takeover = server_no_context_takeover
+        self.client_no_context_takeover = client_no_context_takeover
+        self.server_max_window_bits = server_max_window_bits
+        self.compress_level = compress_level
+        self.compress_min_size = compress_min_size
+
+        self._compressor = None
+        self._decompressor = None
+
+    @classmethod
+    def negotiate(cls, offers: str, **kwargs) -> Optional[
+            Tuple[str, "PerMessageDeflate"]]:
+        """
+        Accept the first acceptable permessage-deflate offer in the
+        Sec-WebSocket-Extensions header.
+
+        Return the value of the Sec-WebSocket-Extensions response header and
+        the extension, or `None` if no offer is acceptable.
+        """
+        for name, params in _parse_extension_header(offers):
+            if name != "permessage-deflate":
+                continue
+
+            response_params = ["permessage-deflate"]
+            extension_kwargs = dict(kwargs)
+            extension_kwargs["server_max_window_bits"] = 15
+            acceptable = True
+            for param_name, value in params.items():
+                if param_name in ("server_no_context_takeover",
+                                  "client_no_context_takeover"):
+                    if value is not None:
+                        acceptable = False
+                        break
+                    extension_kwargs[param_name] = True
+                    response_params.append(param_name)
+
+                elif param_name == "server_max_window_bits":
+                    # zlib does not support the window bits of 8 for raw
+                    # deflate streams.
+                    if value is None or not value.isdigit() or not (
+                            9 <= int(value) <= 15):
+                        acceptable = False
+                        break
+                    extension_kwargs[param_name] = int(value)
+                    response_params.append(
+                        "server_max_window_bits=%d" % int(value))
+
+                elif param_name == "client_max_window_bits":
+                    # The decompressor with the maximum window bits can
+                    # decompress the messages compressed with any window.
+                    if value is not None and (not value.isdigit() or not (
+                            8 <= int(value) <= 15)):
+                        acceptable = False
+                        break
+
+                else:
+                    acceptable = False
+                    break
+
+            if acceptable:
+                return "; ".join(response_params), cls(**extension_kwargs)
+
+        return None
+
+    def compress(self, data: bytes) -> bytes:
+        """
+        Compress the payload of a message.
+        """
+        if self._compressor is None:
+            self._compressor = zlib.compressobj(
+                self.compress_level, zlib.DEFLATED,
+                -self.server_max_window_bits)
+        compressed = self._compressor.compress(data) + \
+            self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.server_no_context_takeover:
+            self._compressor = None
+        if compressed.endswith(_DEFLATE_TRAILER):
+            compressed = compressed[:-4]
+        return compressed
+
+    def decompress(self, data: bytes, max_length: int) -> bytes:
+        """
+        Decompress the payload of a message.
+
+        It raises a `WebSocketProtocolError` if the payload is invalid, or
+        the decompressed payload is longer than the max_length.
+        """
+        if self._decompressor is None:
+            self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+        try:
+            decompressed = self._decompressor.decompress(
+                data + _DEFLATE_TRAILER, max_length + 1)
+        except zlib.error as e:
+            raise WebSocketProtocolError(
+                "Invalid compressed message.", code=1007) from e
+        if len(decompressed) > max_length:
+            raise WebSocketProtocolError("Message too big.", code=1009)
+        if self.client_no_context_takeover:
+            self._decompressor = None
+        return decompressed
+
+    def can_share_frames(self) -> bool:
+        """
+        Return `True` if a message compressed for this connection can be sent
+        to other connections with the same parameters.
+        """
+        return self.server_no_context_takeover
+
+    def get_sharing_key(self) -> tuple:
+        """
+        Return the key of the parameters that affect the compressed frames.
+        """
+        return (self.server_max_window_bits, self.compress_level)
+
+
+class WebSocketConnection:
+    """
+    A WebSocket Connection on the server side.
+
+    The frames received before `start` is called are buffered.
+
+    :arg controller: The `futurefinity.server.HTTPServer` of the connection.
+    :arg max_message_size: The maximum size of a received message,
+      the connection is closed with 1009 if a message is larger.
+    :arg max_queue_size: The maximum number of the received messages that
+      are not consumed by `receive`, the transport stops reading when it is
+      reached.
+    :arg close_timeout: The seconds to wait for the close frame of the remote
+      after the close frame is sent.
+    """
+    def __init__(self, controller: Any,
+                 max_message_size: int=16 * 1024 * 1024,
+                 max_queue_size: int=16, close_timeout: float=5,
+                 loop: Optional[asyncio.BaseEventLoop]=None):
+        self.controller = controller
+        self.max_message_size = max_message_size
+        self.max_queue_size = max_queue_size
+        self.close_timeout = close_timeout
+        self._loop = loop or asyncio.get_event_loop()
+
+        self.extension = None
+        self.close_code = None
+        self.close_reason = ""
+
+        self._state = _WS_CONNECTING
+        self._pending_bytes = bytearray()
+
+        self._fragments = []
+        self._fragments_length = 0
+        self._fragments_opcode = None
+        self._fragments_compressed = False
+
+        self._messages = collections.deque()
+        self._receive_waiter = None
+        self._reading_paused = False
+
+        self._pings = collections.OrderedDict()
+        self._close_waiter = None
+
+    @property
+    def is_open(self) -> bool:
+        """
+        `True` if the connection is started and not closing or closed.
+        """
+        return self._state is _WS_OPEN
+
+    def start(self, extension: Optional[PerMessageDeflate]=None):
+        """
+        Start the connection after the handshake response is written, and
+        parse the frames that have been received.
+        """
+        self.extension = extension
+        self._state = _WS_OPEN
+        self._parse_frames()
+
+    def data_received(self, data: Union[bytes, memoryview]):
+        """
+        Trigger this function when data is received from the remote.
+        """
+        if self._state is _WS_CLOSED:
+            return
+        self._pending_bytes += data
+        if self._state is not _WS_CONNECTING:
+            self._parse_frames()
+
+    def connection_lost(self, exc: Optional[tuple]=None):
+        """
+        Triggered when the transport is closed.
+        """
+        if self._state is _WS_CLOSED:
+            return
+        self._state = _WS_CLOSED
+        if self.close_code is None:
+            self.close_code = 1006  # Closed abnormally.
+
+        self._wake_receiver()
+        for waiter in self._pings.values():
+            if not waiter.done():
+                waiter.set_exception(
+                    WebSocketClosedError(self.close_code, self.close_reason))
+                waiter.exception()  # Mark the exception as retrieved.
+        self._pings.clear()
+        if self._close_waiter is not None and not self._close_waiter.done():
+            self._close_waiter.set_result(None)
+
+    def _close_transport(self):
+        if not self.controller.transport.is_closing():
+            self.controller.transport.close()
+        self.connection_lost()
+
+    def _wake_receiver(self):
+        waiter = self._receive_waiter
+        self._receive_waiter = None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def _parse_frames(self):
+        try:
+            while self._state in (_WS_OPEN, _WS_CLOSING):
+                if not self._parse_frame():
+                    break
+        except WebSocketProtocolError as e:
+            self._fail(e.code, str(e))
+
+    def _parse_frame(self) -> bool:
+        data = self._pending_bytes
+        if len(data) < 2:
+            return False
+
+        first_byte, second_byte = data[0], data[1]
+        fin = bool(first_byte & 0x80)
+        rsv1 = bool(first_byte & 0x40)
+        opcode = first_byte & 0x0F
+        masked = bool(second_byte & 0x80)
+        length = second_byte & 0x7F
+
+        if first_byte & 0x30:
+            raise WebSocketProtocolError("Reserved bits are set.")
+        if opcode not in _DATA_OPCODES + _CONTROL_OPCODES:
+            raise WebSocketProtocolError("Unknown opcode.")
+        if not masked:
+            raise WebSocketProtocolError("The frame is not masked.")
+
+        if opcode in _CONTROL_OPCODES:
+            if not fin or length > 125 or rsv1:
+                raise WebSocketProtocolError("Invalid control frame.")
+        elif rsv1 and (self.extension is None or
+                       opcode == OPCODE_CONTINUATION):
+            raise WebSocketProtocolError("Unexpected compressed frame.")
+
+        header_length = 2
+        if length == 126:
+            header_length = 4
+            if len(data) < header_length:
+                return False
+            length = struct.unpack_from("!H", data, 2)[0]
+        elif length == 127:
+            header_length = 10
+            if len(data) < header_length:
+                return False
+            length = struct.unpack_from("!Q", data, 2)[0]
+            if length >> 63:
+                raise WebSocketProtocolError("Invalid payload length.")
+
+        if opcode not in _CONTROL_OPCODES and (
+                self._fragments_length + length > self.max_message_size):
+            raise WebSocketProtocolError("Message too big.", code=1009)
+
+        frame_length = header_length + 4 + length
+        if len(data) < frame_length:
+            return False
+
+        mask_key = bytes(data[header_length:header_length + 4])
+        payload = apply_mask(
+            mask_key, bytes(data[header_length + 4:frame_length]))
+        del data[:frame_length]
+
+        if opcode in _CONTROL_OPCODES:
+            self._control_frame_received(opcode, payload)
+        else:
+            self._data_frame_received(fin, rsv1, opcode, payload)
+        return True
+
+    def _data_frame_received(self, fin: bool, rsv1: bool, opcode: int,
+                             payload: bytes):
+        if opcode == OPCODE_CONTINUATION:
+            if self._fragments_opcode is None:
+                raise WebSocketProtocolError("Unexpected continuation frame.")
+        else:
+            if self._fragments_opcode is not None:
+                raise WebSocketProtocolError("Expect a continuation frame.")
+            self._fragments_opcode = opcode
+            self._fragments_compressed = rsv1
+
+        self._fragments.append(payload)
+        self._fragments_length += len(payload)
+        if not fin:
+            return
+
+        payload = b"".join(self._fragments)
+        opcode = self._fragments_opcode
+        compressed = self._fragments_compressed
+        self._fragments = []
+        self._fragments_length = 0
+        self._fragments_opcode = None
+        self._fragments_compressed = False
+
+        if self._state is not _WS_OPEN:
+            return  # The messages after the close frame are discarded.
+
+        if compressed:
+            payload = self.extension.decompress(
+                payload, self.max_message_size)
+
+        if opcode == OPCODE_TEXT:
+            try:
+                message = payload.decode("utf-8")
+            except UnicodeDecodeError as e:
+                raise WebSocketProtocolError(
+                    "Invalid UTF-8 text.", code=1007) from e
+        else:
+            message = payload
+
+        self._messages.append(message)
+        if len(self._messages) >= self.max_queue_size and (
+                not self._reading_paused):
+            self._reading_paused = True
+            self.controller.transport.pause_reading()
+        self._wake_receiver()
+
+    def _control_frame_received(self, opcode: int, payload: bytes):
+        if opcode == OPCODE_PING:
+            if self._state is _WS_OPEN:
+                self._write_frame(build_frame(OPCODE_PONG, payload))
+
+        elif opcode == OPCODE_PONG:
+            if payload in self._pings:
+                # The pings sent before are also considered answered.
+                while self._pings:
+                    data, waiter = self._pings.popitem(last=False)
+                    if not waiter.done():
+                        waiter.set_result(None)
+                    if data == payload:
+                        break
+
+        else:
+            if len(payload) == 1:
+                raise WebSocketProtocolError("Invalid close frame.")
+            if payload:
+                code = struct.unpack_from("!H", payload)[0]
+                if code not in _VALID_CLOSE_CODES and not (
+                        3000 <= code < 5000):
+                    raise WebSocketProtocolError("Invalid close code.")
+                try:
+                    reason = payload[2:].decode("utf-8")
+                except UnicodeDecodeError as e:
+                    raise WebSocketProtocolError(
+                        "Invalid close reason.", code=1007) from e
+            else:
+                code, reason = 1005, ""  # No status code is received.
+
+            if self._state is _WS_OPEN:
+                self.close_code, self.close_reason = code, reason
+                self._write_frame(build_frame(
+                    OPCODE_CLOSE, payload[:2] if payload else b""))
+            # The server closes the TCP connection first.
+            self._close_transport()
+
+    def _fail(self, code: int, reason: str=""):
+        """
+        Close the connection because of an error.
+        """
+        if self._state is _WS_OPEN:
+            self.close_code, self.close_reason = code, reason
+            self._write_frame(build_frame(
+                OPCODE_CLOSE, struct.pack("!H", code)))
+        self._close_transport()
+
+    def _write_frame(self, frame: bytes):
+        self.controller.transport.write(frame)
+
+    def build_message_frame(self, message: Union[str, bytes]) -> bytes:
+        """
+        Build the frame of a message, compress it if permessage-deflate is
+        negotiated.
+        """
+        return _build_message_frame(message, self.extension)
+
+    async def _drain(self):
+        try:
+            await self.controller.drain()
+        except ConnectionError as e:
+            self.connection_lost()
+            raise WebSocketClosedError(self.close_code) from e
+
+    async def send(self, message: Union[str, bytes]):
+        """
+        Send a message, `str` is sent as a text message, and `bytes` is sent
+        as a binary message.
+
+        It waits until the write buffer of the transport is drained, and
+        raises a `WebSocketClosedError` if the connection is closed.
+
+        **This is a Coroutine.**
+        """
+        if self._state is not _WS_OPEN:
+            raise WebSocketClosedError(self.close_code, self.close_reason)
+        self._write_frame(self.build_message_frame(message))
+        await self._drain()
+
+    async def receive(self) -> Union[str, bytes]:
+        """
+        Receive a message, text messages are returned as `str`, and binary
+        messages are returned as `bytes`.
+
+        It raises a `WebSocketClosedError` if the connection is closed and
+        all the received messages are consumed.
+
+        **This is a Coroutine.**
+        """
+        while not self._messages:
+            if self._state is not _WS_OPEN:
+                raise WebSocketClosedError(self.close_code, self.close_reason)
+            if self._receive_waiter is None:
+                self._receive_waiter = self._loop.create_future()
+            await self._receive_waiter
+
+        message = self._messages.popleft()
+        if self._reading_paused and (
+                len(self._messages) < self.max_queue_size):
+            self._reading_paused = False
+            if not self.controller.transport.is_closing():
+                self.controller.transport.resume_reading()
+        return message
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Union[str, bytes]:
+        try:
+            return await self.receive()
+        except WebSocketClosedError:
+            raise StopAsyncIteration
+
+    async def ping(self, data: bytes=b""):
+        """
+        Send a ping, and wait for the pong of it.
+
+        **This is a Coroutine.**
+        """
+        if self._state is not _WS_OPEN:
+            raise WebSocketClosedError(self.close_code, self.close_reason)
+        if len(data) > 125:
+            raise ValueError("The ping data is too long.")
+
+        waiter = self._pings.get(data)
+        if waiter is None:
+            waiter = self._loop.create_future()
+            self._pings[data] = waiter
+            self._write_frame(build_frame(OPCODE_PING, data))
+        await self._drain()
+        await asyncio.shield(waiter)
+
+    async def close(self, code: int=1000, reason: str=""):
+        """
+        Start the close handshake, and wait until the remote closes the
+        connection or the `close_timeout` is reached.
+
+        **This is a Coroutine.**
+        """
+        if self._state is _WS_OPEN:
+            self._state = _WS_CLOSING
+            self.close_code, self.close_reason = code, reason
+            self._wake_receiver()
+            self._close_waiter = self._loop.create_future()
+            self._write_frame(build_frame(
+                OPCODE_CLOSE,
+                struct.pack("!H", code) + reason.encode("utf-8")))
+
+        if self._state is _WS_CLOSING:
+            try:
+                await asyncio.wait_for(asyncio.shield(self._close_waiter),
+                                       self.close_timeout)
+            except asyncio.TimeoutError:
+                self._close_transport()
+
+        elif self._state is _WS_CONNECTING:
+            self._close_transport()
+
+
+def broadcast(connections: Iterable[WebSocketConnection],
+              message: Union[str, bytes]) -> int:
+    """
+    Send a message to many connections, the message is serialized once, and
+    compressed once for the connections with the same permessage-deflate
+    parameters that allow sharing the compressed frames.
+
+    It does not wait for the transports to drain, the connections are not
+    waited for by the slow ones, and the closed connections are skipped.
+
+    Return the number of the connections that the message is sent to.
+    """
+    frames = {None: _build_message_frame(message, None)}
+
+    count = 0
+    for connection in connections:
+        if not connection.is_open:
+            continue
+
+        key = None
+        if connection.extension is not None and (
+                connection.extension.can_share_frames()):
+            key = connection.extension.get_sharing_key()
+            if key not in frames:
+                frames[key] = connection.build_message_frame(message)
+
+        connection._write_frame(frames[key])
+        count += 1
+    return count
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016 Futur Solo
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from futurefinity.process import get_memory_usage, Launcher, LauncherError
+
+import futurefinity.web
+
+import os
+import sys
+import time
+import socket
+import signal
+import requests
+import unittest
+import tempfile
+import threading
+import subprocess
+
+
+_LAUNCHER_SCRIPT = """
+import futurefinity.web
+import futurefinity.process
+
+import os
+
+app = futurefinity.web.Application(allow_keep_alive=False)
+warmed_up = []
+
+
+@app.add_warmup_hook
+def warmup_hook():
+    warmed_up.append(os.getpid())
+
+
+@app.add_handler("/")
+class TestHandler(futurefinity.web.RequestHandler):
+    async def get(self, *args, **kwargs):
+        return "%%d:%%d:%%d" %% (os.getpid(), warmed_up[0], os.getppid())
+
+launcher = futurefinity.process.Launcher(app, workers=%(workers)d,
+                                         max_requests=%(max_requests)s)
+launcher.%(bind)s
+launcher.start()
+"""
+
+
+def wait_for_response(url: str, timeout: int=10) -> requests.Response:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return requests.get(url, timeout=1)
+        except requests.ConnectionError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+
+class RequestsSender(threading.Thread):
+    """
+    Keep sending requests until stopped, and record the failed ones.
+    """
+    def __init__(self, url: str):
+        threading.Thread.__init__(self)
+        self.url = url
+        self.responses = []
+        self.errors = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            try:
+                self.responses.append(requests.get(self.url, timeout=5))
+            except requests.RequestException as e:
+                self.errors.append(e)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def wait_for_exit(pid: int, timeout: int=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return
+        time.sleep(0.1)
+    raise TimeoutError("Process %d did not exit." % pid)
+
+
+class MemoryUsageTestCollector(unittest.TestCase):
+    @unittest.skipUnless(os.path.exists("/proc/self/smaps"),
+                         "Memory usage is only available on Linux.")
+    def test_get_memory_usage(self):
+        usage = get_memory_usage()
+        self.assertGreater(usage.rss, 0)
+        self.assertGreater(usage.private, 0)
+        self.assertLessEqual(usage.shared + usage.private, usage.rss)
+
+    def test_get_memory_usage_of_unknown_process(self):
+        self.assertIsNone(get_memory_usage(2 ** 22 + 1))
+
+
+class LauncherTestCollector(unittest.TestCase):
+    def test_start_without_sockets(self):
+        app = futurefinity.web.Application()
+        launcher = Launcher(app, workers=1)
+        self.assertRaises(LauncherError, launcher.start)
+
+    def test_launcher_start(self):
+        master = subprocess.Popen([sys.executable, "-c", _LAUNCHER_SCRIPT % {
+            "workers": 2, "max_requests": None, "bind": "bind(8888)"}])
+        try:
+            response = wait_for_response("http://127.0.0.1:8888/")
+            self.assertEqual(response.status_code, 200)
+
+            worker_pid, warmed_up_pid, master_pid = map(
+                int, response.text.split(":"))
+            self.assertNotEqual(worker_pid, master.pid)
+            self.assertEqual(warmed_up_pid, master.pid)
+            self.assertEqual(master_pid, master.pid)
+
+        finally:
+            master.send_signal(signal.SIGTERM)
+            self.assertEqual(master.wait(10), 0)
+
+    def test_launcher_bind_unix(self):
+        path = os.path.join(tempfile.mkdtemp(), "futurefinity.sock")
+        master = subprocess.Popen([sys.executable, "-c", _LAUNCHER_SCRIPT % {
+            "workers": 1, "max_requests": None,
+            "bind": "bind_unix(%r, mode=0o600)" % path}])
+        try:
+            deadline = time.monotonic() + 10
+            while True:
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                try:
+                    sock.connect(path)
+                    break
+                except (FileNotFoundError, ConnectionRefusedError):
+                    sock.close()
+                    if time.monotonic() > deadline:
+                        raise
+                    time.sleep(0.1)
+
+            with sock:
+                sock.sendall(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                response = b""
+                while True:
+                    data = sock.recv(4096)
+                    if not data:
+                        break
+                    response += data
+
+            self.assertTrue(response.startswith(b"HTTP/1.1 200 OK\r\n"))
+
+        finally:
+            master.send_signal(signal.SIGTERM)
+            self.assertEqual(master.wait(10), 0)
+
+        self.assertFalse(os.path.exists(path))
+
+    def test_launcher_recycle_worker(self):
+        master = subprocess.Popen([sys.executable, "-c", _LAUNCHER_SCRIPT % {
+            "workers": 1, "max_requests": 1, "bind": "bind(8888)"}])
+        try:
+            worker_pids = set()
+            for _ in range(3):
+                response = wait_for_response("http://127.0.0.1:8888/")
+                self.assertEqual(response.status_code, 200)
+
+                worker_pids.add(int(response.text.split(":")[0]))
+                time.sleep(1.5)  # Wait for the worker to be recycled.
+
+            self.assertEqual(len(worker_pids), 3)
+
+        finally:
+            master.send_signal(signal.SIGTERM)
+            self.assertEqual(master.wait(10), 0)
+
+    def test_launcher_restart_workers(self):
+        master = subprocess.Popen([sys.executable, "-c", _LAUNCHER_SCRIPT % {
+            "workers": 2, "max_requests": None, "bind": "bind(8888)"}])
+        try:
+            response = wait_for_response("http://127.0.0.1:8888/")
+            old_worker_pid = int(response.text.split(":")[0])
+
+            sender = RequestsSender("http://127.0.0.1:8888/")
+            sender.start()
+            try:
+                master.send_signal(signal.SIGHUP)
+                wait_for_exit(old_worker_pid)
+                time.sleep(0.5)
+            finally:
+                sender.stop()
+
+            self.assertEqual(sender.errors, [])
+            for response in sender.responses:
+                self.assertEqual(response.status_code, 200)
+
+            worker_pid = int(wait_for_response(
+                "http://127.0.0.1:8888/").text.split(":")[0])
+            self.assertNotEqual(worker_pid, old_worker_pid)
+
+        finally:
+            master.send_signal(signal.SIGTERM)
+            self.assertEqual(master.wait(10), 0)
+
+    def test_launcher_reexec_master(self):
+        master = subprocess.Popen([sys.executable, "-c", _LAUNCHER_SCRIPT % {
+            "workers": 2, "max_requests": None, "bind": "bind(8888)"}])
+        new_master_pid = None
+        try:
+            wait_for_response("http://127.0.0.1:8888/")
+
+            sender = RequestsSender("http://127.0.0.1:8888/")
+            sender.start()
+            try:
+                master.send_signal(signal.SIGUSR2)
+                self.assertEqual(master.wait(10), 0)
+                time.sleep(0.5)
+            finally:
+                sender.stop()
+
+            new_master_pid = int(wait_for_response(
+                "http://127.0.0.1:8888/").text.split(":")[2])
+            self.assertNotEqual(new_master_pid, master.pid)
+
+            self.assertEqual(sender.errors, [])
+            for response in sender.responses:
+                self.assertEqual(response.status_code, 200)
+
+        finally:
+            if master.poll() is None:
+                master.send_signal(signal.SIGTERM)
+                master.wait(10)
+            if new_master_pid is not None:
+                os.kill(new_master_pid, signal.SIGTERM)
+                wait_for_exit(new_master_pid)
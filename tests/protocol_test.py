@@ -25,7 +25,9 @@ import io
 import os
 import cgi
 import sys
+import gzip
 import json
+import zlib
 import email
 import unittest
 import http.cookies
@@ -782,3 +784,79 @@ class HTTPv1ConnectionTestCollector(unittest.TestCase):
                          "Chunked")
 
         self.assertEqual(message.body, b"Hello, World!")
+
+    def create_server_connection(self, controller):
+        return futurefinity.protocol.HTTPv1Connection(
+            controller=controller, is_client=False, http_version=11,
+            use_tls=False, sockname=("127.0.0.1", 9741),
+            peername=("127.0.0.1", 23333), allow_keep_alive=True)
+
+    def test_http_v11_server_gzip_body(self):
+        controller = self.create_controller()
+        connection = self.create_server_connection(controller)
+
+        body = gzip.compress(b"a=b&c=d")
+        connection.data_received(
+            b"POST / HTTP/1.1\r\nHost: localhost\r\n"
+            b"Content-Type: application/x-www-form-urlencoded\r\n"
+            b"Content-Encoding: gzip\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n")
+        connection.data_received(body)
+
+        message = controller.message_received_message
+
+        self.assertIsNotNone(message)
+        self.assertEqual(message.body, b"a=b&c=d")
+        self.assertNotIn("content-encoding", message.headers)
+        self.assertEqual(message.headers["content-length"], "7")
+        self.assertEqual(message.body_args.get_first("c"), "d")
+
+    def test_http_v11_server_chunked_deflate_body(self):
+        controller = self.create_controller()
+        connection = self.create_server_connection(controller)
+
+        body = zlib.compress(b"Hello, World!")
+        connection.data_received(
+            b"POST / HTTP/1.1\r\nHost: localhost\r\n"
+            b"Content-Encoding: deflate\r\n"
+            b"Transfer-Encoding: Chunked\r\n\r\n")
+        for i in range(0, len(body), 5):
+            chunk = body[i:i + 5]
+            connection.data_received(
+                hex(len(chunk))[2:].encode() + b"\r\n" + chunk + b"\r\n")
+
+        self.assertIsNone(controller.message_received_message)
+        connection.data_received(b"0\r\n\r\n")
+
+        message = controller.message_received_message
+
+        self.assertIsNotNone(message)
+        self.assertEqual(message.body, b"Hello, World!")
+
+    def test_http_v11_server_gzip_body_too_large(self):
+        controller = self.create_controller()
+        connection = self.create_server_connection(controller)
+        connection.max_decompressed_body_length = 1024
+
+        body = gzip.compress(b"\0" * 1025)
+        connection.data_received(
+            b"POST / HTTP/1.1\r\nHost: localhost\r\n"
+            b"Content-Encoding: gzip\r\n"
+            b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+
+        self.assertIsNone(controller.message_received_message)
+        self.assertIsInstance(controller.error_received_exc[1],
+                              futurefinity.protocol.ConnectionEntityTooLarge)
+
+    def test_http_v11_server_bad_gzip_body(self):
+        controller = self.create_controller()
+        connection = self.create_server_connection(controller)
+
+        connection.data_received(
+            b"POST / HTTP/1.1\r\nHost: localhost\r\n"
+            b"Content-Encoding: gzip\r\n"
+            b"Content-Length: 13\r\n\r\nHello, World!")
+
+        self.assertIsNone(controller.message_received_message)
+        self.assertIsInstance(controller.error_received_exc[1],
+                              futurefinity.protocol.ConnectionBadMessage)
@@ -86,3 +86,18 @@ class TemplateTestCollector(unittest.TestCase):
         first_loaded_template = loader.load_template("login.htm")
         second_loaded_template = loader.load_template("login.htm")
         self.assertIs(first_loaded_template, second_loaded_template)
+
+    def test_template_loader_preload_templates(self):
+        loader = TemplateLoader(template_path="examples/template/")
+        loader.preload_templates()
+        self.assertEqual(set(loader._template_cache.keys()),
+                         set(["login.htm", "main.htm"]))
+
+        preloaded_template = loader._template_cache["login.htm"]
+        self.assertIs(loader.load_template("login.htm"), preloaded_template)
+
+    def test_template_loader_preload_templates_without_cache(self):
+        loader = TemplateLoader(template_path="examples/template/",
+                                cache_template=False)
+        loader.preload_templates()
+        self.assertEqual(loader._template_cache, {})
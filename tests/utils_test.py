@@ -16,10 +16,14 @@
 #   limitations under the License.
 
 from futurefinity.utils import (ensure_bytes, ensure_str, MagicDict,
-                                TolerantMagicDict, format_timestamp)
+                                TolerantMagicDict, format_timestamp,
+                                parse_timestamp, cached_coroutine,
+                                install_uvloop, new_event_loop, uvloop)
 
 import futurefinity.security
 
+import asyncio
+
 import os
 import time
 import random
@@ -112,6 +116,14 @@ class UtilsTestCollector(unittest.TestCase):
     def test_format_timestamp_with_other(self):
         self.assertRaises(TypeError, format_timestamp, object())
 
+    def test_parse_timestamp(self):
+        timestamp = int(time.time())
+        self.assertEqual(parse_timestamp(format_timestamp(timestamp)),
+                         timestamp)
+
+    def test_parse_timestamp_with_invalid_value(self):
+        self.assertIsNone(parse_timestamp("Not a Timestamp"))
+
 
 class MagicDictTestCollector(unittest.TestCase):
     def test_init_magic_dict(self):
@@ -302,3 +314,117 @@ class TolerantMagicDictTestCollector(unittest.TestCase):
         magic_dict.add("C", "D")
         copied_magic_dict = magic_dict.copy()
         self.assertEqual(magic_dict, copied_magic_dict)
+
+
+class EventLoopTestCollector(unittest.TestCase):
+    def tearDown(self):
+        asyncio.set_event_loop_policy(None)
+
+    def test_new_event_loop(self):
+        loop = new_event_loop()
+        try:
+            self.assertIsInstance(loop, asyncio.AbstractEventLoop)
+            self.assertEqual(loop.run_until_complete(asyncio.sleep(0, 1)), 1)
+        finally:
+            loop.close()
+
+    @unittest.skipIf(uvloop is not None, "uvloop is available.")
+    def test_uvloop_fallback(self):
+        self.assertFalse(install_uvloop())
+        loop = new_event_loop(use_uvloop=True)
+        try:
+            self.assertIsInstance(loop, asyncio.AbstractEventLoop)
+        finally:
+            loop.close()
+
+    @unittest.skipIf(uvloop is None, "uvloop is not available.")
+    def test_uvloop(self):
+        loop = new_event_loop(use_uvloop=True)
+        try:
+            self.assertIsInstance(loop, uvloop.Loop)
+        finally:
+            loop.close()
+
+        self.assertTrue(install_uvloop())
+        loop = asyncio.new_event_loop()
+        try:
+            self.assertIsInstance(loop, uvloop.Loop)
+        finally:
+            loop.close()
+
+    def test_cached_coroutine(self):
+        calls = []
+
+        @cached_coroutine(max_size=2)
+        async def get_value(name, suffix=""):
+            calls.append(name)
+            await asyncio.sleep(0.01)
+            if name == "error":
+                raise ValueError(name)
+            return name + suffix
+
+        async def run_calls():
+            self.assertEqual(await asyncio.gather(*[
+                get_value("a") for _ in range(5)]), ["a"] * 5)
+            self.assertEqual(calls, ["a"])
+            self.assertEqual(await get_value("a"), "a")
+            self.assertEqual(await get_value("a", suffix="!"), "a!")
+            self.assertEqual(get_value.size, 2)
+
+            self.assertEqual(await get_value("b"), "b")
+            self.assertEqual(get_value.size, 2)
+            self.assertEqual(await get_value("a", suffix="!"), "a!")
+            self.assertEqual(await get_value("a"), "a")  # Evicted.
+            self.assertEqual(calls, ["a", "a", "b", "a"])
+
+            self.assertTrue(get_value.invalidate("a"))
+            self.assertFalse(get_value.invalidate("c"))
+            self.assertEqual(await get_value("a"), "a")
+            self.assertEqual(calls, ["a", "a", "b", "a", "a"])
+
+            for _ in range(2):
+                with self.assertRaises(ValueError):
+                    await get_value("error")
+            self.assertEqual(calls.count("error"), 2)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run_calls())
+        finally:
+            loop.close()
+
+        self.assertEqual(get_value.hits, 6)
+        self.assertEqual(get_value.misses, 7)
+
+        get_value.clear()
+        self.assertEqual(get_value.size, 0)
+        self.assertEqual(get_value.hits, 0)
+
+    def test_cached_coroutine_ttl(self):
+        class Config:
+            def __init__(self):
+                self.calls = 0
+
+            @cached_coroutine(ttl=0.1, key=lambda self, name: name)
+            async def get_flag(self, name):
+                self.calls += 1
+                return name
+
+        first_config = Config()
+        second_config = Config()
+
+        async def run_calls():
+            self.assertEqual(await first_config.get_flag("a"), "a")
+            self.assertEqual(await second_config.get_flag("a"), "a")
+            self.assertEqual(second_config.calls, 0)
+            await asyncio.sleep(0.15)
+            self.assertEqual(await second_config.get_flag("a"), "a")
+            self.assertEqual(second_config.calls, 1)
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(run_calls())
+        finally:
+            loop.close()
+
+        self.assertEqual(first_config.calls, 1)
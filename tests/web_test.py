@@ -16,16 +16,71 @@
 #   limitations under the License.
 
 from futurefinity.security import get_random_str
+from futurefinity.utils import cached_coroutine
+
+from cryptography import x509
+from cryptography.x509.oid import NameOID
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from typing import Optional, Union, Tuple
 
 import futurefinity.web
+import futurefinity.protocol
 
 import asyncio
 
+import gc
+import os
+import ssl
+import gzip
 import json
+import stat
+import time
+import zlib
+import socket
+import hashlib
+import weakref
+import datetime
+import tempfile
 import requests
 import unittest
 import functools
+import ipaddress
+import mimetypes
+import threading
 import traceback
+import unittest.mock
+
+
+def make_self_signed_cert() -> Tuple[str, str]:
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048,
+                                   backend=default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "127.0.0.1")])
+    now = datetime.datetime.utcnow()
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(
+        name).public_key(key.public_key()).serial_number(
+        x509.random_serial_number()).not_valid_before(
+        now - datetime.timedelta(days=1)).not_valid_after(
+        now + datetime.timedelta(days=1)).add_extension(
+        x509.SubjectAlternativeName(
+            [x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+        critical=False).add_extension(
+        x509.BasicConstraints(ca=True, path_length=None),
+        critical=True).sign(key, hashes.SHA256(), default_backend())
+
+    cert_dir = tempfile.mkdtemp()
+    cert_path = os.path.join(cert_dir, "cert.pem")
+    key_path = os.path.join(cert_dir, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption()))
+    return cert_path, key_path
 
 
 class GetTestCollector(unittest.TestCase):
@@ -100,6 +155,109 @@ class PostTestCollector(unittest.TestCase):
                          "Wrong Status Code")
         self.assertEqual(self.requests_result.text, "Hello, World!")
 
+    def test_post_large_body(self):
+        content = get_random_str(200000)
+
+        @self.app.add_handler("/post_large_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def post(self, *args, **kwargs):
+                return self.get_body_arg("content")
+
+        server = self.app.listen(8888)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_result = await self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.post, "http://127.0.0.1:8888/post_large_test",
+                        data={"content": content}
+                    )
+                )
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 200,
+                         "Wrong Status Code")
+        self.assertEqual(self.requests_result.text, content)
+
+
+class RequestDecompressionTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(debug=True)
+
+    def test_gzip_request_body(self):
+        @self.app.add_handler("/buffered")
+        class BufferedHandler(futurefinity.web.RequestHandler):
+            async def post(self, *args, **kwargs):
+                return self.get_body_arg("content")
+
+        @self.app.add_handler("/stream")
+        class StreamHandler(futurefinity.web.RequestHandler):
+            stream_handler = True
+
+            def data_received(self, data):
+                self.write(str(len(data)) + ":")
+                self.received_data = getattr(
+                    self, "received_data", b"") + data
+
+            async def post(self, *args, **kwargs):
+                self.write(
+                    hashlib.md5(self.received_data).hexdigest())
+
+        content = get_random_str(100000)
+        body = gzip.compress(("content=" + content).encode())
+        stream_body = os.urandom(300000)
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            with requests.Session() as session:
+                return [
+                    session.post(url + "/buffered", data=body, headers={
+                        "content-encoding": "gzip",
+                        "content-type": "application/x-www-form-urlencoded"}),
+                    session.post(url + "/stream",
+                                 data=gzip.compress(stream_body),
+                                 headers={"content-encoding": "gzip"}),
+                    session.post(url + "/buffered",
+                                 data=gzip.compress(b"\0" * 52428801),
+                                 headers={"content-encoding": "gzip"})]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        buffered_result, stream_result, bomb_result = self.requests_results
+
+        self.assertEqual(buffered_result.status_code, 200)
+        self.assertEqual(buffered_result.text, content)
+
+        self.assertEqual(stream_result.status_code, 200)
+        *lengths, stream_hash = stream_result.text.split(":")
+        self.assertEqual(sum(map(int, lengths)), len(stream_body))
+        self.assertEqual(stream_hash, hashlib.md5(stream_body).hexdigest())
+
+        self.assertEqual(bomb_result.status_code, 413)
+
 
 class HeadTestCollector(unittest.TestCase):
     def setUp(self):
@@ -135,6 +293,89 @@ class HeadTestCollector(unittest.TestCase):
         self.assertEqual(self.requests_result.status_code, 200,
                          "Wrong Status Code")
 
+    def test_head_request_without_body(self):
+        app = futurefinity.web.Application()
+        buffered_lengths = []
+
+        @app.add_handler("/default")
+        class DefaultHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return "Hello, World!"
+
+        @app.add_handler("/finished")
+        class FinishedHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.finish("Hello, World!")
+
+        @app.add_handler("/without_body")
+        class WithoutBodyHandler(futurefinity.web.RequestHandler):
+            head_without_body = True
+
+            async def get(self, *args, **kwargs):
+                for _ in range(100):
+                    self.write("Hello, World!")
+                buffered_lengths.append(len(self._response_body))
+
+        @app.add_handler("/metadata")
+        class MetadataHandler(futurefinity.web.RequestHandler):
+            async def get_head_metadata(self, *args, **kwargs):
+                return {"content-type": "application/json",
+                        "content-length": "42"}
+
+            async def get(self, *args, **kwargs):
+                raise futurefinity.web.HTTPError(500)
+
+        server = app.listen(8888)
+
+        def send_requests():
+            results = {}
+            with requests.Session() as session:
+                # The etags are only computed for the conditional requests.
+                headers = {"if-none-match": "\"outdated\""}
+                for name in ("default", "finished", "without_body",
+                             "metadata"):
+                    url = "http://127.0.0.1:8888/" + name
+                    results[name] = (session.head(url, headers=headers),
+                                     session.get(url, headers=headers))
+            return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        for name in ("default", "finished", "without_body"):
+            head_result, get_result = self.requests_results[name]
+            self.assertEqual(head_result.status_code, 200)
+            self.assertEqual(get_result.status_code, 200)
+            self.assertEqual(head_result.content, b"")
+            self.assertEqual(head_result.headers["content-length"],
+                             str(len(get_result.content)))
+
+        head_result, get_result = self.requests_results["default"]
+        self.assertEqual(head_result.headers["etag"],
+                         get_result.headers["etag"])
+
+        head_result, get_result = self.requests_results["without_body"]
+        self.assertNotIn("etag", head_result.headers)
+        self.assertEqual(buffered_lengths, [0, 1300])
+
+        head_result, get_result = self.requests_results["metadata"]
+        self.assertEqual(head_result.status_code, 200)
+        self.assertEqual(head_result.headers["content-type"],
+                         "application/json")
+        self.assertEqual(head_result.headers["content-length"], "42")
+        self.assertEqual(get_result.status_code, 500)
+
 
 class SecureCookieTestCollector(unittest.TestCase):
     def setUp(self):
@@ -272,6 +513,630 @@ class StaticFileHandlerTestCollector(unittest.TestCase):
         self.assertEqual(self.requests_result.content, random_string)
 
 
+class StaticFileSendingTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.static_path = tempfile.mkdtemp()
+        self.content = os.urandom(5 * 1024 * 1024 + 7)
+        with open(os.path.join(self.static_path, "large_file"), "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self):
+        asyncio.set_event_loop_policy(None)
+
+    def get_static_results(self, app: futurefinity.web.Application,
+                           context: Optional[ssl.SSLContext]=None,
+                           verify: Union[str, bool]=True):
+        loop = app._loop
+        app.add_handler("/static/(?P<file>.*?)",
+                        handler=futurefinity.web.StaticFileHandler)
+
+        server = app.listen(8888, context=context)
+        scheme = "https" if context else "http"
+        url = scheme + "://127.0.0.1:8888/static/"
+
+        def send_requests():
+            with requests.Session() as session:
+                return [
+                    session.get(url + "large_file", verify=verify),
+                    session.head(url + "large_file", verify=verify),
+                    session.get(url + "large_file", verify=verify),
+                    session.get(url + "not_found", verify=verify)]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self), loop=loop)
+        loop.run_forever()
+
+        return self.requests_results
+
+    def check_static_results(self, results):
+        get_result, head_result, second_get_result, not_found_result = results
+
+        for result in (get_result, second_get_result):
+            self.assertEqual(result.status_code, 200, "Wrong Status Code")
+            self.assertEqual(result.headers["content-length"],
+                             str(len(self.content)))
+            self.assertNotIn("transfer-encoding", result.headers)
+            self.assertEqual(result.content, self.content)
+
+        self.assertEqual(head_result.status_code, 200, "Wrong Status Code")
+        self.assertEqual(head_result.headers["content-length"],
+                         str(len(self.content)))
+        self.assertEqual(head_result.content, b"")
+
+        self.assertEqual(not_found_result.status_code, 404)
+
+    def test_static_file_sendfile(self):
+        app = futurefinity.web.Application(static_path=self.static_path,
+                                           debug=True)
+        self.check_static_results(self.get_static_results(app))
+
+    def test_static_file_mmap(self):
+        cert_path, key_path = make_self_signed_cert()
+        context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        context.load_cert_chain(cert_path, key_path)
+
+        app = futurefinity.web.Application(static_path=self.static_path,
+                                           debug=True)
+        self.check_static_results(
+            self.get_static_results(app, context=context, verify=cert_path))
+
+        info = app.static_file_cache.get(self.static_path, "large_file")
+        self.assertIsNone(info._mmap)
+        self.assertEqual(info._mmap_users, 0)
+
+    def test_static_file_shared_mmap(self):
+        with open(os.path.join(self.static_path, "large_file"), "rb") as f:
+            info = futurefinity.web.StaticFileInfo(
+                f.name, os.stat(f.fileno()), "application/octet-stream")
+            first_map = info.acquire_mmap(f)
+            second_map = info.acquire_mmap(f)
+
+        self.assertIs(first_map, second_map)
+        self.assertEqual(first_map[:], self.content)
+
+        info.release_mmap()
+        self.assertFalse(first_map.closed)
+        info.release_mmap()
+        self.assertTrue(first_map.closed)
+        self.assertIsNone(info._mmap)
+
+    @unittest.skipIf(futurefinity.web.uvloop is None,
+                     "uvloop is not available.")
+    def test_static_file_fallback(self):
+        # uvloop does not implement sendfile.
+        old_loop = asyncio.get_event_loop()
+        app = futurefinity.web.Application(static_path=self.static_path,
+                                           debug=True, uvloop=True)
+        try:
+            self.check_static_results(self.get_static_results(app))
+        finally:
+            app._loop.close()
+            asyncio.set_event_loop_policy(None)
+            asyncio.set_event_loop(old_loop)
+
+
+class StaticFileCacheTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.static_path = tempfile.mkdtemp()
+        for name in ("a.css", "b.js", "c.txt"):
+            with open(os.path.join(self.static_path, name), "w") as f:
+                f.write(name)
+        os.mkdir(os.path.join(self.static_path, "folder"))
+
+    def test_static_file_cache_hit(self):
+        cache = futurefinity.web.StaticFileCache(revalidate_interval=60)
+        info = cache.get(self.static_path, "a.css")
+        self.assertEqual(info.mime, "text/css")
+        self.assertEqual(info.stat_result.st_size, 5)
+
+        os.remove(info.path)
+        self.assertIs(cache.get(self.static_path, "a.css"), info)
+
+    def test_static_file_cache_revalidate(self):
+        cache = futurefinity.web.StaticFileCache(revalidate_interval=0)
+        info = cache.get(self.static_path, "a.css")
+        self.assertIs(cache.get(self.static_path, "a.css"), info)
+
+        with open(info.path, "w") as f:
+            f.write("a.css is changed.")
+        new_info = cache.get(self.static_path, "a.css")
+        self.assertIsNot(new_info, info)
+        self.assertNotEqual(new_info.etag, info.etag)
+
+        os.remove(info.path)
+        with self.assertRaises(futurefinity.web.HTTPError) as cm:
+            cache.get(self.static_path, "a.css")
+        self.assertEqual(cm.exception.status_code, 404)
+
+    def test_static_file_cache_forbidden(self):
+        cache = futurefinity.web.StaticFileCache()
+        for file_uri_path in ("../a.css", "folder"):
+            with self.assertRaises(futurefinity.web.HTTPError) as cm:
+                cache.get(self.static_path, file_uri_path)
+            self.assertEqual(cm.exception.status_code, 403)
+
+    def test_static_file_cache_max_entries(self):
+        cache = futurefinity.web.StaticFileCache(max_entries=2,
+                                                 revalidate_interval=60)
+        info = cache.get(self.static_path, "a.css")
+        cache.get(self.static_path, "b.js")
+        cache.get(self.static_path, "a.css")
+        cache.get(self.static_path, "c.txt")
+
+        self.assertIs(cache.get(self.static_path, "a.css"), info)
+        self.assertEqual(len(cache._entries), 2)
+        self.assertNotIn((self.static_path, "b.js"), cache._entries)
+
+    def test_static_file_content_cache(self):
+        cache = futurefinity.web.StaticFileCache(
+            revalidate_interval=0, max_content_size=10, content_threshold=4)
+        for name in ("a.css", "b.js"):
+            self.assertIsNone(cache.get_content(self.static_path, name))
+            info = cache.get(self.static_path, name)
+            self.assertEqual(cache.is_content_cacheable(info),
+                             name == "b.js")
+            cache.set_content(self.static_path, name, info, name.encode())
+
+        self.assertEqual(cache.content_misses, 2)
+        self.assertEqual(cache.content_size, 4)
+        self.assertEqual(cache.get_content(self.static_path, "b.js"),
+                         b"b.js")
+        self.assertEqual(cache.content_hits, 1)
+
+        with open(os.path.join(self.static_path, "b.js"), "w") as f:
+            f.write("b")
+        cache.get(self.static_path, "b.js")
+        self.assertIsNone(cache.get_content(self.static_path, "b.js"))
+        self.assertEqual(cache.content_size, 0)
+
+        cache.content_threshold = 5
+        for name in ("a.css", "b.js", "c.txt"):
+            info = cache.get(self.static_path, name)
+            with open(info.path, "rb") as f:
+                cache.set_content(self.static_path, name, info, f.read())
+        self.assertEqual(cache.content_size, 6)
+        self.assertIsNone(cache.get_content(self.static_path, "a.css"))
+
+
+class StaticFileMemoryCacheTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.static_path = tempfile.mkdtemp()
+        with open(os.path.join(self.static_path, "style.css"), "w") as f:
+            f.write("body { color: red; }")
+        self.app = futurefinity.web.Application(
+            static_path=self.static_path, static_cache_interval=0)
+
+    def test_static_file_memory_cache(self):
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888/static/style.css"
+            with requests.Session() as session:
+                results = [session.get(url), session.head(url),
+                           session.get(url)]
+                with open(os.path.join(self.static_path, "style.css"),
+                          "w") as f:
+                    f.write("body { color: blue; }")
+                results.append(session.get(url))
+                return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        first_result, head_result, second_result, changed_result = \
+            self.requests_results
+        for result in (first_result, second_result):
+            self.assertEqual(result.status_code, 200, "Wrong Status Code")
+            self.assertEqual(result.headers["content-type"], "text/css")
+            self.assertEqual(result.headers["content-length"], "20")
+            self.assertIn("etag", result.headers)
+            self.assertEqual(result.text, "body { color: red; }")
+
+        self.assertEqual(head_result.headers["content-length"], "20")
+        self.assertEqual(head_result.content, b"")
+
+        self.assertEqual(changed_result.text, "body { color: blue; }")
+        self.assertNotEqual(changed_result.headers["etag"],
+                            first_result.headers["etag"])
+
+        static_file_cache = self.app.static_file_cache
+        self.assertEqual(static_file_cache.content_hits, 2)
+        self.assertEqual(static_file_cache.content_misses, 2)
+
+
+class PrecompressedStaticFileTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.static_path = tempfile.mkdtemp()
+        self.content = b"console.log('Hello, World!');\n" * 100
+        with open(os.path.join(self.static_path, "app.js"), "wb") as f:
+            f.write(self.content)
+        with open(os.path.join(self.static_path, "tiny.js"), "wb") as f:
+            f.write(b"1;")
+        self.app = futurefinity.web.Application(static_path=self.static_path)
+
+    def test_compress_static_files(self):
+        generated_paths = futurefinity.web.compress_static_files(
+            self.static_path, encodings=("gzip", ))
+        gzip_path = os.path.join(self.static_path, "app.js.gz")
+        self.assertEqual(generated_paths, [gzip_path])
+
+        with gzip.open(gzip_path) as f:
+            self.assertEqual(f.read(), self.content)
+
+        self.assertEqual(futurefinity.web.compress_static_files(
+            self.static_path, encodings=("gzip", )), [])
+
+    def test_precompressed_static_file_request(self):
+        futurefinity.web.compress_static_files(self.static_path,
+                                               encodings=("gzip", ))
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888/static/app.js"
+            with requests.Session() as session:
+                return [
+                    session.get(url, headers={"accept-encoding": "gzip"}),
+                    session.get(url, headers={"accept-encoding": "identity"}),
+                    session.get(url, headers={
+                        "accept-encoding": "br, gzip;q=0"})]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        gzip_result, identity_result, refused_result = self.requests_results
+
+        self.assertEqual(gzip_result.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip_result.headers["content-type"],
+                         mimetypes.guess_type("app.js")[0])
+        self.assertEqual(gzip_result.headers["content-length"], str(
+            os.path.getsize(os.path.join(self.static_path, "app.js.gz"))))
+        self.assertEqual(gzip_result.content, self.content)
+
+        for result in (gzip_result, identity_result, refused_result):
+            self.assertEqual(result.headers["vary"], "Accept-Encoding")
+
+        for result in (identity_result, refused_result):
+            self.assertNotIn("content-encoding", result.headers)
+            self.assertEqual(result.content, self.content)
+        self.assertNotEqual(identity_result.headers["etag"],
+                            gzip_result.headers["etag"])
+
+    def test_precompressed_variant_outside_static_path(self):
+        secret_path = os.path.join(tempfile.mkdtemp(), "secret.txt")
+        with open(secret_path, "wb") as f:
+            f.write(b"Secret!")
+
+        static_file_cache = futurefinity.web.StaticFileCache(
+            revalidate_interval=0)
+        info = static_file_cache.get(self.static_path, "app.js")
+        self.assertEqual(info.variants, {})
+
+        os.symlink(secret_path,
+                   os.path.join(self.static_path, "app.js.gz"))
+        self.assertIs(static_file_cache.get(self.static_path, "app.js"),
+                      info)
+        self.assertEqual(info.variants, {})
+
+        os.symlink(secret_path,
+                   os.path.join(self.static_path, "tiny.js.gz"))
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888/static/"
+            with requests.Session() as session:
+                return [
+                    session.get(url + name,
+                                headers={"accept-encoding": "gzip"})
+                    for name in ("app.js", "tiny.js", "tiny.js.gz")]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        app_result, tiny_result, direct_result = self.requests_results
+
+        self.assertEqual(app_result.status_code, 200)
+        self.assertNotIn("content-encoding", app_result.headers)
+        self.assertEqual(app_result.content, self.content)
+
+        self.assertEqual(tiny_result.status_code, 200)
+        self.assertNotIn("content-encoding", tiny_result.headers)
+        self.assertEqual(tiny_result.content, b"1;")
+
+        self.assertEqual(direct_result.status_code, 403)
+
+
+class StaticFileRangeTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.static_path = tempfile.mkdtemp()
+        self.content = os.urandom(100000)
+        with open(os.path.join(self.static_path, "video.mp4"), "wb") as f:
+            f.write(self.content)
+
+    def get_static_results(self, app: futurefinity.web.Application):
+        loop = app._loop
+        server = app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888/static/video.mp4"
+            with requests.Session() as session:
+                full_result = session.get(url)
+                etag = full_result.headers["etag"]
+                last_modified = full_result.headers["last-modified"]
+
+                return {
+                    "full": full_result,
+                    "single": session.get(url, headers={
+                        "range": "bytes=100-199"}),
+                    "suffix": session.get(url, headers={
+                        "range": "bytes=-100"}),
+                    "multiple": session.get(url, headers={
+                        "range": "bytes=0-9, 99990-"}),
+                    "unsatisfiable": session.get(url, headers={
+                        "range": "bytes=100000-"}),
+                    "if_range": session.get(url, headers={
+                        "range": "bytes=0-9", "if-range": etag}),
+                    "if_range_changed": session.get(url, headers={
+                        "range": "bytes=0-9", "if-range": '"changed"'}),
+                    "if_none_match": session.get(url, headers={
+                        "if-none-match": "W/" + etag}),
+                    "if_modified_since": session.get(url, headers={
+                        "if-modified-since": last_modified}),
+                    "after_not_modified": session.get(url)
+                }
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self), loop=loop)
+        loop.run_forever()
+
+        return self.requests_results
+
+    def check_static_results(self, results):
+        full_result = results["full"]
+        self.assertEqual(full_result.status_code, 200)
+        self.assertEqual(full_result.headers["accept-ranges"], "bytes")
+        self.assertIn("last-modified", full_result.headers)
+        self.assertEqual(full_result.content, self.content)
+
+        single_result = results["single"]
+        self.assertEqual(single_result.status_code, 206)
+        self.assertEqual(single_result.headers["content-range"],
+                         "bytes 100-199/100000")
+        self.assertEqual(single_result.content, self.content[100:200])
+
+        suffix_result = results["suffix"]
+        self.assertEqual(suffix_result.status_code, 206)
+        self.assertEqual(suffix_result.content, self.content[-100:])
+
+        multiple_result = results["multiple"]
+        self.assertEqual(multiple_result.status_code, 206)
+        content_type = multiple_result.headers["content-type"]
+        self.assertTrue(content_type.startswith(
+            "multipart/byteranges; boundary="))
+        boundary = content_type.split("=", 1)[1].encode()
+        self.assertEqual(multiple_result.content, (
+            b"--" + boundary + b"\r\nContent-Type: video/mp4\r\n"
+            b"Content-Range: bytes 0-9/100000\r\n\r\n" +
+            self.content[:10] +
+            b"\r\n--" + boundary + b"\r\nContent-Type: video/mp4\r\n"
+            b"Content-Range: bytes 99990-99999/100000\r\n\r\n" +
+            self.content[99990:] + b"\r\n--" + boundary + b"--\r\n"))
+
+        unsatisfiable_result = results["unsatisfiable"]
+        self.assertEqual(unsatisfiable_result.status_code, 416)
+        self.assertEqual(unsatisfiable_result.headers["content-range"],
+                         "bytes */100000")
+
+        self.assertEqual(results["if_range"].status_code, 206)
+        self.assertEqual(results["if_range"].content, self.content[:10])
+        self.assertEqual(results["if_range_changed"].status_code, 200)
+        self.assertEqual(results["if_range_changed"].content, self.content)
+
+        for name in ("if_none_match", "if_modified_since"):
+            self.assertEqual(results[name].status_code, 304)
+            self.assertEqual(results[name].content, b"")
+            self.assertEqual(results[name].headers["etag"],
+                             full_result.headers["etag"])
+
+        self.assertEqual(results["after_not_modified"].content, self.content)
+
+    def test_static_file_range_from_memory(self):
+        app = futurefinity.web.Application(static_path=self.static_path,
+                                           static_memory_threshold=200000)
+        self.check_static_results(self.get_static_results(app))
+        self.assertGreater(app.static_file_cache.content_hits, 0)
+
+    def test_static_file_range_from_file(self):
+        app = futurefinity.web.Application(static_path=self.static_path,
+                                           static_memory_cache_size=0)
+        self.check_static_results(self.get_static_results(app))
+
+
+class StaticURLTestCollector(unittest.TestCase):
+    def test_static_url(self):
+        static_path = tempfile.mkdtemp()
+        with open(os.path.join(static_path, "app.js"), "wb") as f:
+            f.write(b"console.log('Hello, World!');")
+        with open(os.path.join(static_path, "app.js.gz"), "wb") as f:
+            f.write(gzip.compress(b"console.log('Hello, World!');"))
+        with open(os.path.join(static_path, "large.bin"), "wb") as f:
+            f.write(b"\0" * 1024)
+
+        template_path = tempfile.mkdtemp()
+        with open(os.path.join(template_path, "index.htm"), "w") as f:
+            f.write("{{ static_url('app.js') }}|{{ static_url('none.js') }}")
+
+        app = futurefinity.web.Application(
+            static_path=static_path, template_path=template_path,
+            static_preload_hashes=["*.js*"])
+        loop = app._loop
+
+        @app.add_handler("/")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.render("index.htm")
+
+        app.warmup()
+        server = app.listen(8888)
+
+        def send_requests():
+            with requests.Session() as session:
+                index_result = session.get("http://127.0.0.1:8888/")
+                static_url, missing_url = index_result.text.split("|")
+                return {
+                    "static_url": static_url,
+                    "missing_url": missing_url,
+                    "fingerprinted": session.get(
+                        "http://127.0.0.1:8888" + static_url),
+                    "plain": session.get(
+                        "http://127.0.0.1:8888/static/app.js"),
+                    "outdated": session.get(
+                        "http://127.0.0.1:8888/static/app.js?v=outdated")
+                }
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                loop.stop()
+
+        with unittest.mock.patch.object(
+                futurefinity.web, "_hash_file",
+                wraps=futurefinity.web._hash_file) as hash_file:
+            asyncio.ensure_future(get_requests_result(self), loop=loop)
+            loop.run_forever()
+
+        self.assertEqual(list(app.static_file_cache._hashes.keys()),
+                         [(static_path, "app.js")])
+        hash_file.assert_not_called()
+
+        content_hash = hashlib.md5(
+            b"console.log('Hello, World!');").hexdigest()
+        self.assertEqual(self.requests_results["static_url"],
+                         "/static/app.js?v=" + content_hash)
+        self.assertEqual(self.requests_results["missing_url"],
+                         "/static/none.js")
+
+        fingerprinted_result = self.requests_results["fingerprinted"]
+        self.assertEqual(fingerprinted_result.status_code, 200)
+        self.assertEqual(fingerprinted_result.headers["cache-control"],
+                         "public, max-age=31536000, immutable")
+
+        for name in ("plain", "outdated"):
+            self.assertEqual(self.requests_results[name].status_code, 200)
+            self.assertNotIn("cache-control",
+                             self.requests_results[name].headers)
+
+    def test_static_url_hashed_off_loop(self):
+        static_path = tempfile.mkdtemp()
+        with open(os.path.join(static_path, "app.js"), "wb") as f:
+            f.write(b"console.log('Hello, World!');")
+
+        app = futurefinity.web.Application(static_path=static_path,
+                                           static_cache_interval=0)
+        loop = app._loop
+
+        @app.add_handler("/")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return self.static_url("app.js")
+
+        server = app.listen(8888)
+
+        def send_requests():
+            with requests.Session() as session:
+                results = [session.get("http://127.0.0.1:8888/").text]
+                time.sleep(0.2)
+                results.append(session.get("http://127.0.0.1:8888/").text)
+
+                with open(os.path.join(static_path, "app.js"), "wb") as f:
+                    f.write(b"console.log('Hello, FutureFinity!');")
+                session.get("http://127.0.0.1:8888/")
+                time.sleep(0.2)
+                results.append(session.get("http://127.0.0.1:8888/").text)
+                return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self), loop=loop)
+        loop.run_forever()
+
+        self.assertEqual(self.requests_results, [
+            "/static/app.js",
+            "/static/app.js?v=" + hashlib.md5(
+                b"console.log('Hello, World!');").hexdigest(),
+            "/static/app.js?v=" + hashlib.md5(
+                b"console.log('Hello, FutureFinity!');").hexdigest()])
+
+
 class SessionTestCollector(unittest.TestCase):
     def setUp(self):
         self.loop = asyncio.get_event_loop()
@@ -459,27 +1324,44 @@ class HeaderTestCollector(unittest.TestCase):
         self.assertEqual(self.requests_result.text, "Hello, World!")
 
 
-class RedirectTestCollector(unittest.TestCase):
+class ETagTestCollector(unittest.TestCase):
     def setUp(self):
         self.loop = asyncio.get_event_loop()
-        self.app = futurefinity.web.Application(allow_keep_alive=False,
-                                                debug=True)
+        self.app = futurefinity.web.Application()
 
-    def test_redirect_request(self):
-        @self.app.add_handler("/")
+    def test_etag_strategies(self):
+        body = "Hello, World!" * 100
+
+        @self.app.add_handler("/(?P<strategy>\\w+)")
         class TestHandler(futurefinity.web.RequestHandler):
+            def get_etag_version(self):
+                return "version-1"
+
             async def get(self, *args, **kwargs):
-                return self.redirect("/redirected")
+                if kwargs["strategy"] != "default":
+                    self.etag_strategy = kwargs["strategy"]
+                return body
 
         server = self.app.listen(8888)
 
+        def send_requests():
+            results = {}
+            with requests.Session() as session:
+                for strategy in ("default", "strong", "weak", "version",
+                                 "off"):
+                    url = "http://127.0.0.1:8888/" + strategy
+                    plain_result = session.get(url)
+                    result = session.get(url, headers={
+                        "if-none-match": "\"none\""})
+                    results[strategy] = (plain_result, result, session.get(
+                        url, headers={"if-none-match": result.headers.get(
+                            "etag", "\"none\"")}))
+            return results
+
         async def get_requests_result(self):
             try:
-                self.requests_result = await self.loop.run_in_executor(
-                    None, functools.partial(
-                        requests.get, "http://127.0.0.1:8888/",
-                        allow_redirects=False)
-                )
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
             except:
                 traceback.print_exc()
             finally:
@@ -490,8 +1372,1078 @@ class RedirectTestCollector(unittest.TestCase):
         asyncio.ensure_future(get_requests_result(self))
         self.loop.run_forever()
 
-        self.assertEqual(self.requests_result.status_code, 302,
-                         "Wrong Status Code")
+        body_bytes = body.encode()
+        expected_etags = {
+            "default": '"%s"' % hashlib.sha1(body_bytes).hexdigest(),
+            "strong": '"%s"' % hashlib.sha1(body_bytes).hexdigest(),
+            "weak": 'W/"%x-%x"' % (len(body_bytes), zlib.crc32(body_bytes)),
+            "version": '"version-1"'
+        }
+
+        for strategy, etag in expected_etags.items():
+            plain_result, result, conditional_result = \
+                self.requests_results[strategy]
+            self.assertEqual(plain_result.status_code, 200)
+            self.assertEqual(plain_result.text, body)
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(result.headers["etag"], etag)
+            self.assertEqual(conditional_result.status_code, 304)
+            self.assertEqual(conditional_result.content, b"")
+
+        # The body is not hashed if the request is not conditional.
+        for strategy in ("default", "strong", "weak"):
+            plain_result = self.requests_results[strategy][0]
+            self.assertNotIn("etag", plain_result.headers)
+        self.assertEqual(self.requests_results["version"][0].headers["etag"],
+                         '"version-1"')
+
+        plain_result, result, conditional_result = \
+            self.requests_results["off"]
+        self.assertNotIn("etag", plain_result.headers)
+        self.assertNotIn("etag", result.headers)
+        self.assertEqual(conditional_result.status_code, 200)
+        self.assertEqual(conditional_result.text, body)
+
+
+class ValidatorTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
 
-        self.assertEqual(self.requests_result.headers["location"],
-                         "/redirected")
+    def test_get_validator(self):
+        handled_requests = []
+        computed_etags = []
+        last_modified = datetime.datetime(2016, 1, 1)
+
+        @self.app.add_handler("/version/(?P<version>\\w+)")
+        class VersionHandler(futurefinity.web.RequestHandler):
+            async def get_validator(self, *args, **kwargs):
+                return kwargs["version"]
+
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.path)
+                return "Hello, World!"
+
+        @self.app.add_handler("/last_modified")
+        class LastModifiedHandler(futurefinity.web.RequestHandler):
+            def get_validator(self, *args, **kwargs):
+                return last_modified
+
+            def compute_etag(self):
+                computed_etags.append(self.request.path)
+                return futurefinity.web.RequestHandler.compute_etag(self)
+
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.path)
+                return "Hello, World!"
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            with requests.Session() as session:
+                first_result = session.get(url + "/last_modified")
+                return {
+                    "version": session.get(url + "/version/v1"),
+                    "version_not_modified": session.get(
+                        url + "/version/v1",
+                        headers={"if-none-match": '"v1"'}),
+                    "version_modified": session.get(
+                        url + "/version/v2",
+                        headers={"if-none-match": '"v1"'}),
+                    "last_modified": first_result,
+                    "last_modified_not_modified": session.get(
+                        url + "/last_modified", headers={
+                            "if-modified-since":
+                                first_result.headers["last-modified"]}),
+                    "last_modified_if_none_match": session.get(
+                        url + "/last_modified", headers={
+                            "if-none-match": "\"outdated\""})
+                }
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        self.assertEqual(results["version"].status_code, 200)
+        self.assertEqual(results["version"].headers["etag"], '"v1"')
+        self.assertEqual(results["version_modified"].status_code, 200)
+        self.assertEqual(results["version_modified"].headers["etag"], '"v2"')
+        self.assertEqual(results["last_modified"].headers["last-modified"],
+                         "Fri, 01 Jan 2016 00:00:00 GMT")
+
+        for name in ("version_not_modified", "last_modified_not_modified"):
+            self.assertEqual(results[name].status_code, 304)
+            self.assertEqual(results[name].content, b"")
+
+        last_modified_result = results["last_modified_if_none_match"]
+        self.assertEqual(last_modified_result.status_code, 200)
+        self.assertEqual(last_modified_result.text, "Hello, World!")
+        self.assertNotIn("etag", last_modified_result.headers)
+
+        self.assertEqual(handled_requests, [
+            "/last_modified", "/version/v1", "/version/v2", "/last_modified"])
+        self.assertEqual(computed_etags, [])
+
+
+class ResponseCacheTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(response_cache=True)
+
+    def make_request(self, origin_path: str, **headers):
+        headers.setdefault("host", "localhost")
+        return futurefinity.protocol.HTTPIncomingRequest(
+            method="GET", origin_path=origin_path, http_version=11,
+            headers=futurefinity.protocol.HTTPHeaders(headers),
+            connection=None)
+
+    def make_headers(self, **headers):
+        return futurefinity.protocol.HTTPHeaders(
+            {name.replace("_", "-"): value for name, value in headers.items()})
+
+    def test_response_cache(self):
+        handled_requests = []
+
+        @self.app.add_handler("/cached")
+        class CachedHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.origin_path)
+                self.set_header("cache-control", "public, max-age=60")
+                self.set_header("vary", "X-Language")
+                return "%s:%s:%d" % (self.get_link_arg("page", ""),
+                                     self.get_header("x-language", ""),
+                                     len(handled_requests))
+
+        @self.app.add_handler("/no_store")
+        class NoStoreHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.origin_path)
+                self.set_header("cache-control", "no-store, max-age=60")
+                return "Hello, World!"
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            with requests.Session() as session:
+                first_result = session.get(url + "/cached")
+                return {
+                    "first": first_result,
+                    "second": session.get(url + "/cached"),
+                    "head": session.head(url + "/cached"),
+                    "not_modified": session.get(url + "/cached", headers={
+                        "if-none-match": first_result.headers["etag"]}),
+                    "query": session.get(url + "/cached?page=2"),
+                    "vary": session.get(url + "/cached",
+                                        headers={"x-language": "en"}),
+                    "no_cache": session.get(url + "/cached", headers={
+                        "cache-control": "no-cache"}),
+                    "no_store": [session.get(url + "/no_store")
+                                 for _ in range(2)]
+                }
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        self.assertEqual(results["first"].text, "::1")
+        self.assertEqual(results["second"].text, "::1")
+        self.assertIn("age", results["second"].headers)
+        self.assertEqual(results["second"].headers["cache-control"],
+                         "public, max-age=60")
+        self.assertEqual(results["head"].status_code, 200)
+        self.assertEqual(results["head"].content, b"")
+        self.assertEqual(results["head"].headers["content-length"], "3")
+        self.assertEqual(results["not_modified"].status_code, 304)
+        self.assertEqual(results["query"].text, "2::2")
+        self.assertEqual(results["vary"].text, ":en:3")
+        self.assertEqual(results["no_cache"].text, "::4")
+        for result in results["no_store"]:
+            self.assertEqual(result.text, "Hello, World!")
+
+        self.assertEqual(handled_requests, [
+            "/cached", "/cached?page=2", "/cached", "/cached", "/no_store",
+            "/no_store"])
+        self.assertEqual(self.app.response_cache.hits, 3)
+
+    def test_response_cache_eviction(self):
+        response_cache = futurefinity.web.ResponseCache(max_size=1000)
+        body = b"a" * 300
+
+        for i in range(4):
+            self.assertTrue(response_cache.set(
+                self.make_request("/%d" % i), 200,
+                self.make_headers(cache_control="max-age=60"), body))
+        self.assertLessEqual(response_cache.size, 1000)
+
+        self.assertIsNone(response_cache.get(self.make_request("/0")))
+        self.assertEqual(response_cache.get(self.make_request("/3")).body,
+                         body)
+
+        self.assertFalse(response_cache.set(
+            self.make_request("/large"), 200,
+            self.make_headers(cache_control="max-age=60"), b"a" * 1001))
+        self.assertFalse(response_cache.set(
+            self.make_request("/private"), 200,
+            self.make_headers(cache_control="private, max-age=60"), body))
+        self.assertFalse(response_cache.set(
+            self.make_request("/no_max_age"), 200, self.make_headers(), body))
+        self.assertFalse(response_cache.set(
+            self.make_request("/cookie"), 200,
+            self.make_headers(cache_control="max-age=60",
+                              set_cookie="a=b"), body))
+
+    def test_response_cache_expiry(self):
+        response_cache = futurefinity.web.ResponseCache()
+        self.assertTrue(response_cache.set(
+            self.make_request("/"), 200,
+            self.make_headers(cache_control="max-age=60, s-maxage=0.1"),
+            b"Hello, World!"))
+        self.assertIsNotNone(response_cache.get(self.make_request("/")))
+        time.sleep(0.2)
+        self.assertIsNone(response_cache.get(self.make_request("/")))
+        self.assertEqual(response_cache.size, 0)
+
+
+class RequestCoalescingTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
+
+    def test_request_coalescing(self):
+        handled_requests = []
+
+        @self.app.add_handler("/coalesced")
+        class CoalescedHandler(futurefinity.web.RequestHandler):
+            coalesce_requests = True
+            coalesce_key_headers = ("x-language", )
+
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.origin_path)
+                await asyncio.sleep(0.5)
+                self.set_header("x-handled", str(len(handled_requests)))
+                return "%s:%s" % (self.get_link_arg("page", ""),
+                                  self.get_header("x-language", ""))
+
+        @self.app.add_handler("/cookie")
+        class CookieHandler(futurefinity.web.RequestHandler):
+            coalesce_requests = True
+
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.origin_path)
+                await asyncio.sleep(0.5)
+                self.set_cookie("a", "b")
+                return "Hello, World!"
+
+        server = self.app.listen(8888)
+
+        def send_request(path, headers=None):
+            return requests.get("http://127.0.0.1:8888" + path,
+                                headers=headers)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await asyncio.gather(*[
+                    self.loop.run_in_executor(None, send_request, *args)
+                    for args in [
+                        ("/coalesced", ), ("/coalesced", ), ("/coalesced", ),
+                        ("/coalesced?page=2", ),
+                        ("/coalesced", {"x-language": "en"}),
+                        ("/cookie", ), ("/cookie", )]])
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        for result in results[:3]:
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(result.text, ":")
+            self.assertEqual(result.headers["x-handled"],
+                             results[0].headers["x-handled"])
+        self.assertEqual(results[3].text, "2:")
+        self.assertEqual(results[4].text, ":en")
+        for result in results[5:]:
+            self.assertEqual(result.text, "Hello, World!")
+            self.assertIn("a=b", result.headers["set-cookie"])
+
+        self.assertEqual(handled_requests.count("/coalesced"), 2)
+        self.assertEqual(handled_requests.count("/coalesced?page=2"), 1)
+        self.assertEqual(len(handled_requests), 5)
+        self.assertEqual(self.app._coalesced_requests, {})
+
+    def test_request_coalescing_with_compression(self):
+        app = futurefinity.web.Application(compress_response=True)
+        handled_requests = []
+        body = "Hello, World!\n" * 20000
+
+        @app.add_handler("/")
+        class CoalescedHandler(futurefinity.web.RequestHandler):
+            coalesce_requests = True
+
+            async def get(self, *args, **kwargs):
+                handled_requests.append(self.request.origin_path)
+                await asyncio.sleep(0.5)
+                return body
+
+        server = app.listen(8888)
+
+        def send_request(accept_encoding):
+            return requests.get("http://127.0.0.1:8888/", headers={
+                "accept-encoding": accept_encoding})
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await asyncio.gather(*[
+                    self.loop.run_in_executor(None, send_request, coding)
+                    for coding in ("gzip", "identity")])
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        gzip_result, identity_result = self.requests_results
+
+        self.assertEqual(len(handled_requests), 1)
+
+        self.assertEqual(gzip_result.status_code, 200)
+        self.assertEqual(gzip_result.headers["content-encoding"], "gzip")
+        self.assertLess(int(gzip_result.headers["content-length"]),
+                        len(body))
+        self.assertEqual(gzip_result.text, body)
+
+        self.assertEqual(identity_result.status_code, 200)
+        self.assertNotIn("content-encoding", identity_result.headers)
+        self.assertEqual(identity_result.text, body)
+
+        for result in self.requests_results:
+            self.assertEqual(result.headers["vary"], "Accept-Encoding")
+
+
+class AsyncGeneratorHandlerTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
+
+    def test_async_generator_handler(self):
+        @self.app.add_handler("/stream")
+        class StreamHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.set_header("content-type", "text/csv")
+                for i in range(3):
+                    await asyncio.sleep(0)
+                    yield "%d,%s\r\n" % (i, "a" * 100000)
+                yield b""
+                yield b"end"
+
+        @self.app.add_handler("/flush")
+        class FlushHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.write("Hello, ")
+                await self.flush()
+                self.write("World!")
+
+        @self.app.add_handler("/error")
+        class ErrorHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                yield "Hello, "
+                raise ValueError("Stream broken.")
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            results = {
+                "stream": requests.get(url + "/stream"),
+                "head": requests.head(url + "/stream"),
+                "flush": requests.get(url + "/flush")
+            }
+            try:
+                requests.get(url + "/error")
+            except requests.exceptions.RequestException as e:
+                results["error"] = e
+            return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        self.assertEqual(results["stream"].status_code, 200)
+        self.assertEqual(results["stream"].headers["transfer-encoding"],
+                         "Chunked")
+        self.assertEqual(results["stream"].headers["content-type"],
+                         "text/csv")
+        self.assertEqual(results["stream"].text, "".join(
+            "%d,%s\r\n" % (i, "a" * 100000) for i in range(3)) + "end")
+
+        self.assertEqual(results["head"].status_code, 200)
+        self.assertEqual(results["head"].text, "")
+
+        self.assertEqual(results["flush"].text, "Hello, World!")
+        self.assertEqual(results["flush"].headers["transfer-encoding"],
+                         "Chunked")
+
+        self.assertIn("error", results)
+
+
+class CachedCoroutineHandlerTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
+
+    def test_cached_coroutine_handler_method(self):
+        handlers = []
+        loaded_names = []
+
+        @self.app.add_handler("/(?P<name>\\w+)")
+        class CachedHandler(futurefinity.web.RequestHandler):
+            @cached_coroutine(ttl=60)
+            async def load_name(self, name):
+                loaded_names.append(name)
+                return name.upper()
+
+            async def get(self, *args, **kwargs):
+                handlers.append(weakref.ref(self))
+                return await self.load_name(kwargs["name"])
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            with requests.Session() as session:
+                return [session.get("http://127.0.0.1:8888/" + name).text
+                        for name in ("a", "a", "b")]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_results, ["A", "A", "B"])
+        self.assertEqual(loaded_names, ["a", "b"])
+        self.assertEqual(CachedHandler.load_name.hits, 1)
+        self.assertEqual(CachedHandler.load_name.misses, 2)
+
+        gc.collect()
+        self.assertEqual([handler() for handler in handlers],
+                         [None] * 3)
+
+
+class ServerSentEventTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
+
+    def test_format_event(self):
+        self.assertEqual(futurefinity.web.format_event(
+            "a\r\nb\nc", event="update", id="1", retry=1000),
+            b"event: update\nid: 1\nretry: 1000\n"
+            b"data: a\ndata: b\ndata: c\n\n")
+        self.assertEqual(futurefinity.web.format_event(""), b"data: \n\n")
+
+        with self.assertRaises(ValueError):
+            futurefinity.web.format_event("a", event="a\nb")
+        with self.assertRaises(ValueError):
+            futurefinity.web.format_event("a", id="a\rb")
+
+    def test_server_sent_event_handler(self):
+        closed_streams = []
+
+        @self.app.add_handler("/events")
+        class EventsHandler(futurefinity.web.ServerSentEventHandler):
+            heartbeat_interval = 0.05
+            reconnect_time = 3000
+
+            async def stream_events(self, *args, **kwargs):
+                yield "resumed from %s" % self.last_event_id
+                await asyncio.sleep(0.2)
+                yield {"data": "Hello, World!", "event": "greeting",
+                       "id": "2"}
+                await self.send_event("bye")
+
+        @self.app.add_handler("/endless")
+        class EndlessHandler(futurefinity.web.ServerSentEventHandler):
+            async def stream_events(self, *args, **kwargs):
+                while True:
+                    await self.send_event("a" * 1024)
+                    await asyncio.sleep(0.01)
+
+            def on_connection_close(self):
+                closed_streams.append(self.request.origin_path)
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            results = {"events": requests.get(
+                "http://127.0.0.1:8888/events",
+                headers={"last-event-id": "1"})}
+
+            with socket.create_connection(("127.0.0.1", 8888)) as s:
+                s.sendall(b"GET /endless HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                results["endless"] = s.recv(4096)
+            return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+                for _ in range(100):
+                    if closed_streams:
+                        break
+                    await asyncio.sleep(0.01)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        events = results["events"]
+        self.assertEqual(events.headers["content-type"],
+                         "text/event-stream; charset=utf-8")
+        self.assertEqual(events.headers["cache-control"], "no-cache")
+        self.assertTrue(events.text.startswith(
+            "retry: 3000\n\ndata: resumed from 1\n\n"))
+        self.assertIn("\n:\n\n", events.text)
+        self.assertTrue(events.text.endswith(
+            "event: greeting\nid: 2\ndata: Hello, World!\n\n"
+            "data: bye\n\n"))
+
+        self.assertIn(b"text/event-stream", results["endless"])
+        self.assertEqual(closed_streams, ["/endless"])
+
+
+class CompressionTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(compress_response=True,
+                                                compress_executor_size=65536)
+        self.json_body = json.dumps(
+            [{"id": i, "name": "item%d" % i} for i in range(5000)])
+
+    def test_compress_response(self):
+        json_body = self.json_body
+
+        @self.app.add_handler("/json")
+        class JSONHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.set_header("content-type", "application/json")
+                return json_body[:int(self.get_link_arg("size"))]
+
+        @self.app.add_handler("/image")
+        class ImageHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.set_header("content-type", "image/png")
+                return json_body
+
+        @self.app.add_handler("/stream")
+        class StreamHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                for i in range(0, len(json_body), 10000):
+                    self.write(json_body[i:i + 10000])
+                    self.flush()
+                self.finish()
+
+        server = self.app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            with requests.Session() as session:
+                raw_result = session.get(
+                    url + "/json?size=10000", stream=True,
+                    headers={"accept-encoding": "gzip",
+                             "if-none-match": "\"outdated\""})
+                raw_content = raw_result.raw.read(decode_content=False)
+                raw_result.close()
+                executor_result = session.get(
+                    url + "/json?size=100000",
+                    headers={"if-none-match": "\"outdated\""})
+
+                return {
+                    "raw": (raw_result, raw_content),
+                    "small": session.get(url + "/json?size=100"),
+                    "deflate": session.get(
+                        url + "/json?size=10000",
+                        headers={"accept-encoding": "deflate"}),
+                    "identity": session.get(
+                        url + "/json?size=10000",
+                        headers={"accept-encoding": "identity"}),
+                    "executor": executor_result,
+                    "image": session.get(url + "/image"),
+                    "stream": session.get(url + "/stream"),
+                    "not_modified": session.get(
+                        url + "/json?size=10000",
+                        headers={"if-none-match": raw_result.headers["etag"]}),
+                    "executor_not_modified": session.get(
+                        url + "/json?size=100000", headers={
+                            "if-none-match": executor_result.headers["etag"]})
+                }
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        raw_result, raw_content = self.requests_results["raw"]
+        self.assertEqual(raw_result.headers["content-encoding"], "gzip")
+        self.assertEqual(raw_result.headers["vary"], "Accept-Encoding")
+        self.assertTrue(raw_result.headers["etag"].startswith("W/"))
+        self.assertEqual(raw_result.headers["content-length"],
+                         str(len(raw_content)))
+        self.assertEqual(gzip.decompress(raw_content),
+                         json_body[:10000].encode())
+
+        small_result = self.requests_results["small"]
+        self.assertNotIn("content-encoding", small_result.headers)
+        self.assertEqual(small_result.headers["vary"], "Accept-Encoding")
+        self.assertEqual(small_result.text, json_body[:100])
+
+        deflate_result = self.requests_results["deflate"]
+        self.assertEqual(deflate_result.headers["content-encoding"],
+                         "deflate")
+        self.assertEqual(deflate_result.text, json_body[:10000])
+
+        identity_result = self.requests_results["identity"]
+        self.assertNotIn("content-encoding", identity_result.headers)
+        self.assertEqual(identity_result.text, json_body[:10000])
+
+        executor_result = self.requests_results["executor"]
+        self.assertEqual(executor_result.headers["content-encoding"], "gzip")
+        self.assertEqual(executor_result.text, json_body[:100000])
+
+        image_result = self.requests_results["image"]
+        self.assertNotIn("content-encoding", image_result.headers)
+        self.assertEqual(image_result.text, json_body)
+
+        stream_result = self.requests_results["stream"]
+        self.assertEqual(stream_result.headers["content-encoding"], "gzip")
+        self.assertEqual(stream_result.headers["transfer-encoding"],
+                         "Chunked")
+        self.assertEqual(stream_result.text, json_body)
+
+        for name in ("not_modified", "executor_not_modified"):
+            self.assertEqual(self.requests_results[name].status_code, 304)
+            self.assertEqual(self.requests_results[name].content, b"")
+            self.assertNotIn("content-encoding",
+                             self.requests_results[name].headers)
+
+    def test_compress_finished_response_in_executor(self):
+        template_path = tempfile.mkdtemp()
+        with open(os.path.join(template_path, "list.htm"), "w") as f:
+            f.write("<pre>{{ body }}</pre>")
+
+        app = futurefinity.web.Application(
+            template_path=template_path, compress_response=True,
+            compress_executor_size=65536)
+        json_body = self.json_body
+
+        @app.add_handler("/render")
+        class RenderHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.render("list.htm", {"body": json_body})
+
+        @app.add_handler("/finish")
+        class FinishHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                self.set_header("content-type", "application/json")
+                self.finish(json_body)
+
+        server = app.listen(8888)
+
+        def send_requests():
+            url = "http://127.0.0.1:8888"
+            with requests.Session() as session:
+                return [session.get(url + path,
+                                    headers={"accept-encoding": "gzip"})
+                        for path in ("/render", "/finish", "/render")]
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        compressing_threads = []
+        compress_body = futurefinity.web._compress_body
+
+        def record_compressing_thread(*args):
+            compressing_threads.append(threading.current_thread())
+            return compress_body(*args)
+
+        with unittest.mock.patch.object(futurefinity.web, "_compress_body",
+                                        record_compressing_thread):
+            asyncio.ensure_future(get_requests_result(self))
+            self.loop.run_forever()
+
+        for result in self.requests_results:
+            self.assertEqual(result.status_code, 200)
+            self.assertEqual(result.headers["content-encoding"], "gzip")
+        self.assertEqual(self.requests_results[0].text,
+                         "<pre>%s</pre>" % json_body)
+        self.assertEqual(self.requests_results[1].text, json_body)
+        self.assertEqual(self.requests_results[2].text,
+                         self.requests_results[0].text)
+
+        self.assertEqual(len(compressing_threads), 3)
+        self.assertNotIn(threading.main_thread(), compressing_threads)
+
+
+class RedirectTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(allow_keep_alive=False,
+                                                debug=True)
+
+    def test_redirect_request(self):
+        @self.app.add_handler("/")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return self.redirect("/redirected")
+
+        server = self.app.listen(8888)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_result = await self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.get, "http://127.0.0.1:8888/",
+                        allow_redirects=False)
+                )
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 302,
+                         "Wrong Status Code")
+
+        self.assertEqual(self.requests_result.headers["location"],
+                         "/redirected")
+
+
+class WarmupTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.static_path = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.static_path, "js"))
+        for name in ("index.html", "js/app.js", "js/app.js.gz"):
+            with open(os.path.join(self.static_path, name), "wb") as f:
+                f.write(b"Hello, World!")
+
+        self.app = futurefinity.web.Application(
+            template_path="examples/template", static_path=self.static_path)
+
+    def test_warmup(self):
+        called_hooks = []
+
+        @self.app.add_warmup_hook
+        def hook():
+            called_hooks.append("hook")
+
+        @self.app.add_warmup_hook
+        async def coroutine_hook():
+            await asyncio.sleep(0)
+            called_hooks.append("coroutine_hook")
+
+        self.app.warmup()
+
+        self.assertEqual(called_hooks, ["hook", "coroutine_hook"])
+        self.assertIn("login.htm", self.app.template_loader._template_cache)
+
+        static_entries = self.app.static_file_cache._entries
+        self.assertEqual(sorted(path for _, path in static_entries.keys()),
+                         ["index.html", "js/app.js"])
+        app_info = static_entries[(self.static_path, "js/app.js")]
+        self.assertEqual(list(app_info.variants.keys()), ["gzip"])
+        self.assertIsNotNone(app_info._header_block)
+        self.assertEqual(self.app.static_file_cache._hashes, {})
+
+
+class ShutdownTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(debug=True)
+
+    def test_graceful_shutdown(self):
+        @self.app.add_handler("/shutdown_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                await asyncio.sleep(0.5)
+                return "Hello, World!"
+
+        self.app.listen(8888)
+
+        async def get_requests_result(self):
+            try:
+                requests_future = self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.get, "http://127.0.0.1:8888/shutdown_test"
+                    )
+                )
+                await asyncio.sleep(0.2)
+                await self.app.shutdown(timeout=5)
+                self.requests_result = await requests_future
+
+                self.connection_error = None
+                try:
+                    await self.loop.run_in_executor(
+                        None, functools.partial(
+                            requests.get,
+                            "http://127.0.0.1:8888/shutdown_test"
+                        )
+                    )
+                except requests.ConnectionError as e:
+                    self.connection_error = e
+            except:
+                traceback.print_exc()
+            finally:
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 200,
+                         "Wrong Status Code")
+        self.assertEqual(self.requests_result.text, "Hello, World!")
+        self.assertIsNotNone(self.connection_error)
+        self.assertEqual(self.app._connections, set())
+
+
+class ListenTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(allow_keep_alive=False,
+                                                debug=True)
+
+    def test_listen_with_socket_options(self):
+        @self.app.add_handler("/listen_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                sock = self.server.transport.get_extra_info("socket")
+                return str(sock.getsockopt(socket.IPPROTO_TCP,
+                                           socket.TCP_NODELAY))
+
+        server = self.app.listen(
+            8888, address=["127.0.0.1", "localhost"], backlog=16,
+            reuse_port=True, tcp_nodelay=True, tcp_keepalive=True,
+            tcp_defer_accept=1, recv_buffer_size=65536)
+
+        self.assertGreaterEqual(len(server.sockets), 1)
+        for sock in server.sockets:
+            self.assertTrue(sock.getsockopt(socket.SOL_SOCKET,
+                                            socket.SO_REUSEPORT))
+            self.assertGreaterEqual(
+                sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF), 65536)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_result = await self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.get, "http://127.0.0.1:8888/listen_test"
+                    )
+                )
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 200,
+                         "Wrong Status Code")
+        self.assertNotEqual(self.requests_result.text, "0")
+
+    def test_listen_unix(self):
+        @self.app.add_handler("/listen_unix_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return "Hello, World!"
+
+        path = os.path.join(tempfile.mkdtemp(), "futurefinity.sock")
+        server = self.app.listen_unix(path, mode=0o600)
+        self.assertEqual(stat.S_IMODE(os.stat(path).st_mode), 0o600)
+
+        async def get_requests_result(self):
+            try:
+                reader, writer = await asyncio.open_unix_connection(path)
+                writer.write(b"GET /listen_unix_test HTTP/1.1\r\n"
+                             b"Host: localhost\r\n\r\n")
+                self.response = await reader.read()
+                writer.close()
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertTrue(self.response.startswith(b"HTTP/1.1 200 OK\r\n"))
+        self.assertTrue(self.response.endswith(b"Hello, World!"))
+
+    def test_listen_socket(self):
+        @self.app.add_handler("/listen_socket_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return "Hello, World!"
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("127.0.0.1", 8888))
+        sock.listen(16)
+        server = self.app.listen_socket(sock)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_result = await self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.get,
+                        "http://127.0.0.1:8888/listen_socket_test"
+                    )
+                )
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 200,
+                         "Wrong Status Code")
+        self.assertEqual(self.requests_result.text, "Hello, World!")
+
+
+class UVLoopTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.old_loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application(allow_keep_alive=False,
+                                                debug=True, uvloop=True)
+        self.loop = self.app._loop
+
+    def tearDown(self):
+        asyncio.set_event_loop_policy(None)
+        asyncio.set_event_loop(self.old_loop)
+        if self.loop is not self.old_loop:
+            self.loop.close()
+
+    def test_uvloop_request(self):
+        if futurefinity.web.uvloop is None:
+            self.assertIs(self.loop, self.old_loop)
+        else:
+            self.assertIsInstance(self.loop, futurefinity.web.uvloop.Loop)
+
+        @self.app.add_handler("/uvloop_test")
+        class TestHandler(futurefinity.web.RequestHandler):
+            async def get(self, *args, **kwargs):
+                return "Hello, World!"
+
+        server = self.app.listen(8888)
+
+        async def get_requests_result(self):
+            try:
+                self.requests_result = await self.loop.run_in_executor(
+                    None, functools.partial(
+                        requests.get, "http://127.0.0.1:8888/uvloop_test"
+                    )
+                )
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self), loop=self.loop)
+        self.loop.run_forever()
+
+        self.assertEqual(self.requests_result.status_code, 200,
+                         "Wrong Status Code")
+        self.assertEqual(self.requests_result.text, "Hello, World!")
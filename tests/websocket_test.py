@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+#
+#   Copyright 2016 Futur Solo
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from futurefinity.websocket import (
+    build_frame, apply_mask, get_accept_key, broadcast, PerMessageDeflate,
+    WebSocketConnection, WebSocketClosedError, OPCODE_TEXT, OPCODE_BINARY,
+    OPCODE_CONTINUATION, OPCODE_CLOSE, OPCODE_PING, OPCODE_PONG)
+
+import futurefinity.web
+
+import asyncio
+
+import os
+import zlib
+import socket
+import struct
+import requests
+import unittest
+import traceback
+import unittest.mock
+
+
+MASK_KEY = b"\x01\x02\x03\x04"
+
+
+def parse_frames(data: bytes):
+    frames = []
+    while data:
+        first_byte, length = data[0], data[1] & 0x7F
+        offset = 2
+        if length == 126:
+            length = struct.unpack_from("!H", data, 2)[0]
+            offset = 4
+        elif length == 127:
+            length = struct.unpack_from("!Q", data, 2)[0]
+            offset = 10
+        frames.append((first_byte & 0x0F, bool(first_byte & 0x40),
+                       data[offset:offset + length]))
+        data = data[offset + length:]
+    return frames
+
+
+def decompress_payload(payload: bytes) -> bytes:
+    return zlib.decompressobj(-zlib.MAX_WBITS).decompress(
+        payload + b"\x00\x00\xff\xff")
+
+
+def compress_payload(payload: bytes) -> bytes:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return (compressor.compress(payload) +
+            compressor.flush(zlib.Z_SYNC_FLUSH))[:-4]
+
+
+class WebSocketProtocolTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def create_connection(self, extension=None, **kwargs):
+        controller = unittest.mock.Mock()
+        controller.stored_bytes = b""
+        controller.transport_closed = False
+
+        def write(data):
+            controller.stored_bytes += data
+
+        def close():
+            controller.transport_closed = True
+            connection.connection_lost()
+
+        async def drain():
+            pass
+
+        controller.transport.write = write
+        controller.transport.close = close
+        controller.transport.is_closing = lambda: controller.transport_closed
+        controller.drain = drain
+
+        connection = WebSocketConnection(controller, loop=self.loop,
+                                         **kwargs)
+        connection.start(extension)
+        return controller, connection
+
+    def test_accept_key(self):
+        self.assertEqual(get_accept_key("dGhlIHNhbXBsZSBub25jZQ=="),
+                         "s3pPLMBiTxaQ9kYGzzhZRbK+xOo=")
+
+    def test_apply_mask(self):
+        data = os.urandom(1023)
+        masked = apply_mask(MASK_KEY, data)
+        self.assertEqual(masked[:4], bytes(
+            b ^ m for b, m in zip(data[:4], MASK_KEY)))
+        self.assertEqual(apply_mask(MASK_KEY, masked), data)
+
+    def test_negotiate_permessage_deflate(self):
+        response, extension = PerMessageDeflate.negotiate(
+            "x-webkit-deflate-frame, permessage-deflate; "
+            "server_max_window_bits=8, permessage-deflate; "
+            "client_max_window_bits; server_no_context_takeover")
+        self.assertEqual(response,
+                         "permessage-deflate; server_no_context_takeover")
+        self.assertTrue(extension.server_no_context_takeover)
+        self.assertFalse(extension.client_no_context_takeover)
+
+        self.assertIsNone(PerMessageDeflate.negotiate(
+            "permessage-deflate; unknown_param"))
+
+    def test_receive_messages(self):
+        controller, connection = self.create_connection()
+        connection.data_received(
+            build_frame(OPCODE_TEXT, "Hello, ".encode(), fin=False,
+                        mask_key=MASK_KEY) +
+            build_frame(OPCODE_PING, b"ping", mask_key=MASK_KEY) +
+            build_frame(OPCODE_CONTINUATION, "World!".encode(),
+                        mask_key=MASK_KEY))
+        frame = build_frame(OPCODE_BINARY, b"a" * 70000, mask_key=MASK_KEY)
+        for i in range(0, len(frame), 1000):
+            connection.data_received(frame[i:i + 1000])
+
+        self.assertEqual(parse_frames(controller.stored_bytes),
+                         [(OPCODE_PONG, False, b"ping")])
+        self.assertEqual(self.loop.run_until_complete(connection.receive()),
+                         "Hello, World!")
+        self.assertEqual(self.loop.run_until_complete(connection.receive()),
+                         b"a" * 70000)
+
+    def test_compressed_messages(self):
+        controller, connection = self.create_connection(
+            extension=PerMessageDeflate())
+        for _ in range(2):
+            connection.data_received(build_frame(
+                OPCODE_TEXT, compress_payload(b"Hello, World!"), rsv1=True,
+                mask_key=MASK_KEY))
+            self.assertEqual(self.loop.run_until_complete(
+                connection.receive()), "Hello, World!")
+
+        self.loop.run_until_complete(connection.send("a" * 1000))
+        opcode, rsv1, payload = parse_frames(controller.stored_bytes)[0]
+        self.assertEqual(opcode, OPCODE_TEXT)
+        self.assertTrue(rsv1)
+        self.assertEqual(decompress_payload(payload), b"a" * 1000)
+
+    def test_close_handshake(self):
+        controller, connection = self.create_connection()
+        connection.data_received(build_frame(OPCODE_TEXT, b"bye",
+                                             mask_key=MASK_KEY))
+        connection.data_received(build_frame(
+            OPCODE_CLOSE, struct.pack("!H", 1001) + b"Going Away",
+            mask_key=MASK_KEY))
+
+        self.assertEqual(parse_frames(controller.stored_bytes),
+                         [(OPCODE_CLOSE, False, struct.pack("!H", 1001))])
+        self.assertTrue(controller.transport_closed)
+        self.assertEqual(connection.close_code, 1001)
+        self.assertEqual(connection.close_reason, "Going Away")
+
+        self.assertEqual(self.loop.run_until_complete(connection.receive()),
+                         "bye")
+        with self.assertRaises(WebSocketClosedError):
+            self.loop.run_until_complete(connection.receive())
+        with self.assertRaises(WebSocketClosedError):
+            self.loop.run_until_complete(connection.send("Hello"))
+
+    def test_protocol_errors(self):
+        for frames, code in [
+                (build_frame(OPCODE_TEXT, b"Hello"), 1002),  # Not masked.
+                (build_frame(OPCODE_CONTINUATION, b"a",
+                             mask_key=MASK_KEY), 1002),
+                (build_frame(OPCODE_PING, b"a", fin=False,
+                             mask_key=MASK_KEY), 1002),
+                (build_frame(OPCODE_TEXT, b"\xff", mask_key=MASK_KEY), 1007),
+                (build_frame(OPCODE_BINARY, b"a" * 1025,
+                             mask_key=MASK_KEY), 1009)]:
+            controller, connection = self.create_connection(
+                max_message_size=1024)
+            connection.data_received(frames)
+
+            self.assertTrue(controller.transport_closed)
+            self.assertEqual(connection.close_code, code)
+            self.assertEqual(parse_frames(controller.stored_bytes), [
+                (OPCODE_CLOSE, False, struct.pack("!H", code))])
+
+    def test_receive_backpressure(self):
+        controller, connection = self.create_connection(max_queue_size=2)
+        for i in range(2):
+            connection.data_received(build_frame(
+                OPCODE_TEXT, str(i).encode(), mask_key=MASK_KEY))
+        controller.transport.pause_reading.assert_called_once_with()
+
+        self.assertEqual(self.loop.run_until_complete(connection.receive()),
+                         "0")
+        controller.transport.resume_reading.assert_called_once_with()
+
+    def test_ping(self):
+        controller, connection = self.create_connection()
+
+        async def ping():
+            ping_task = self.loop.create_task(connection.ping(b"1"))
+            await asyncio.sleep(0)
+            self.assertFalse(ping_task.done())
+            connection.data_received(build_frame(OPCODE_PONG, b"1",
+                                                 mask_key=MASK_KEY))
+            await ping_task
+
+        self.loop.run_until_complete(ping())
+        self.assertEqual(parse_frames(controller.stored_bytes),
+                         [(OPCODE_PING, False, b"1")])
+
+    def test_broadcast(self):
+        connections = [
+            self.create_connection(),
+            self.create_connection(extension=PerMessageDeflate(
+                server_no_context_takeover=True)),
+            self.create_connection(extension=PerMessageDeflate(
+                server_no_context_takeover=True)),
+            self.create_connection(extension=PerMessageDeflate())]
+        closed_controller, closed_connection = self.create_connection()
+        closed_connection.connection_lost()
+
+        with unittest.mock.patch.object(
+                PerMessageDeflate, "compress",
+                autospec=True, side_effect=PerMessageDeflate.compress
+                ) as compress:
+            self.assertEqual(broadcast(
+                [connection for _, connection in connections] +
+                [closed_connection], "a" * 1000), 4)
+            self.assertEqual(compress.call_count, 1)
+
+        plain_frame = build_frame(OPCODE_TEXT, b"a" * 1000)
+        self.assertEqual(connections[0][0].stored_bytes, plain_frame)
+        self.assertEqual(connections[1][0].stored_bytes,
+                         connections[2][0].stored_bytes)
+        self.assertEqual(decompress_payload(parse_frames(
+            connections[1][0].stored_bytes)[0][2]), b"a" * 1000)
+        self.assertEqual(connections[3][0].stored_bytes, plain_frame)
+        self.assertEqual(closed_controller.stored_bytes, b"")
+
+
+class WebSocketHandlerTestCollector(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.get_event_loop()
+        self.app = futurefinity.web.Application()
+
+    def test_websocket_handler(self):
+        closed_connections = []
+
+        @self.app.add_handler("/echo")
+        class EchoHandler(futurefinity.web.WebSocketHandler):
+            def select_subprotocol(self, subprotocols):
+                return "echo" if "echo" in subprotocols else None
+
+            async def handle_websocket(self, *args, **kwargs):
+                async for message in self.websocket:
+                    if message == "close":
+                        return
+                    await self.websocket.send(message)
+
+            def on_connection_close(self):
+                closed_connections.append(self.websocket.close_code)
+
+        server = self.app.listen(8888)
+
+        def receive_exactly(s, length):
+            data = b""
+            while len(data) < length:
+                received = s.recv(length - len(data))
+                if not received:
+                    break
+                data += received
+            return data
+
+        def receive_frame(s):
+            first_byte, length = receive_exactly(s, 2)
+            if length == 126:
+                length = struct.unpack("!H", receive_exactly(s, 2))[0]
+            elif length == 127:
+                length = struct.unpack("!Q", receive_exactly(s, 8))[0]
+            return (first_byte & 0x0F, bool(first_byte & 0x40),
+                    receive_exactly(s, length))
+
+        def handshake(s, origin="http://127.0.0.1:8888", extensions=""):
+            s.sendall(
+                b"GET /echo HTTP/1.1\r\nHost: 127.0.0.1:8888\r\n"
+                b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\n"
+                b"Sec-WebSocket-Version: 13\r\n"
+                b"Sec-WebSocket-Protocol: chat, echo\r\n"
+                b"Origin: " + origin.encode() + b"\r\n" +
+                extensions.encode() + b"\r\n")
+            response = b""
+            while b"\r\n\r\n" not in response:
+                received = s.recv(1)
+                if not received:
+                    break
+                response += received
+            return response.decode().lower()
+
+        def send_requests():
+            results = {}
+            with socket.create_connection(("127.0.0.1", 8888)) as s:
+                results["handshake"] = handshake(
+                    s, extensions="Sec-WebSocket-Extensions: "
+                                  "permessage-deflate\r\n")
+                s.sendall(build_frame(
+                    OPCODE_TEXT, compress_payload(b"a" * 1000), rsv1=True,
+                    mask_key=MASK_KEY))
+                results["compressed"] = receive_frame(s)
+
+                s.sendall(
+                    build_frame(OPCODE_BINARY, b"Hello, ", fin=False,
+                                mask_key=MASK_KEY) +
+                    build_frame(OPCODE_PING, b"ping", mask_key=MASK_KEY) +
+                    build_frame(OPCODE_CONTINUATION, b"World!",
+                                mask_key=MASK_KEY))
+                results["pong"] = receive_frame(s)
+                results["binary"] = receive_frame(s)
+
+                s.sendall(build_frame(OPCODE_TEXT, b"close",
+                                      mask_key=MASK_KEY))
+                results["server_close"] = receive_frame(s)
+                s.sendall(build_frame(OPCODE_CLOSE, struct.pack("!H", 1000),
+                                      mask_key=MASK_KEY))
+                results["closed"] = s.recv(1)
+
+            with socket.create_connection(("127.0.0.1", 8888)) as s:
+                handshake(s)
+                s.sendall(build_frame(OPCODE_CLOSE, struct.pack("!H", 1001),
+                                      mask_key=MASK_KEY))
+                results["client_close"] = receive_frame(s)
+
+            with socket.create_connection(("127.0.0.1", 8888)) as s:
+                results["cross_origin"] = handshake(
+                    s, origin="http://example.com")
+
+            results["not_upgrade"] = requests.get(
+                "http://127.0.0.1:8888/echo")
+            return results
+
+        async def get_requests_result(self):
+            try:
+                self.requests_results = await self.loop.run_in_executor(
+                    None, send_requests)
+            except:
+                traceback.print_exc()
+            finally:
+                server.close()
+                await server.wait_closed()
+                self.loop.stop()
+
+        asyncio.ensure_future(get_requests_result(self))
+        self.loop.run_forever()
+
+        results = self.requests_results
+
+        handshake_response = results["handshake"]
+        self.assertTrue(handshake_response.startswith(
+            "http/1.1 101 switching protocols\r\n"))
+        self.assertIn("sec-websocket-accept: s3pplmbitxaq9kygzzhzrbk+xoo=",
+                      handshake_response)
+        self.assertIn("sec-websocket-protocol: echo", handshake_response)
+        self.assertIn("sec-websocket-extensions: permessage-deflate",
+                      handshake_response)
+
+        opcode, rsv1, payload = results["compressed"]
+        self.assertEqual(opcode, OPCODE_TEXT)
+        self.assertTrue(rsv1)
+        self.assertEqual(decompress_payload(payload), b"a" * 1000)
+
+        self.assertEqual(results["pong"], (OPCODE_PONG, False, b"ping"))
+        self.assertEqual(results["binary"],
+                         (OPCODE_BINARY, False, b"Hello, World!"))
+        self.assertEqual(results["server_close"],
+                         (OPCODE_CLOSE, False, struct.pack("!H", 1000)))
+        self.assertEqual(results["closed"], b"")
+
+        self.assertEqual(results["client_close"],
+                         (OPCODE_CLOSE, False, struct.pack("!H", 1001)))
+        self.assertEqual(closed_connections, [1001])
+
+        self.assertTrue(results["cross_origin"].startswith(
+            "http/1.1 403 forbidden\r\n"))
+        self.assertEqual(results["not_upgrade"].status_code, 426)
+        self.assertEqual(results["not_upgrade"].headers["upgrade"],
+                         "websocket")